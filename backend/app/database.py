@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import declarative_base, sessionmaker
+import logging
 import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
 
 # Use environment variable or default to local Postgres
 # Default credentials: user=postgres, password=postgres, db=ai4school
@@ -37,3 +42,78 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+# Optional read-only replica for analytics and reports, so dashboard aggregations
+# do not compete with exam writes on the primary. Unset means everything uses `engine`.
+READ_REPLICA_DATABASE_URL = os.getenv("READ_REPLICA_DATABASE_URL", "").strip()
+READ_REPLICA_MAX_LAG_SECONDS = _env_int("READ_REPLICA_MAX_LAG_SECONDS", 30)
+READ_REPLICA_CHECK_INTERVAL_SECONDS = _env_int("READ_REPLICA_CHECK_INTERVAL_SECONDS", 5)
+
+read_engine = None
+ReadSessionLocal = None
+if READ_REPLICA_DATABASE_URL:
+    read_engine = create_engine(READ_REPLICA_DATABASE_URL, **engine_kwargs)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Replay lag in seconds; 0 when the replica has applied everything it received
+# (an idle primary would otherwise look stale) and on servers that are not standbys.
+_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+_replica_state_lock = threading.Lock()
+_replica_state = {"checked_at": None, "healthy": False}
+
+
+def _measure_replica_lag() -> float:
+    with read_engine.connect() as conn:
+        return float(conn.execute(_REPLICA_LAG_SQL).scalar() or 0.0)
+
+
+def replica_available() -> bool:
+    # The verdict is cached for a few seconds so the lag probe is not a per-request query.
+    if read_engine is None:
+        return False
+    now = time.monotonic()
+    with _replica_state_lock:
+        checked_at = _replica_state["checked_at"]
+        if checked_at is not None and now - checked_at < READ_REPLICA_CHECK_INTERVAL_SECONDS:
+            return _replica_state["healthy"]
+    try:
+        lag = _measure_replica_lag()
+        healthy = lag <= READ_REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning("Read replica is %.1fs behind; using the primary for reads", lag)
+    except Exception:
+        logger.exception("Read replica is unreachable; using the primary for reads")
+        healthy = False
+    with _replica_state_lock:
+        _replica_state.update(checked_at=now, healthy=healthy)
+    return healthy
+
+
+def is_replica_session(db) -> bool:
+    return bool(db.info.get("replica"))
+
+
+def get_read_db():
+    # Reads that tolerate READ_REPLICA_MAX_LAG_SECONDS of staleness; never write through it.
+    if replica_available():
+        db = ReadSessionLocal()
+        db.info["replica"] = True
+    else:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
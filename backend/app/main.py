@@ -7,7 +7,6 @@ load_dotenv(os.path.join(os.path.dirname(__file__), "..", ".env"), override=Fals
 
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
@@ -16,17 +15,25 @@ from .database import engine, get_db, Base
 from .models import *  # Import all models to ensure they are registered
 from .auth import jwt
 from .routers import adapter, analytics, assignments, auth, classes, control_plane, documents, papers, users
+from .services.document_extraction import resume_document_extractions
+from .services.document_search import ensure_document_search_index
+from .services.file_delivery import CachedStaticFiles
+from .services.listening_pipeline import resume_listening_jobs, start_listening_job_sweeper
+from .services.upload_storage import DOCUMENT_BLOB_DIR
 
 # Initialize Database Tables
 Base.metadata.create_all(bind=engine)
+ensure_document_search_index(engine)
 
 app = FastAPI(title="AI4School Backend")
 
 # Ensure uploads directory exists
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
+if not os.path.exists(DOCUMENT_BLOB_DIR):
+    os.makedirs(DOCUMENT_BLOB_DIR)
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", CachedStaticFiles(directory="uploads"), name="uploads")
 
 # CORS Setup
 default_origins = [
@@ -59,6 +66,18 @@ app.include_router(control_plane.router)
 app.include_router(adapter.router)
 
 
+@app.on_event("startup")
+def resume_background_jobs():
+    # Listening-paper jobs checkpoint each stage, so anything left queued or
+    # running by a previous process is picked up again from its last stage;
+    # the sweeper catches jobs whose lease was still live at startup.
+    if os.getenv("LISTENING_JOBS_RESUME", "1") != "0":
+        resume_listening_jobs()
+        start_listening_job_sweeper()
+    if os.getenv("DOCUMENT_EXTRACTION_RESUME", "1") != "0":
+        resume_document_extractions()
+
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -4,11 +4,21 @@ from .class_invite_code import ClassInviteCode
 from .student_association import StudentClass
 from .paper import Paper
 from .question import Question
-from .submission import Submission, Answer
+from .submission import Submission, Answer, AnswerScore
+from .analytics_rollup import (
+    AnalyticsAnswerRollup,
+    AnalyticsDailySkillRollup,
+    AnalyticsDailySubmissionRollup,
+    AnalyticsSubmissionRollup,
+)
+from .item_analysis import QuestionItemStat, QuestionOptionStat
 from .document import Document
+from .document_page_text import DocumentPageText
+from .document_passage import DocumentPassage
 from .document_visibility import DocumentClassVisibility
 from .assignment import Assignment
 from .speaking_session import SpeakingSession, SpeakingTurn
+from .listening_job import ListeningPaperJob
 from .user_preference import UserPreference
 from .control_plane import (
     AuditLog,
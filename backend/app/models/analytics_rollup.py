@@ -0,0 +1,89 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index, UniqueConstraint
+from ..database import Base
+
+# Rollups are maintained at grading time by app.services.analytics_rollup and can be
+# rebuilt from submissions/answers with rebuild_analytics.py. Class filters are
+# resolved through the student roster at read time, so roster changes never need
+# a rebuild and students in several classes are not counted twice.
+
+
+class AnalyticsSubmissionRollup(Base):
+    __tablename__ = "analytics_submission_rollups"
+    __table_args__ = (
+        UniqueConstraint("paper_id", "student_id", name="uq_analytics_submission_rollups_paper_student"),
+        Index("idx_analytics_submission_rollups_teacher", "teacher_id", "paper_type"),
+        Index("idx_analytics_submission_rollups_student", "student_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # papers.created_by
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    paper_type = Column(String, nullable=False, default="reading")
+    submissions = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    scored = Column(Integer, nullable=False, default=0)  # submissions with a non-null score
+
+
+class AnalyticsAnswerRollup(Base):
+    __tablename__ = "analytics_answer_rollups"
+    __table_args__ = (
+        UniqueConstraint(
+            "paper_id", "student_id", "skill_tag", "question_type",
+            name="uq_analytics_answer_rollups_key",
+        ),
+        Index("idx_analytics_answer_rollups_teacher", "teacher_id", "paper_type"),
+        Index("idx_analytics_answer_rollups_student", "student_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    paper_type = Column(String, nullable=False, default="reading")
+    # "" stands for an untagged question so the unique key stays NULL-free.
+    skill_tag = Column(String, nullable=False, default="")
+    question_type = Column(String, nullable=False, default="")
+    answers = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)  # is_correct is true
+    incorrect = Column(Integer, nullable=False, default=0)  # is_correct is false (null is neither)
+
+
+# Per-day slices of the rollups above for trend lines. Weeks and months are summed
+# from days at read time, so a year of history is at most a few hundred points.
+class AnalyticsDailySubmissionRollup(Base):
+    __tablename__ = "analytics_daily_submission_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "paper_id", "student_id", name="uq_analytics_daily_submission_rollups_key"),
+        Index("idx_analytics_daily_submission_rollups_teacher_day", "teacher_id", "day"),
+        Index("idx_analytics_daily_submission_rollups_paper", "paper_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)  # date(submissions.submitted_at)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    paper_type = Column(String, nullable=False, default="reading")
+    submissions = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    scored = Column(Integer, nullable=False, default=0)
+
+
+class AnalyticsDailySkillRollup(Base):
+    __tablename__ = "analytics_daily_skill_rollups"
+    __table_args__ = (
+        UniqueConstraint("day", "paper_id", "student_id", "skill_tag", name="uq_analytics_daily_skill_rollups_key"),
+        Index("idx_analytics_daily_skill_rollups_teacher_day", "teacher_id", "day"),
+        Index("idx_analytics_daily_skill_rollups_paper", "paper_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    day = Column(Date, nullable=False)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False)
+    student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    paper_type = Column(String, nullable=False, default="reading")
+    skill_tag = Column(String, nullable=False, default="")
+    answers = Column(Integer, nullable=False, default=0)
+    correct = Column(Integer, nullable=False, default=0)
@@ -1,24 +1,59 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, DDL, Index, event
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship, backref
 from ..database import Base
 
 class Document(Base):
     __tablename__ = "documents"
+    # Folder listings filter by owner/parent and page by (created_at, id).
+    __table_args__ = (Index("idx_documents_listing", "uploaded_by", "parent_id", "created_at", "id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     content = Column(Text, nullable=True)  # Nullable for folders
     uploaded_by = Column(Integer, ForeignKey("users.id"))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    file_path = Column(String, nullable=True)
+    file_path = Column(String, nullable=True, index=True)  # shared by documents with identical content
+    file_size = Column(Integer, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the stored file
+    extraction_status = Column(String(16), default="ready", nullable=True)  # pending | ready | failed
+    extraction_error = Column(Text, nullable=True)
     is_deleted = Column(Boolean, default=False)
     deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     # Folder support
     is_folder = Column(Boolean, default=False)
-    parent_id = Column(Integer, ForeignKey("documents.id"), nullable=True)
+    parent_id = Column(Integer, ForeignKey("documents.id"), nullable=True, index=True)
 
     # Relationships
     uploader = relationship("User")
     children = relationship("Document", backref=backref('parent', remote_side=[id]))
+
+
+# Full-text index over title/content. SQLite (dev/tests) keeps an FTS5 table
+# maintained by services.document_search; Postgres uses a generated tsvector
+# column with a GIN index that follows every write on its own.
+event.listen(
+    Document.__table__,
+    "after_create",
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5(title, content, tokenize='porter unicode61')").execute_if(dialect="sqlite"),
+)
+event.listen(
+    Document.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS document_search").execute_if(dialect="sqlite"),
+)
+event.listen(
+    Document.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(content, '')), 'B')) STORED"
+    ).execute_if(dialect="postgresql"),
+)
+event.listen(
+    Document.__table__,
+    "after_create",
+    DDL("CREATE INDEX IF NOT EXISTS idx_documents_search_vector ON documents USING GIN (search_vector)").execute_if(dialect="postgresql"),
+)
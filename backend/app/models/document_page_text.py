@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class DocumentPageText(Base):
+    __tablename__ = "document_page_texts"
+    __table_args__ = (UniqueConstraint("content_hash", "page_number", name="uq_document_page_texts_hash_page"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 of the source file
+    page_number = Column(Integer, nullable=False)  # 0-based
+    text = Column(Text, nullable=False, default="")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
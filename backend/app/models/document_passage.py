@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class DocumentPassage(Base):
+    __tablename__ = "document_passages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    position = Column(Integer, nullable=False)  # 0-based order within the document
+    text = Column(Text, nullable=False)
+    token_count = Column(Integer, nullable=False, default=0)
+    terms = Column(JSON, nullable=False)  # {term: frequency} for BM25 scoring
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,35 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, UniqueConstraint
+from ..database import Base
+
+# Classical item statistics, maintained at grading time by app.services.item_analysis
+# and rebuilt with rebuild_analytics.py. Rows hold running sums rather than final
+# values so each submission is a constant-time update; facility and point-biserial
+# discrimination are derived from them when the report is read.
+
+
+class QuestionItemStat(Base):
+    __tablename__ = "question_item_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False, unique=True)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False, index=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # papers.created_by
+    responses = Column(Integer, nullable=False, default=0)  # graded answers from scored submissions
+    correct = Column(Integer, nullable=False, default=0)
+    # Sums of the submission score over those responses, for point-biserial discrimination.
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_sq_sum = Column(Float, nullable=False, default=0.0)
+    correct_score_sum = Column(Float, nullable=False, default=0.0)
+
+
+class QuestionOptionStat(Base):
+    __tablename__ = "question_option_stats"
+    __table_args__ = (
+        UniqueConstraint("question_id", "option", name="uq_question_option_stats_question_option"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    question_id = Column(Integer, ForeignKey("questions.id"), nullable=False)
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=False, index=True)
+    option = Column(String, nullable=False)  # the trimmed answer as submitted; "" when left blank
+    responses = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class ListeningPaperJob(Base):
+    __tablename__ = "listening_paper_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    teacher_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, default="queued", index=True)  # queued|running|completed|failed
+    stage = Column(String, default="script")  # script|audio|paper|done
+    progress = Column(Integer, default=0)  # 0-100 across all stages
+    request_payload = Column(JSON, nullable=False)  # prompt/title/voice options, never API keys
+    script_result = Column(JSON, nullable=True)  # checkpoint after the script stage
+    audio_result = Column(JSON, nullable=True)  # checkpoint after the audio stage
+    paper_id = Column(Integer, ForeignKey("papers.id"), nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    # Set atomically when a worker claims the job and extended on every progress
+    # update; another process may only take the job over once the lease expires.
+    owner = Column(String, nullable=True)
+    lease_until = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Boolean, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -16,6 +16,8 @@ class SpeakingSession(Base):
     token_estimate = Column(Integer, default=0)
     max_context_tokens = Column(Integer, default=1200)
     compaction_count = Column(Integer, default=0)
+    runtime_config = Column(JSON(none_as_null=True), nullable=True)  # resolved LLM/TTS settings (key references, never keys), cleared when the owner's settings change
+    runtime_config_version = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Boolean, JSON
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Float, String, Boolean, JSON, UniqueConstraint
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
+from datetime import timezone
 from ..database import Base
 
 class Submission(Base):
@@ -10,7 +11,7 @@ class Submission(Base):
     student_id = Column(Integer, ForeignKey("users.id"))
     paper_id = Column(Integer, ForeignKey("papers.id"))
     assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=True)
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     score = Column(Float, nullable=True)
 
     # Relationships
@@ -18,6 +19,13 @@ class Submission(Base):
     paper = relationship("Paper")
     answers = relationship("Answer", back_populates="submission")
 
+    @validates("submitted_at")
+    def _store_utc(self, key, value):
+        # SQLite drops the offset on write; keep the stored wall time in UTC so day buckets agree.
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
 class Answer(Base):
     __tablename__ = "answers"
 
@@ -36,3 +44,17 @@ class Answer(Base):
     # Relationships
     submission = relationship("Submission", back_populates="answers")
     question = relationship("Question") # Assuming Question model is imported or available in registry
+
+class AnswerScore(Base):
+    # Numeric copy of the rubric bands and writing metrics in Answer's JSON columns,
+    # written at grading time so analytics can AVG() them without parsing JSON.
+    __tablename__ = "answer_scores"
+    __table_args__ = (
+        UniqueConstraint("answer_id", "kind", "name", name="uq_answer_scores_answer_kind_name"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    answer_id = Column(Integer, ForeignKey("answers.id"), nullable=False)
+    kind = Column(String, nullable=False)  # "rubric" or "metric"
+    name = Column(String, nullable=False)  # e.g. "overall", "TTR"
+    value = Column(Float, nullable=False)
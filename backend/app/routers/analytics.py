@@ -1,20 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, case, or_
-from datetime import datetime, timezone
+from sqlalchemy import func, desc, case, select
+from datetime import date, datetime, timedelta, timezone
 import csv
 import io
-from typing import Dict, Optional, Union
+from typing import Dict, Optional
 
-from ..database import get_db
-from ..models.submission import Submission, Answer
+from ..database import READ_REPLICA_MAX_LAG_SECONDS, get_read_db, is_replica_session
+from ..models.submission import Submission, Answer, AnswerScore
 from ..models.question import Question
 from ..models.user import User
 from ..models.paper import Paper
 from ..models.student_association import StudentClass
 from ..models.speaking_session import SpeakingSession, SpeakingTurn
+from ..models.analytics_rollup import (
+    AnalyticsAnswerRollup,
+    AnalyticsDailySkillRollup,
+    AnalyticsDailySubmissionRollup,
+    AnalyticsSubmissionRollup,
+)
+from ..models.item_analysis import QuestionItemStat, QuestionOptionStat
 from ..auth.jwt import get_current_user
+from ..services.analytics_cache import cached_analytics
+from ..services.analytics_export import EXPORT_FORMATS, stream_export_rows
+from ..services.analytics_rollup import METRIC_KEYS, RUBRIC_KEYS
+from ..services.cohort_stats import cohort_statistics
+from ..services.item_analysis import item_discrimination, item_facility
 
 router = APIRouter(
     prefix="/analytics",
@@ -104,6 +116,212 @@ def _apply_teacher_filters(
     return query
 
 
+def _rollup_query(
+    db: Session,
+    model,
+    current_user: User,
+    class_id: Optional[int] = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    # Same filter semantics as _apply_teacher_filters, against the grading-time rollups.
+    query = db.query(model)
+    if current_user.role != "admin":
+        query = query.filter(model.teacher_id == current_user.id)
+    if class_id:
+        class_student_ids = db.query(StudentClass.user_id).filter(StudentClass.class_id == class_id)
+        query = query.filter(model.student_id.in_(class_student_ids))
+    normalized_type = _normalize_paper_type(paper_type)
+    if normalized_type:
+        query = query.filter(model.paper_type == normalized_type)
+    if paper_id is not None:
+        query = query.filter(model.paper_id == paper_id)
+    if student_id is not None:
+        query = query.filter(model.student_id == student_id)
+    return query
+
+
+OBJECTIVE_PAPER_TYPES = ("reading", "listening")
+PRODUCTIVE_PAPER_TYPES = ("writing", "speaking")
+
+
+# Section formatters below take grouped rows, either from SQL aggregates (single
+# endpoints) or from _sum_by over one read of the rollups (the bundle).
+def _sum_by(rows, key, *fields) -> list[tuple]:
+    totals: Dict[tuple, list] = {}
+    for row in rows:
+        row_key = key(row)
+        if row_key is None:
+            continue
+        bucket = totals.setdefault(row_key, [0] * len(fields))
+        for idx, field in enumerate(fields):
+            bucket[idx] += getattr(row, field) or 0
+    return [row_key + tuple(values) for row_key, values in totals.items()]
+
+
+def _average(score_sum, scored) -> Optional[float]:
+    return float(score_sum) / int(scored) if scored else None
+
+
+def _accuracy_item(label_key: str, label, correct, total) -> dict:
+    total_val = int(total or 0)
+    return {
+        label_key: label,
+        "errors": total_val - int(correct or 0),
+        "accuracy": round((correct or 0) / total_val * 100, 1) if total_val else 0,
+        "total": total_val,
+    }
+
+
+def _most_errors(items: list[dict], label_key: str, limit: int) -> list[dict]:
+    return sorted(items, key=lambda x: (-x["errors"], str(x[label_key])))[:limit]
+
+
+def _lowest_average(items: list[dict], label_key: str, limit: int) -> list[dict]:
+    return sorted(items, key=lambda x: (x["average_score"], str(x[label_key])))[:limit]
+
+
+def _subject_breakdown_section(objective_rows, productive_rows, answer_averages) -> dict:
+    # objective_rows: (paper_type, question_type, correct, total)
+    # productive_rows: (paper_type, score_sum, scored, submissions)
+    by_question_type = []
+    correct_by_type: Dict[str, int] = {}
+    total_by_type: Dict[str, int] = {}
+    for row_type, question_type, correct, total in objective_rows:
+        row_type = str(row_type or "reading")
+        correct = int(correct or 0)
+        total = int(total or 0)
+        by_question_type.append({
+            "paper_type": row_type,
+            "question_type": str(question_type or "unknown"),
+            "accuracy": round((correct / total) * 100, 1) if total else 0.0,
+            "correct": correct,
+            "total": total,
+        })
+        correct_by_type[row_type] = correct_by_type.get(row_type, 0) + correct
+        total_by_type[row_type] = total_by_type.get(row_type, 0) + total
+
+    def accuracy(correct: int, total: int) -> float:
+        return round((correct / total) * 100, 1) if total else 0.0
+
+    productive_by_type = []
+    weighted_sum = 0.0
+    weighted_count = 0
+    for row_type, score_sum, scored, submissions in productive_rows:
+        score_sum = float(score_sum or 0.0)
+        scored = int(scored or 0)
+        productive_by_type.append({
+            "paper_type": row_type,
+            "average_score": round(_average(score_sum, scored) or 0.0, 1),
+            "submissions": int(submissions or 0),
+        })
+        weighted_sum += score_sum
+        weighted_count += scored
+
+    rubric_averages, metric_averages = answer_averages
+    return {
+        "objective": {
+            "overall_accuracy": accuracy(sum(correct_by_type.values()), sum(total_by_type.values())),
+            "reading_accuracy": accuracy(correct_by_type.get("reading", 0), total_by_type.get("reading", 0)),
+            "listening_accuracy": accuracy(correct_by_type.get("listening", 0), total_by_type.get("listening", 0)),
+            "by_question_type": sorted(by_question_type, key=lambda x: (x["paper_type"], x["question_type"])),
+        },
+        "productive": {
+            "overall_average_score": round(weighted_sum / weighted_count, 1) if weighted_count else 0.0,
+            "by_paper_type": sorted(productive_by_type, key=lambda x: x["paper_type"]),
+            "rubric": rubric_averages,
+            "metrics": metric_averages,
+        },
+    }
+
+
+def _productive_answer_averages(
+    db: Session,
+    current_user: User,
+    class_id: Optional[int] = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    answer_rows = (
+        _teacher_answer_query(
+            db,
+            current_user,
+            class_id=class_id,
+            paper_type=paper_type,
+            paper_id=paper_id,
+            student_id=student_id,
+        )
+        .join(AnswerScore, AnswerScore.answer_id == Answer.id)
+        .with_entities(AnswerScore.kind, AnswerScore.name, func.avg(AnswerScore.value))
+        .filter(Paper.paper_type.in_(PRODUCTIVE_PAPER_TYPES))
+        .group_by(AnswerScore.kind, AnswerScore.name)
+        .all()
+    )
+    averages = {(kind, name): float(value or 0.0) for kind, name, value in answer_rows}
+
+    rubric_averages = {key: round(averages.get(("rubric", key), 0.0), 3) for key in RUBRIC_KEYS}
+    metric_averages = [
+        {"key": key, "value": round(averages.get(("metric", key), 0.0), 4)}
+        for key in METRIC_KEYS
+    ]
+    return rubric_averages, metric_averages
+
+
+def _lowest_average_items(rows, id_key: str, label_key: str, count_key: str, limit: int) -> list[dict]:
+    # rows: (id, label, score_sum, scored, submissions)
+    return _lowest_average([
+        {
+            id_key: row_id,
+            label_key: label,
+            "average_score": round(_average(score_sum, scored), 1) if scored else 0,
+            count_key: int(submissions or 0),
+        }
+        for row_id, label, score_sum, scored, submissions in rows
+    ], label_key, limit)
+
+
+def _weak_areas_section(skill_rows, type_rows, paper_rows, students, student_skill_rows, limit: int) -> dict:
+    # skill_rows/type_rows: (label, correct, total); paper_rows: (id, title, score_sum,
+    # scored, submissions); student_skill_rows: (student_id, skill, correct, total)
+    skills = _most_errors([_accuracy_item("skill", *row) for row in skill_rows], "skill", limit)
+    question_types = _most_errors([_accuracy_item("question_type", *row) for row in type_rows], "question_type", limit)
+    papers = _lowest_average_items(paper_rows, "paper_id", "title", "submissions", limit)
+
+    weak_skills_by_student: Dict[int, list] = {}
+    for sid, skill, correct, total in student_skill_rows:
+        weak_skills_by_student.setdefault(sid, []).append(_accuracy_item("skill", skill, correct, total))
+    for student in students:
+        student["weak_skills"] = _most_errors(weak_skills_by_student.get(student["student_id"], []), "skill", 3)
+
+    return {
+        "skills": skills,
+        "question_types": question_types,
+        "papers": papers,
+        "students": students
+    }
+
+
+def _replica_max_age(db: Session) -> Optional[int]:
+    # A replica read can miss a write that already invalidated the cache, so do not
+    # keep it longer than the replica is allowed to lag.
+    return READ_REPLICA_MAX_LAG_SECONDS if is_replica_session(db) else None
+
+
+def _cache_filters(**filters):
+    # Equivalent filter spellings share one cache entry.
+    if "class_id" in filters:
+        filters["class_id"] = filters["class_id"] or None
+    if "paper_type" in filters:
+        filters["paper_type"] = _normalize_paper_type(filters["paper_type"])
+    return filters
+
+
+def _rollup_average():
+    return func.sum(AnalyticsSubmissionRollup.score_sum) / func.nullif(func.sum(AnalyticsSubmissionRollup.scored), 0)
+
+
 def _csv_write_section(writer: csv.writer, title: str, headers: list[str], rows: list[list[object]]):
     writer.writerow([title])
     writer.writerow(headers)
@@ -265,31 +483,31 @@ def _build_simple_text_pdf(lines: list[str]) -> bytes:
     )
     return bytes(content)
 
-@router.get("/overview")
-async def get_analytics_overview(
+
+def _build_overview(
+    db: Session,
+    current_user: User,
     class_id: int = None,
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
 ):
-    """
-    Get high-level statistics for the dashboard.
-    """
-    _require_teacher(current_user)
-
-    query = _teacher_submission_query(
+    row = _rollup_query(
         db,
+        AnalyticsSubmissionRollup,
         current_user,
         class_id=class_id,
         paper_type=paper_type,
         paper_id=paper_id,
         student_id=student_id,
-    )
-    total_submissions = query.count()
-    avg_score = query.with_entities(func.avg(Submission.score)).scalar() or 0.0
-    active_students = query.with_entities(Submission.student_id).distinct().count()
+    ).with_entities(
+        func.sum(AnalyticsSubmissionRollup.submissions),
+        _rollup_average(),
+        func.count(func.distinct(AnalyticsSubmissionRollup.student_id)),
+    ).one()
+    total_submissions = int(row[0] or 0)
+    avg_score = row[1] or 0.0
+    active_students = int(row[2] or 0)
 
     return {
         "total_submissions": total_submissions,
@@ -298,185 +516,118 @@ async def get_analytics_overview(
     }
 
 
-@router.get("/subject-breakdown")
-async def get_subject_breakdown(
+@router.get("/overview")
+async def get_analytics_overview(
     class_id: int = None,
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
 ):
+    """
+    Get high-level statistics for the dashboard.
+    """
     _require_teacher(current_user)
-    objective_types = {"reading", "listening"}
-    productive_types = {"writing", "speaking"}
-    paper_type_expr = func.coalesce(Paper.paper_type, "reading")
-    objective_filter = or_(
-        Paper.paper_type.in_(tuple(objective_types)),
-        Paper.paper_type.is_(None),
+    filters = _cache_filters(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "overview",
+        filters,
+        lambda: _build_overview(db, current_user, **filters),
+        max_age=_replica_max_age(db),
     )
-    productive_filter = Paper.paper_type.in_(tuple(productive_types))
 
+
+def _build_subject_breakdown(
+    db: Session,
+    current_user: User,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    filters = dict(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
     objective_rows = (
-        _teacher_answer_query(
-            db,
-            current_user,
-            class_id=class_id,
-            paper_type=paper_type,
-            paper_id=paper_id,
-            student_id=student_id,
+        _rollup_query(db, AnalyticsAnswerRollup, current_user, **filters)
+        .with_entities(
+            AnalyticsAnswerRollup.paper_type,
+            AnalyticsAnswerRollup.question_type,
+            func.sum(AnalyticsAnswerRollup.correct),
+            func.sum(AnalyticsAnswerRollup.answers),
         )
+        .filter(AnalyticsAnswerRollup.paper_type.in_(OBJECTIVE_PAPER_TYPES))
+        .group_by(AnalyticsAnswerRollup.paper_type, AnalyticsAnswerRollup.question_type)
+        .all()
+    )
+    productive_rows = (
+        _rollup_query(db, AnalyticsSubmissionRollup, current_user, **filters)
         .with_entities(
-            paper_type_expr.label("paper_type"),
-            Question.question_type.label("question_type"),
-            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-            func.count(Answer.id).label("total"),
+            AnalyticsSubmissionRollup.paper_type,
+            func.sum(AnalyticsSubmissionRollup.score_sum),
+            func.sum(AnalyticsSubmissionRollup.scored),
+            func.sum(AnalyticsSubmissionRollup.submissions),
         )
-        .filter(objective_filter)
-        .group_by("paper_type", Question.question_type)
+        .filter(AnalyticsSubmissionRollup.paper_type.in_(PRODUCTIVE_PAPER_TYPES))
+        .group_by(AnalyticsSubmissionRollup.paper_type)
         .all()
     )
+    return _subject_breakdown_section(objective_rows, productive_rows, _productive_answer_averages(db, current_user, **filters))
 
-    by_question_type = []
-    overall_correct = 0
-    overall_total = 0
-    reading_correct = 0
-    reading_total = 0
-    listening_correct = 0
-    listening_total = 0
-
-    for row in objective_rows:
-        paper_type = str(getattr(row, "paper_type", "") or "reading")
-        question_type = str(getattr(row, "question_type", "") or "unknown")
-        correct = int(getattr(row, "correct", 0) or 0)
-        total = int(getattr(row, "total", 0) or 0)
-        accuracy = round((correct / total) * 100, 1) if total else 0.0
-        by_question_type.append({
-            "paper_type": paper_type,
-            "question_type": question_type,
-            "accuracy": accuracy,
-            "correct": correct,
-            "total": total,
-        })
-        overall_correct += correct
-        overall_total += total
-        if paper_type == "reading":
-            reading_correct += correct
-            reading_total += total
-        elif paper_type == "listening":
-            listening_correct += correct
-            listening_total += total
 
-    productive_by_type = []
-    productive_score_weighted_sum = 0.0
-    productive_score_weighted_count = 0
-    productive_base_query = _teacher_submission_query(
-        db,
-        current_user,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-    ).with_entities(
-        Paper.id.label("paper_id"),
-        paper_type_expr.label("paper_type"),
-        Submission.score.label("score"),
+@router.get("/subject-breakdown")
+async def get_subject_breakdown(
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_teacher(current_user)
+    filters = _cache_filters(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "subject_breakdown",
+        filters,
+        lambda: _build_subject_breakdown(db, current_user, **filters),
+        max_age=_replica_max_age(db),
     )
-    productive_submission_rows = productive_base_query.filter(productive_filter).all()
-    productive_aggregates: Dict[str, Dict[str, Union[float, int]]] = {}
-    for row in productive_submission_rows:
-        p_type = str(getattr(row, "paper_type", "") or "writing")
-        score = getattr(row, "score", None)
-        bucket = productive_aggregates.setdefault(p_type, {"sum_score": 0.0, "score_count": 0, "submissions": 0})
-        bucket["submissions"] = int(bucket["submissions"]) + 1
-        if isinstance(score, (int, float)):
-            bucket["sum_score"] = float(bucket["sum_score"]) + float(score)
-            bucket["score_count"] = int(bucket["score_count"]) + 1
-
-    for p_type, agg in productive_aggregates.items():
-        score_count = int(agg["score_count"])
-        submissions = int(agg["submissions"])
-        avg_score = (float(agg["sum_score"]) / score_count) if score_count else 0.0
-        productive_by_type.append({
-            "paper_type": p_type,
-            "average_score": round(avg_score, 1),
-            "submissions": submissions,
-        })
-        productive_score_weighted_sum += float(agg["sum_score"])
-        productive_score_weighted_count += score_count
 
-    answer_rows = (
-        _teacher_answer_query(
+
+def _build_weak_skills(
+    db: Session,
+    current_user: User,
+    limit: int = 5,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    error_count = func.sum(AnalyticsAnswerRollup.incorrect)
+    results = (
+        _rollup_query(
             db,
+            AnalyticsAnswerRollup,
             current_user,
             class_id=class_id,
             paper_type=paper_type,
             paper_id=paper_id,
             student_id=student_id,
         )
-        .with_entities(
-            Answer.rubric_scores,
-            Answer.writing_metrics,
-            paper_type_expr.label("paper_type"),
-        )
-        .filter(productive_filter)
+        .with_entities(AnalyticsAnswerRollup.skill_tag, error_count.label("error_count"))
+        .filter(AnalyticsAnswerRollup.skill_tag != "")
+        .group_by(AnalyticsAnswerRollup.skill_tag)
+        .having(error_count > 0)
+        .order_by(desc("error_count"), AnalyticsAnswerRollup.skill_tag)
+        .limit(limit)
         .all()
     )
 
-    rubric_keys = ["content", "language", "organization", "overall"]
-    rubric_totals: Dict[str, float] = {k: 0.0 for k in rubric_keys}
-    rubric_counts: Dict[str, int] = {k: 0 for k in rubric_keys}
-    metric_keys = [
-        "LD", "TTR", "MSTTR",
-        "MLS", "MLT", "C/S",
-        "Temporal_token_density", "Expansion_token_density", "Comparison_token_density",
-    ]
-    metric_totals: Dict[str, float] = {k: 0.0 for k in metric_keys}
-    metric_counts: Dict[str, int] = {k: 0 for k in metric_keys}
-
-    for row in answer_rows:
-        rubric = getattr(row, "rubric_scores", None)
-        if isinstance(rubric, dict):
-            for key in rubric_keys:
-                value = rubric.get(key)
-                if isinstance(value, (int, float)):
-                    rubric_totals[key] += float(value)
-                    rubric_counts[key] += 1
-
-        metrics = getattr(row, "writing_metrics", None)
-        if isinstance(metrics, dict):
-            for key in metric_keys:
-                value = metrics.get(key)
-                if isinstance(value, (int, float)):
-                    metric_totals[key] += float(value)
-                    metric_counts[key] += 1
-
-    rubric_averages = {
-        key: round((rubric_totals[key] / rubric_counts[key]), 3) if rubric_counts[key] else 0.0
-        for key in rubric_keys
-    }
-    metric_averages = [
-        {
-            "key": key,
-            "value": round((metric_totals[key] / metric_counts[key]), 4) if metric_counts[key] else 0.0,
-        }
-        for key in metric_keys
-    ]
+    return [{"skill": skill, "errors": int(count)} for skill, count in results]
 
-    return {
-        "objective": {
-            "overall_accuracy": round((overall_correct / overall_total) * 100, 1) if overall_total else 0.0,
-            "reading_accuracy": round((reading_correct / reading_total) * 100, 1) if reading_total else 0.0,
-            "listening_accuracy": round((listening_correct / listening_total) * 100, 1) if listening_total else 0.0,
-            "by_question_type": sorted(by_question_type, key=lambda x: (x["paper_type"], x["question_type"])),
-        },
-        "productive": {
-            "overall_average_score": round((productive_score_weighted_sum / productive_score_weighted_count), 1) if productive_score_weighted_count else 0.0,
-            "by_paper_type": sorted(productive_by_type, key=lambda x: x["paper_type"]),
-            "rubric": rubric_averages,
-            "metrics": metric_averages,
-        },
-    }
 
 @router.get("/weak-skills")
 async def get_weak_skills(
@@ -485,79 +636,50 @@ async def get_weak_skills(
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Identify the skill tags with the most incorrect answers.
     """
     _require_teacher(current_user)
-
-    results = (
-        db.query(Question.skill_tag, func.count(Answer.id).label("error_count"))
-        .join(Answer, Answer.question_id == Question.id)
-        .join(Submission, Submission.id == Answer.submission_id)
-        .join(Paper, Paper.id == Question.paper_id)
-        .filter(Answer.is_correct == False)
-        .filter(Question.skill_tag != None)
-    )
-
-    results = _apply_teacher_filters(
-        results,
-        db,
-        current_user,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-    )
-
-    results = (
-        results.group_by(Question.skill_tag)
-        .order_by(desc("error_count"))
-        .limit(limit)
-        .all()
+    filters = _cache_filters(limit=limit, class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "weak_skills",
+        filters,
+        lambda: _build_weak_skills(db, current_user, **filters),
+        max_age=_replica_max_age(db),
     )
 
-    return [{"skill": skill, "errors": count} for skill, count in results]
 
-@router.get("/student-performance")
-async def get_student_performance(
+def _build_student_performance(
+    db: Session,
+    current_user: User,
     class_id: int = None,
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
 ):
-    """
-    Get average performance per student to spot struggling students.
-    """
-    _require_teacher(current_user)
-
     results = (
-        db.query(
+        _rollup_query(
+            db,
+            AnalyticsSubmissionRollup,
+            current_user,
+            class_id=class_id,
+            paper_type=paper_type,
+            paper_id=paper_id,
+            student_id=student_id,
+        )
+        .join(User, AnalyticsSubmissionRollup.student_id == User.id)
+        .with_entities(
             User.username,
-            func.avg(Submission.score).label("avg_score"),
-            func.count(Submission.id).label("exams_taken")
+            _rollup_average().label("avg_score"),
+            func.sum(AnalyticsSubmissionRollup.submissions).label("exams_taken"),
         )
-        .join(Submission, Submission.student_id == User.id)
-        .join(Paper, Submission.paper_id == Paper.id)
-    )
-
-    results = _apply_teacher_filters(
-        results,
-        db,
-        current_user,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-    )
-
-    results = (
-        results.group_by(User.id, User.username)
-        .order_by(func.avg(Submission.score).asc())
+        .group_by(User.id, User.username)
+        .order_by(_rollup_average().asc().nullsfirst(), User.username)
         .limit(10)
         .all()
     )
@@ -566,194 +688,594 @@ async def get_student_performance(
         {
             "student": username,
             "average_score": round(score, 1) if score else 0,
-            "exams_taken": count
+            "exams_taken": int(count or 0)
         }
         for username, score, count in results
     ]
 
-@router.get("/weak-areas")
-async def get_weak_areas(
-    limit: int = 5,
+
+@router.get("/student-performance")
+async def get_student_performance(
     class_id: int = None,
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
-    Get richer weak-area insights for teachers.
+    Get average performance per student to spot struggling students.
     """
     _require_teacher(current_user)
+    filters = _cache_filters(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "student_performance",
+        filters,
+        lambda: _build_student_performance(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
 
-    base_answers = _teacher_answer_query(
-        db,
-        current_user,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-    )
+
+def _build_weak_areas(
+    db: Session,
+    current_user: User,
+    limit: int = 5,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    filters = dict(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    base_answers = _rollup_query(db, AnalyticsAnswerRollup, current_user, **filters)
+    answer_totals = (func.sum(AnalyticsAnswerRollup.correct), func.sum(AnalyticsAnswerRollup.answers))
 
     skill_rows = (
         base_answers
-        .with_entities(
-            Question.skill_tag,
-            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-            func.count(Answer.id).label("total"),
-        )
-        .filter(Question.skill_tag != None)
-        .group_by(Question.skill_tag)
+        .with_entities(AnalyticsAnswerRollup.skill_tag, *answer_totals)
+        .filter(AnalyticsAnswerRollup.skill_tag != "")
+        .group_by(AnalyticsAnswerRollup.skill_tag)
         .all()
     )
-
-    skills = []
-    for skill, correct, total in skill_rows:
-        total_val = int(total or 0)
-        errors = total_val - int(correct or 0)
-        accuracy = round((correct or 0) / total_val * 100, 1) if total_val else 0
-        skills.append({
-            "skill": skill,
-            "errors": errors,
-            "accuracy": accuracy,
-            "total": total_val
-        })
-    skills = sorted(skills, key=lambda x: x["errors"], reverse=True)[:limit]
-
     type_rows = (
         base_answers
-        .with_entities(
-            Question.question_type,
-            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-            func.count(Answer.id).label("total"),
-        )
-        .filter(Question.question_type != None)
-        .group_by(Question.question_type)
+        .with_entities(AnalyticsAnswerRollup.question_type, *answer_totals)
+        .filter(AnalyticsAnswerRollup.question_type != "")
+        .group_by(AnalyticsAnswerRollup.question_type)
         .all()
     )
 
-    question_types = []
-    for q_type, correct, total in type_rows:
-        total_val = int(total or 0)
-        errors = total_val - int(correct or 0)
-        accuracy = round((correct or 0) / total_val * 100, 1) if total_val else 0
-        question_types.append({
-            "question_type": q_type,
-            "errors": errors,
-            "accuracy": accuracy,
-            "total": total_val
-        })
-    question_types = sorted(question_types, key=lambda x: x["errors"], reverse=True)[:limit]
-
-    submission_query = _teacher_submission_query(
-        db,
-        current_user,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
+    submission_query = _rollup_query(db, AnalyticsSubmissionRollup, current_user, **filters)
+    submission_totals = (
+        func.sum(AnalyticsSubmissionRollup.score_sum),
+        func.sum(AnalyticsSubmissionRollup.scored),
+        func.sum(AnalyticsSubmissionRollup.submissions),
     )
     paper_rows = (
         submission_query
+        .join(Paper, AnalyticsSubmissionRollup.paper_id == Paper.id)
+        .with_entities(Paper.id, Paper.title, *submission_totals)
+        .group_by(Paper.id, Paper.title)
+        .all()
+    )
+    student_rows = (
+        submission_query
+        .join(User, AnalyticsSubmissionRollup.student_id == User.id)
+        .with_entities(User.id, User.username, *submission_totals)
+        .group_by(User.id, User.username)
+        .all()
+    )
+
+    # Only the weakest students get a per-skill breakdown.
+    students = _lowest_average_items(student_rows, "student_id", "student", "exams_taken", limit)
+    weakest_ids = [student["student_id"] for student in students]
+    student_skill_rows = []
+    if weakest_ids:
+        student_skill_rows = (
+            base_answers
+            .with_entities(AnalyticsAnswerRollup.student_id, AnalyticsAnswerRollup.skill_tag, *answer_totals)
+            .filter(AnalyticsAnswerRollup.student_id.in_(weakest_ids))
+            .filter(AnalyticsAnswerRollup.skill_tag != "")
+            .group_by(AnalyticsAnswerRollup.student_id, AnalyticsAnswerRollup.skill_tag)
+            .all()
+        )
+
+    return _weak_areas_section(skill_rows, type_rows, paper_rows, students, student_skill_rows, limit)
+
+
+@router.get("/weak-areas")
+async def get_weak_areas(
+    limit: int = 5,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get richer weak-area insights for teachers.
+    """
+    _require_teacher(current_user)
+    filters = _cache_filters(limit=limit, class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "weak_areas",
+        filters,
+        lambda: _build_weak_areas(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
+
+
+def _build_bundle(
+    db: Session,
+    current_user: User,
+    limit: int = 5,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    filters = dict(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    # One read of each filtered rollup; every section is aggregated from these rows.
+    submission_rows = (
+        _rollup_query(db, AnalyticsSubmissionRollup, current_user, **filters)
+        .outerjoin(Paper, AnalyticsSubmissionRollup.paper_id == Paper.id)
+        .outerjoin(User, AnalyticsSubmissionRollup.student_id == User.id)
         .with_entities(
-            Paper.id,
+            AnalyticsSubmissionRollup.paper_id,
             Paper.title,
-            func.avg(Submission.score).label("avg_score"),
-            func.count(Submission.id).label("submissions"),
+            AnalyticsSubmissionRollup.student_id,
+            User.username,
+            AnalyticsSubmissionRollup.paper_type,
+            AnalyticsSubmissionRollup.submissions,
+            AnalyticsSubmissionRollup.score_sum,
+            AnalyticsSubmissionRollup.scored,
+        )
+        .all()
+    )
+    answer_rows = (
+        _rollup_query(db, AnalyticsAnswerRollup, current_user, **filters)
+        .with_entities(
+            AnalyticsAnswerRollup.student_id,
+            AnalyticsAnswerRollup.paper_type,
+            AnalyticsAnswerRollup.skill_tag,
+            AnalyticsAnswerRollup.question_type,
+            AnalyticsAnswerRollup.answers,
+            AnalyticsAnswerRollup.correct,
+            AnalyticsAnswerRollup.incorrect,
         )
-        .group_by(Paper.id, Paper.title)
         .all()
     )
+    submission_fields = ("score_sum", "scored", "submissions")
+
+    total_score = sum(row.score_sum or 0.0 for row in submission_rows)
+    total_scored = sum(row.scored or 0 for row in submission_rows)
+    overview = {
+        "total_submissions": sum(row.submissions or 0 for row in submission_rows),
+        "average_score": round(_average(total_score, total_scored) or 0.0, 1),
+        "active_students": len({row.student_id for row in submission_rows}),
+    }
 
-    papers = [
-        {
-            "paper_id": pid,
-            "title": title,
-            "average_score": round(avg_score, 1) if avg_score is not None else 0,
-            "submissions": int(submissions or 0)
-        }
-        for pid, title, avg_score, submissions in paper_rows
+    student_totals = _sum_by(
+        submission_rows,
+        lambda r: (r.student_id, r.username) if r.username is not None else None,
+        *submission_fields,
+    )
+    student_averages = sorted(
+        ((username, _average(score_sum, scored), submissions) for _, username, score_sum, scored, submissions in student_totals),
+        key=lambda x: (x[1] is not None, x[1] or 0.0, x[0]),
+    )
+    student_performance = [
+        {"student": username, "average_score": round(score, 1) if score else 0, "exams_taken": int(count)}
+        for username, score, count in student_averages[:10]
     ]
-    papers = sorted(papers, key=lambda x: x["average_score"])[:limit]
 
-    student_rows = (
-        submission_query
-        .with_entities(
-            User.id,
-            User.username,
-            func.avg(Submission.score).label("avg_score"),
-            func.count(Submission.id).label("exams_taken"),
+    skill_errors = _sum_by(answer_rows, lambda r: (r.skill_tag,) if r.skill_tag else None, "incorrect")
+    weak_skills = [
+        {"skill": skill, "errors": int(errors)}
+        for skill, errors in sorted(skill_errors, key=lambda x: (-x[1], x[0]))
+        if errors > 0
+    ][:limit]
+
+    students = _lowest_average_items(student_totals, "student_id", "student", "exams_taken", limit)
+    weakest_ids = {student["student_id"] for student in students}
+    weak_areas = _weak_areas_section(
+        _sum_by(answer_rows, lambda r: (r.skill_tag,) if r.skill_tag else None, "correct", "answers"),
+        _sum_by(answer_rows, lambda r: (r.question_type,) if r.question_type else None, "correct", "answers"),
+        _sum_by(submission_rows, lambda r: (r.paper_id, r.title) if r.title is not None else None, *submission_fields),
+        students,
+        _sum_by(
+            answer_rows,
+            lambda r: (r.student_id, r.skill_tag) if r.skill_tag and r.student_id in weakest_ids else None,
+            "correct",
+            "answers",
+        ),
+        limit,
+    )
+
+    subject_breakdown = _subject_breakdown_section(
+        _sum_by(
+            answer_rows,
+            lambda r: (r.paper_type, r.question_type) if r.paper_type in OBJECTIVE_PAPER_TYPES else None,
+            "correct",
+            "answers",
+        ),
+        _sum_by(
+            submission_rows,
+            lambda r: (r.paper_type,) if r.paper_type in PRODUCTIVE_PAPER_TYPES else None,
+            *submission_fields,
+        ),
+        _productive_answer_averages(db, current_user, **filters),
+    )
+
+    return {
+        "overview": overview,
+        "subject_breakdown": subject_breakdown,
+        "weak_skills": weak_skills,
+        "student_performance": student_performance,
+        "weak_areas": weak_areas,
+    }
+
+
+@router.get("/bundle")
+async def get_analytics_bundle(
+    limit: int = 5,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Every dashboard section in one response, computed from a single read of the rollups.
+    """
+    _require_teacher(current_user)
+    filters = _cache_filters(limit=limit, class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "bundle",
+        filters,
+        lambda: _build_bundle(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
+
+
+def _round_or_none(value, digits: int):
+    return round(value, digits) if value is not None else None
+
+
+def _build_distribution(
+    db: Session,
+    current_user: User,
+    bins: int = 10,
+    class_id: Optional[int] = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+):
+    # One row per student: their average over the filtered papers, read from the rollup.
+    rows = (
+        _rollup_query(
+            db,
+            AnalyticsSubmissionRollup,
+            current_user,
+            class_id=class_id,
+            paper_type=paper_type,
+            paper_id=paper_id,
         )
-        .join(User, Submission.student_id == User.id)
+        .join(User, AnalyticsSubmissionRollup.student_id == User.id)
+        .with_entities(User.id, User.username, _rollup_average().label("avg_score"))
         .group_by(User.id, User.username)
+        .having(func.sum(AnalyticsSubmissionRollup.scored) > 0)
+        .order_by(User.id)
         .all()
     )
+    scores = [float(score) for _, _, score in rows]
+    stats = cohort_statistics(scores, bins=bins)
 
     students = [
         {
-            "student_id": sid,
+            "student_id": user_id,
             "student": username,
-            "average_score": round(avg_score, 1) if avg_score is not None else 0,
-            "exams_taken": int(exams_taken or 0)
+            "average_score": round(score, 1),
+            "z_score": round(z_score, 2),
+            "percentile_rank": round(rank, 1),
         }
-        for sid, username, avg_score, exams_taken in student_rows
+        for (user_id, username, _), score, z_score, rank in zip(
+            rows, scores, stats["z_scores"], stats["percentile_ranks"]
+        )
     ]
-    students = sorted(students, key=lambda x: x["average_score"])[:limit]
+    return {
+        "count": stats["count"],
+        "mean": _round_or_none(stats["mean"], 1),
+        "std": _round_or_none(stats["std"], 2),
+        "min": _round_or_none(stats["min"], 1),
+        "max": _round_or_none(stats["max"], 1),
+        "median": _round_or_none(stats["percentiles"]["p50"], 1),
+        "percentiles": {key: _round_or_none(value, 1) for key, value in stats["percentiles"].items()},
+        "histogram": stats["histogram"],
+        "students": sorted(students, key=lambda item: (item["percentile_rank"], item["student"] or "")),
+    }
 
-    student_ids = [student["student_id"] for student in students]
-    weak_skills_by_student = {}
-    if student_ids:
-        student_skill_rows = (
-            base_answers
-            .with_entities(
-                Submission.student_id,
-                Question.skill_tag,
-                func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-                func.count(Answer.id).label("total"),
-            )
-            .filter(Submission.student_id.in_(student_ids))
-            .filter(Question.skill_tag != None)
-            .group_by(Submission.student_id, Question.skill_tag)
-            .all()
-        )
 
-        for student_id, skill, correct, total in student_skill_rows:
-            total_val = int(total or 0)
-            errors = total_val - int(correct or 0)
-            accuracy = round((correct or 0) / total_val * 100, 1) if total_val else 0
-            weak_skills_by_student.setdefault(student_id, []).append({
-                "skill": skill,
-                "errors": errors,
-                "accuracy": accuracy,
-                "total": total_val
-            })
-
-        for student_id, skills_list in weak_skills_by_student.items():
-            weak_skills_by_student[student_id] = sorted(
-                skills_list,
-                key=lambda x: x["errors"],
-                reverse=True
-            )[:3]
+@router.get("/distribution")
+async def get_score_distribution(
+    bins: int = 10,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_teacher(current_user)
+    filters = _cache_filters(class_id=class_id, paper_type=paper_type, paper_id=paper_id)
+    filters["bins"] = max(1, min(int(bins), 50))
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "distribution",
+        filters,
+        lambda: _build_distribution(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
 
-    for student in students:
-        student["weak_skills"] = weak_skills_by_student.get(student["student_id"], [])
+
+TREND_BUCKETS = {"day": 30, "week": 26 * 7, "month": 365}  # default look-back in days
+
+
+def _bucket_start(day: date, bucket: str) -> date:
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _bucket_periods(start: date, end: date, bucket: str) -> list[date]:
+    periods = []
+    current = _bucket_start(start, bucket)
+    while current <= end:
+        periods.append(current)
+        if bucket == "month":
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if bucket == "week" else 1)
+    return periods
+
+
+def _build_trends(
+    db: Session,
+    current_user: User,
+    bucket: str,
+    start: date,
+    end: date,
+    class_id: Optional[int] = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+):
+    filters = dict(class_id=class_id, paper_type=paper_type, paper_id=paper_id, student_id=student_id)
+    score_rows = (
+        _rollup_query(db, AnalyticsDailySubmissionRollup, current_user, **filters)
+        .filter(AnalyticsDailySubmissionRollup.day >= start, AnalyticsDailySubmissionRollup.day <= end)
+        .with_entities(
+            AnalyticsDailySubmissionRollup.day,
+            func.sum(AnalyticsDailySubmissionRollup.submissions).label("submissions"),
+            func.sum(AnalyticsDailySubmissionRollup.score_sum).label("score_sum"),
+            func.sum(AnalyticsDailySubmissionRollup.scored).label("scored"),
+        )
+        .group_by(AnalyticsDailySubmissionRollup.day)
+        .all()
+    )
+    skill_rows = (
+        _rollup_query(db, AnalyticsDailySkillRollup, current_user, **filters)
+        .filter(AnalyticsDailySkillRollup.day >= start, AnalyticsDailySkillRollup.day <= end)
+        .with_entities(
+            AnalyticsDailySkillRollup.day,
+            AnalyticsDailySkillRollup.skill_tag,
+            func.sum(AnalyticsDailySkillRollup.answers).label("answers"),
+            func.sum(AnalyticsDailySkillRollup.correct).label("correct"),
+        )
+        .group_by(AnalyticsDailySkillRollup.day, AnalyticsDailySkillRollup.skill_tag)
+        .all()
+    )
+
+    periods = _bucket_periods(start, end, bucket)
+    scores = {period: [0, 0.0, 0] for period in periods}
+    for row in score_rows:
+        totals = scores[_bucket_start(row.day, bucket)]
+        totals[0] += int(row.submissions or 0)
+        totals[1] += float(row.score_sum or 0.0)
+        totals[2] += int(row.scored or 0)
+
+    overall = {period: [0, 0] for period in periods}
+    skills: Dict[str, Dict[date, list]] = {}
+    for row in skill_rows:
+        period = _bucket_start(row.day, bucket)
+        overall[period][0] += int(row.answers or 0)
+        overall[period][1] += int(row.correct or 0)
+        if row.skill_tag:
+            totals = skills.setdefault(row.skill_tag, {p: [0, 0] for p in periods})[period]
+            totals[0] += int(row.answers or 0)
+            totals[1] += int(row.correct or 0)
+
+    def accuracy(answers: int, correct: int) -> Optional[float]:
+        return round(correct / answers * 100, 1) if answers else None
 
     return {
-        "skills": skills,
-        "question_types": question_types,
-        "papers": papers,
-        "students": students
+        "bucket": bucket,
+        "start": start,
+        "end": end,
+        "points": [
+            {
+                "period": period,
+                "submissions": scores[period][0],
+                "average_score": _round_or_none(_average(scores[period][1], scores[period][2]), 1),
+                "accuracy": accuracy(*overall[period]),
+            }
+            for period in periods
+        ],
+        "skills": [
+            {
+                "skill": skill,
+                "points": [
+                    {"period": period, "answers": answers, "accuracy": accuracy(answers, correct)}
+                    for period, (answers, correct) in series.items()
+                ],
+            }
+            for skill, series in sorted(skills.items())
+        ],
     }
 
 
-@router.get("/filter-options")
-async def get_analytics_filter_options(
+@router.get("/trends")
+async def get_trends(
+    bucket: str = "week",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
     class_id: int = None,
     paper_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     _require_teacher(current_user)
+    bucket = (bucket or "week").strip().lower()
+    if bucket not in TREND_BUCKETS:
+        raise HTTPException(status_code=400, detail="bucket must be day, week or month")
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=TREND_BUCKETS[bucket] - 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days > 366 * 5:
+        raise HTTPException(status_code=400, detail="Date range is limited to five years")
+
+    filters = _cache_filters(
+        bucket=bucket,
+        start=start,
+        end=end,
+        class_id=class_id,
+        paper_type=paper_type,
+        paper_id=paper_id,
+        student_id=student_id,
+    )
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "trends",
+        filters,
+        lambda: _build_trends(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
+
+
+# Conventional cut-offs for flagging items in classical test theory.
+ITEM_HARD_FACILITY = 0.2
+ITEM_EASY_FACILITY = 0.9
+ITEM_LOW_DISCRIMINATION = 0.2
+
+
+def _item_flags(facility: Optional[float], discrimination: Optional[float]) -> list[str]:
+    flags = []
+    if facility is not None and facility < ITEM_HARD_FACILITY:
+        flags.append("hard")
+    if facility is not None and facility > ITEM_EASY_FACILITY:
+        flags.append("easy")
+    if discrimination is not None and discrimination < ITEM_LOW_DISCRIMINATION:
+        flags.append("low_discrimination")
+    return flags
+
+
+def _build_item_analysis(
+    db: Session,
+    current_user: User,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+):
+    query = (
+        db.query(QuestionItemStat, Question.question_text, Question.question_type, Question.skill_tag, Paper.title)
+        .join(Question, Question.id == QuestionItemStat.question_id)
+        .join(Paper, Paper.id == QuestionItemStat.paper_id)
+    )
+    if current_user.role != "admin":
+        query = query.filter(QuestionItemStat.teacher_id == current_user.id)
+    normalized_type = _normalize_paper_type(paper_type)
+    if normalized_type:
+        query = query.filter(func.coalesce(Paper.paper_type, "reading") == normalized_type)
+    if paper_id is not None:
+        query = query.filter(QuestionItemStat.paper_id == paper_id)
+    rows = query.order_by(QuestionItemStat.paper_id, QuestionItemStat.question_id).all()
+
+    distractors: Dict[int, list] = {}
+    question_ids = [stat.question_id for stat, *_ in rows]
+    if question_ids:
+        option_rows = (
+            db.query(QuestionOptionStat.question_id, QuestionOptionStat.option, QuestionOptionStat.responses)
+            .filter(QuestionOptionStat.question_id.in_(question_ids))
+            .filter(QuestionOptionStat.responses > 0)
+            .order_by(QuestionOptionStat.question_id, desc(QuestionOptionStat.responses), QuestionOptionStat.option)
+            .all()
+        )
+        for question_id, option, responses in option_rows:
+            distractors.setdefault(question_id, []).append((option, int(responses)))
+
+    items = []
+    for stat, question_text, question_type, skill_tag, title in rows:
+        facility = item_facility(stat.responses, stat.correct)
+        discrimination = item_discrimination(
+            stat.responses, stat.correct, stat.score_sum, stat.score_sq_sum, stat.correct_score_sum
+        )
+        options = distractors.get(stat.question_id, [])
+        option_total = sum(count for _, count in options)
+        items.append({
+            "question_id": stat.question_id,
+            "paper_id": stat.paper_id,
+            "paper_title": title,
+            "question_text": question_text,
+            "question_type": question_type,
+            "skill_tag": skill_tag,
+            "responses": int(stat.responses),
+            "facility": _round_or_none(facility, 3),
+            "discrimination": _round_or_none(discrimination, 3),
+            "flags": _item_flags(facility, discrimination),
+            "distractors": [
+                {"option": option, "responses": count, "share": round(count / option_total, 3)}
+                for option, count in options
+            ],
+        })
+    return items
+
+
+@router.get("/item-analysis")
+async def get_item_analysis(
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_teacher(current_user)
+    filters = _cache_filters(paper_type=paper_type, paper_id=paper_id)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "item_analysis",
+        filters,
+        lambda: _build_item_analysis(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
+
+
+def _build_filter_options(
+    db: Session,
+    current_user: User,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+):
     base_submission_query = _teacher_submission_query(
         db,
         current_user,
@@ -787,6 +1309,25 @@ async def get_analytics_filter_options(
     }
 
 
+@router.get("/filter-options")
+async def get_analytics_filter_options(
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_teacher(current_user)
+    filters = _cache_filters(class_id=class_id, paper_type=paper_type)
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "filter_options",
+        filters,
+        lambda: _build_filter_options(db, current_user, **filters),
+        max_age=_replica_max_age(db),
+    )
+
+
 @router.get("/export.csv")
 async def export_analytics_csv(
     limit: int = 10,
@@ -794,36 +1335,11 @@ async def export_analytics_csv(
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     _require_teacher(current_user)
-    overview = await get_analytics_overview(
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    weak_skills = await get_weak_skills(
-        limit=limit,
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    student_performance = await get_student_performance(
-        class_id=class_id,
-        paper_type=paper_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    weak_areas = await get_weak_areas(
+    bundle = await get_analytics_bundle(
         limit=limit,
         class_id=class_id,
         paper_type=paper_type,
@@ -832,6 +1348,10 @@ async def export_analytics_csv(
         db=db,
         current_user=current_user,
     )
+    overview = bundle["overview"]
+    weak_skills = bundle["weak_skills"]
+    student_performance = bundle["student_performance"]
+    weak_areas = bundle["weak_areas"]
 
     csv_payload = _build_analytics_csv_payload(
         overview=overview,
@@ -858,37 +1378,12 @@ async def export_analytics_pdf(
     paper_type: Optional[str] = None,
     paper_id: Optional[int] = None,
     student_id: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ):
     _require_teacher(current_user)
     normalized_type = _normalize_paper_type(paper_type)
-    overview = await get_analytics_overview(
-        class_id=class_id,
-        paper_type=normalized_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    weak_skills = await get_weak_skills(
-        limit=limit,
-        class_id=class_id,
-        paper_type=normalized_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    student_performance = await get_student_performance(
-        class_id=class_id,
-        paper_type=normalized_type,
-        paper_id=paper_id,
-        student_id=student_id,
-        db=db,
-        current_user=current_user,
-    )
-    weak_areas = await get_weak_areas(
+    bundle = await get_analytics_bundle(
         limit=limit,
         class_id=class_id,
         paper_type=normalized_type,
@@ -897,6 +1392,10 @@ async def export_analytics_pdf(
         db=db,
         current_user=current_user,
     )
+    overview = bundle["overview"]
+    weak_skills = bundle["weak_skills"]
+    student_performance = bundle["student_performance"]
+    weak_areas = bundle["weak_areas"]
 
     lines = [
         "AI4School Analytics Export",
@@ -960,154 +1459,183 @@ async def export_analytics_pdf(
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-@router.get("/student-report")
-async def get_student_report(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+def _answer_export_statement(
+    db: Session,
+    current_user: User,
+    after_id: Optional[int] = None,
+    **filters,
 ):
-    if current_user.role != "student":
-        raise HTTPException(status_code=403, detail="Not authorized")
+    stmt = (
+        select(
+            Answer.id.label("answer_id"),
+            Submission.id.label("submission_id"),
+            Submission.submitted_at,
+            Submission.student_id,
+            User.username.label("student"),
+            Paper.id.label("paper_id"),
+            Paper.title.label("paper_title"),
+            func.coalesce(Paper.paper_type, "reading").label("paper_type"),
+            Question.id.label("question_id"),
+            Question.question_type,
+            Question.skill_tag,
+            Answer.answer,
+            Answer.is_correct,
+            Answer.score,
+            Answer.word_count,
+            Answer.rubric_scores,
+            Submission.score.label("submission_score"),
+        )
+        .select_from(Answer)
+        .join(Submission, Submission.id == Answer.submission_id)
+        .join(Question, Question.id == Answer.question_id)
+        .join(Paper, Paper.id == Question.paper_id)
+        .outerjoin(User, User.id == Submission.student_id)
+    )
+    stmt = _apply_teacher_filters(stmt, db, current_user, **filters)
+    # Keyset on the answer primary key: resuming never rescans exported rows.
+    if after_id is not None:
+        stmt = stmt.where(Answer.id > after_id)
+    return stmt.order_by(Answer.id)
 
-    submissions = (
-        db.query(Submission)
-        .filter(Submission.student_id == current_user.id)
-        .order_by(Submission.submitted_at.desc())
-        .all()
+
+@router.get("/export/answers.{fmt}")
+async def export_answers(
+    fmt: str,
+    after_id: Optional[int] = None,
+    class_id: int = None,
+    paper_type: Optional[str] = None,
+    paper_id: Optional[int] = None,
+    student_id: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+):
+    _require_teacher(current_user)
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=404, detail="Unsupported export format")
+    stmt = _answer_export_statement(
+        db,
+        current_user,
+        after_id=after_id,
+        class_id=class_id,
+        paper_type=paper_type,
+        paper_id=paper_id,
+        student_id=student_id,
+    )
+    filename = f"answers_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        stream_export_rows(db.get_bind(), stmt, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-    total_submissions = len(submissions)
-    avg_score = (
-        db.query(func.avg(Submission.score))
-        .filter(Submission.student_id == current_user.id)
-        .scalar()
-        or 0.0
+def _build_student_report(db: Session, student_id: int) -> dict:
+    total_submissions, avg_score = (
+        db.query(func.count(Submission.id), func.avg(Submission.score))
+        .filter(Submission.student_id == student_id)
+        .one()
     )
+    avg_score = float(avg_score or 0.0)
 
     recent = (
-        db.query(Submission, Paper)
+        db.query(Submission.id, Submission.score, Submission.submitted_at, Paper.id, Paper.title)
         .join(Paper, Submission.paper_id == Paper.id)
-        .filter(Submission.student_id == current_user.id)
-        .order_by(Submission.submitted_at.desc())
+        .filter(Submission.student_id == student_id)
+        .order_by(Submission.submitted_at.desc(), Submission.id.desc())
         .limit(5)
         .all()
     )
+    latest = recent[0][1] if recent else None
+
+    def rounded(score):
+        return round(score, 1) if score is not None else None
 
     trend = [
         {
-            "paper_id": paper.id,
-            "paper_title": paper.title,
-            "score": round(sub.score, 1) if sub.score is not None else None,
-            "submitted_at": sub.submitted_at
+            "paper_id": paper_id,
+            "paper_title": title,
+            "score": rounded(score),
+            "submitted_at": submitted_at,
         }
-        for sub, paper in reversed(recent)
+        for _, score, submitted_at, paper_id, title in reversed(recent)
     ]
 
-    weak_skills = (
-        db.query(Question.skill_tag, func.count(Answer.id).label("error_count"))
-        .join(Answer, Answer.question_id == Question.id)
-        .join(Submission, Submission.id == Answer.submission_id)
-        .filter(Submission.student_id == current_user.id)
-        .filter(Answer.is_correct == False)
-        .filter(Question.skill_tag != None)
-        .group_by(Question.skill_tag)
-        .order_by(desc("error_count"))
-        .limit(5)
-        .all()
-    )
-
-    accuracy_rows = (
+    # Skill and question-type accuracy come from the grading-time rollup ("" = untagged).
+    answer_rows = (
         db.query(
-            Question.skill_tag,
-            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-            func.count(Answer.id).label("total"),
+            AnalyticsAnswerRollup.skill_tag,
+            AnalyticsAnswerRollup.question_type,
+            func.sum(AnalyticsAnswerRollup.correct).label("correct"),
+            func.sum(AnalyticsAnswerRollup.incorrect).label("incorrect"),
+            func.sum(AnalyticsAnswerRollup.answers).label("total"),
         )
-        .join(Answer, Answer.question_id == Question.id)
-        .join(Submission, Submission.id == Answer.submission_id)
-        .filter(Submission.student_id == current_user.id)
-        .filter(Question.skill_tag != None)
-        .group_by(Question.skill_tag)
+        .filter(AnalyticsAnswerRollup.student_id == student_id)
+        .group_by(AnalyticsAnswerRollup.skill_tag, AnalyticsAnswerRollup.question_type)
         .all()
     )
+    by_skill = _sum_by(answer_rows, lambda r: (r.skill_tag,) if r.skill_tag else None, "correct", "incorrect", "total")
+    by_type = _sum_by(answer_rows, lambda r: (r.question_type,) if r.question_type else None, "correct", "total")
+
+    weak_skills = sorted(
+        [(skill, int(incorrect)) for skill, _, incorrect, _ in by_skill if incorrect],
+        key=lambda item: (-item[1], item[0]),
+    )[:5]
+    skill_accuracy = [
+        {"skill": skill, "accuracy": round(correct / total * 100, 1) if total else 0}
+        for skill, correct, _, total in sorted(by_skill)
+    ]
+    type_accuracy = [
+        {
+            "question_type": q_type,
+            "accuracy": round(correct / total * 100, 1) if total else 0,
+            "total": int(total),
+        }
+        for q_type, correct, total in sorted(by_type)
+    ]
+    weak_skill_names = [skill for skill, _ in weak_skills]
 
-    skill_accuracy = []
-    for skill, correct, total in accuracy_rows:
-        accuracy = round((correct or 0) / total * 100, 1) if total else 0
-        skill_accuracy.append({"skill": skill, "accuracy": accuracy})
-
-    type_rows = (
+    turn_counts = (
         db.query(
-            Question.question_type,
-            func.sum(case((Answer.is_correct == True, 1), else_=0)).label("correct"),
-            func.count(Answer.id).label("total"),
+            SpeakingTurn.session_id.label("session_id"),
+            func.sum(case((func.lower(SpeakingTurn.speaker_role) == "student", 1), else_=0)).label("student"),
+            func.sum(case((func.lower(SpeakingTurn.speaker_role) == "examiner", 1), else_=0)).label("examiner"),
         )
-        .join(Answer, Answer.question_id == Question.id)
-        .join(Submission, Submission.id == Answer.submission_id)
-        .filter(Submission.student_id == current_user.id)
-        .filter(Question.question_type != None)
-        .group_by(Question.question_type)
-        .all()
+        .group_by(SpeakingTurn.session_id)
+        .subquery()
     )
-
-    type_accuracy = []
-    for q_type, correct, total in type_rows:
-        accuracy = round((correct or 0) / total * 100, 1) if total else 0
-        type_accuracy.append({
-            "question_type": q_type,
-            "accuracy": accuracy,
-            "total": int(total or 0)
-        })
-
-    weak_skill_names = [skill for skill, _ in weak_skills]
-
     speaking_sessions = (
-        db.query(SpeakingSession, Paper)
+        db.query(
+            SpeakingSession.id,
+            SpeakingSession.status,
+            SpeakingSession.updated_at,
+            Paper.id,
+            Paper.title,
+            func.coalesce(turn_counts.c.student, 0),
+            func.coalesce(turn_counts.c.examiner, 0),
+        )
         .join(Paper, SpeakingSession.paper_id == Paper.id)
-        .filter(SpeakingSession.student_id == current_user.id)
+        .outerjoin(turn_counts, turn_counts.c.session_id == SpeakingSession.id)
+        .filter(SpeakingSession.student_id == student_id)
         .filter(Paper.paper_type == "speaking")
-        .order_by(SpeakingSession.updated_at.desc())
+        .order_by(SpeakingSession.updated_at.desc(), SpeakingSession.id.desc())
         .all()
     )
-    speaking_session_ids = [sess.id for sess, _ in speaking_sessions]
-    speaking_turn_rows = []
-    if speaking_session_ids:
-        speaking_turn_rows = (
-            db.query(
-                SpeakingTurn.session_id,
-                SpeakingTurn.speaker_role,
-                func.count(SpeakingTurn.id).label("count"),
-            )
-            .filter(SpeakingTurn.session_id.in_(speaking_session_ids))
-            .group_by(SpeakingTurn.session_id, SpeakingTurn.speaker_role)
-            .all()
-        )
-    speaking_turn_map = {}
-    for sid, role, count in speaking_turn_rows:
-        bucket = speaking_turn_map.setdefault(int(sid), {"student": 0, "examiner": 0})
-        key = str(role or "").lower()
-        if key == "student":
-            bucket["student"] = int(count or 0)
-        elif key == "examiner":
-            bucket["examiner"] = int(count or 0)
 
     speaking_total = len(speaking_sessions)
-    speaking_completed = sum(1 for sess, _ in speaking_sessions if (sess.status or "") == "completed")
+    speaking_completed = sum(1 for row in speaking_sessions if (row[1] or "") == "completed")
     speaking_avg_student_turns = 0.0
     if speaking_total:
-        speaking_avg_student_turns = round(
-            sum((speaking_turn_map.get(sess.id, {}).get("student", 0) or 0) for sess, _ in speaking_sessions) / speaking_total,
-            1,
-        )
+        speaking_avg_student_turns = round(sum(int(row[5] or 0) for row in speaking_sessions) / speaking_total, 1)
     speaking_recent = [
         {
-            "session_id": sess.id,
-            "paper_id": paper.id,
-            "paper_title": paper.title,
-            "status": sess.status,
-            "student_turns": speaking_turn_map.get(sess.id, {}).get("student", 0),
-            "examiner_turns": speaking_turn_map.get(sess.id, {}).get("examiner", 0),
-            "updated_at": sess.updated_at,
+            "session_id": session_id,
+            "paper_id": paper_id,
+            "paper_title": title,
+            "status": status,
+            "student_turns": int(student_turns or 0),
+            "examiner_turns": int(examiner_turns or 0),
+            "updated_at": updated_at,
         }
-        for sess, paper in speaking_sessions[:5]
+        for session_id, status, updated_at, paper_id, title, student_turns, examiner_turns in speaking_sessions[:5]
     ]
 
     summary_parts = []
@@ -1131,7 +1659,7 @@ async def get_student_report(
         "overview": {
             "average_score": round(avg_score, 1),
             "total_submissions": total_submissions,
-            "latest_score": round(submissions[0].score, 1) if submissions and submissions[0].score is not None else None
+            "latest_score": rounded(latest),
         },
         "trend": trend,
         "weak_skills": [{"skill": skill, "errors": count} for skill, count in weak_skills],
@@ -1139,12 +1667,12 @@ async def get_student_report(
         "type_accuracy": type_accuracy,
         "recent": [
             {
-                "id": sub.id,
-                "paper_title": paper.title,
-                "score": round(sub.score, 1) if sub.score is not None else None,
-                "submitted_at": sub.submitted_at
+                "id": submission_id,
+                "paper_title": title,
+                "score": rounded(score),
+                "submitted_at": submitted_at,
             }
-            for sub, paper in recent
+            for submission_id, score, submitted_at, _, title in recent
         ],
         "speaking_overview": {
             "total_sessions": speaking_total,
@@ -1155,3 +1683,21 @@ async def get_student_report(
         "speaking_recent": speaking_recent,
         "summary": " ".join(summary_parts)
     }
+
+
+@router.get("/student-report")
+async def get_student_report(
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    if current_user.role != "student":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    return cached_analytics(
+        current_user.role,
+        current_user.id,
+        "student_report",
+        {},
+        lambda: _build_student_report(db, current_user.id),
+        max_age=_replica_max_age(db),
+    )
@@ -11,6 +11,7 @@ from ..models.class_invite_code import ClassInviteCode
 from ..models.user import User
 from ..models.student_association import StudentClass
 from ..auth.jwt import get_current_user
+from ..services.analytics_cache import invalidate_class_rosters
 from ..auth.jwt import get_password_hash
 
 router = APIRouter(
@@ -335,6 +336,7 @@ def join_class_with_code(payload: JoinClassRequest, db: Session = Depends(get_db
     db.add(StudentClass(user_id=current_user.id, class_id=class_.id))
     invite.used_count += 1
     db.commit()
+    invalidate_class_rosters()
     return {"message": "Joined class", "class_id": class_.id, "class_name": class_.name}
 
 @router.get("/{class_id}/students")
@@ -372,6 +374,7 @@ def add_student(class_id: int, student: StudentAdd, db: Session = Depends(get_db
     assoc = StudentClass(user_id=user.id, class_id=class_id)
     db.add(assoc)
     db.commit()
+    invalidate_class_rosters()
     return {"message": "Student added"}
 
 
@@ -469,6 +472,8 @@ def add_students_bulk(
         added_to_class += 1
 
     db.commit()
+    if added_to_class:
+        invalidate_class_rosters()
 
     return {
         "total": len(payload.students),
@@ -508,4 +513,5 @@ def remove_student(class_id: int, student_id: int, db: Session = Depends(get_db)
         
     db.delete(assoc)
     db.commit()
+    invalidate_class_rosters()
     return {"message": "Student removed from class"}
@@ -1,23 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form
+from sqlalchemy import and_, insert, literal, or_, select
 from sqlalchemy.orm import Session
 from ..database import get_db
 from ..models.document import Document
+from ..models.document_passage import DocumentPassage
 from ..models.document_visibility import DocumentClassVisibility
 from ..models.class_model import ClassModel
 from ..models.student_association import StudentClass
 from ..models.user import User
 from ..auth.jwt import get_current_user
-import io
-import pypdf
-import pdfplumber
-import docx
+import base64
+import json
 import shutil
 import os
-import uuid
 import datetime
 from typing import Optional, List
 from pydantic import BaseModel, ConfigDict
-from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from ..services.document_extraction import enqueue_document_extraction, find_extracted_text
+from ..services.document_search import index_document, remove_from_index, search_documents
+from ..services.document_text import extract_text_from_file  # noqa: F401 - re-export
+from ..services.file_delivery import serve_file
+from ..services.passage_index import index_document_passages
+from ..services.upload_storage import (
+    DOCUMENT_BLOB_DIR,
+    UploadTooLargeError,
+    abandon_upload_blob,
+    confirm_upload_blob,
+    max_upload_bytes,
+    remove_unreferenced_blob,
+    safe_upload_filename,
+    save_upload_blob,
+)
 
 router = APIRouter(
     prefix="/documents",
@@ -37,6 +51,7 @@ class DocumentResponse(BaseModel):
     uploaded_by: int
     created_at: Optional[datetime.datetime] = None  # Add created_at
     visible: Optional[bool] = None
+    extraction_status: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -48,59 +63,6 @@ class DocumentRenameRequest(BaseModel):
 class DocumentMoveRequest(BaseModel):
     parent_id: Optional[int] = None
 
-def extract_text_from_file(file_content: bytes, filename: str) -> str:
-    text = ""
-    if filename.endswith(".pdf"):
-        # 1. Try pypdf
-        try:
-            pdf_reader = pypdf.PdfReader(io.BytesIO(file_content))
-            for page in pdf_reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text += extracted + "\n"
-        except Exception as e:
-            print(f"PyPDF extraction failed: {e}")
-            
-        # 2. Key Check: If pypdf failed or returned little text, try pdfplumber
-        if len(text.strip()) < 50:
-            try:
-                 with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                     plumber_text = ""
-                     for page in pdf.pages:
-                         plumber_text += (page.extract_text() or "") + "\n"
-                     
-                     if len(plumber_text.strip()) > len(text.strip()):
-                         text = plumber_text
-            except Exception as e:
-                print(f"PDFPlumber extraction failed: {e}")
-            
-    elif filename.endswith(".docx"):
-        try:
-            doc = docx.Document(io.BytesIO(file_content))
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-        except Exception:
-            return ""
-            
-    elif filename.endswith(".txt"):
-        try:
-            text = file_content.decode("utf-8")
-        except:
-             return ""
-    
-    return text.strip()
-
-def normalize_extracted_text(text: str) -> str:
-    if not text:
-        return ""
-    normalized = text.replace("\r\n", "\n").replace("\r", "\n")
-    normalized = normalized.replace("-\n", "")
-    paragraphs = [p.strip() for p in normalized.split("\n\n") if p.strip()]
-    cleaned_paragraphs = []
-    for paragraph in paragraphs:
-        cleaned_paragraphs.append(" ".join(paragraph.splitlines()))
-    return "\n\n".join(cleaned_paragraphs).strip()
-
 @router.post("/create_folder")
 def create_folder(
     folder: FolderCreate, 
@@ -132,51 +94,142 @@ async def upload_document(
     if current_user.role != "teacher" and current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only teachers can upload documents")
     
-    content_bytes = await file.read()
-
     # Save file to disk
-    upload_dir = "uploads"
+    upload_dir = DOCUMENT_BLOB_DIR
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir)
-        
-    unique_filename = f"{uuid.uuid4()}_{file.filename}"
-    file_path = os.path.join(upload_dir, unique_filename)
-    
-    with open(file_path, "wb") as f:
-        f.write(content_bytes)
 
-    extracted_text = extract_text_from_file(content_bytes, file.filename)
-    extracted_text = normalize_extracted_text(extracted_text)
-    
-    if not extracted_text:
-        extracted_text = None
-    
-    new_doc = Document(
-        title=(display_name.strip() if display_name and display_name.strip() else file.filename),
-        content=extracted_text,
-        file_path=file_path, # Add path
-        uploaded_by=current_user.id,
-        parent_id=parent_id
-    )
-    db.add(new_doc)
-    db.commit()
+    original_name = safe_upload_filename(file.filename)
+    try:
+        stored = await run_in_threadpool(
+            save_upload_blob,
+            file.file,
+            original_name,
+            max_upload_bytes("MAX_DOCUMENT_UPLOAD_BYTES", 100 * 1024 * 1024),
+            upload_dir,
+        )
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+
+    # Text is extracted off the request path; content stays empty until the job marks it ready.
+    # A blob that was already extracted for another document reuses that text directly.
+    try:
+        cached = find_extracted_text(db, stored.sha256)
+        new_doc = Document(
+            title=(display_name.strip() if display_name and display_name.strip() else original_name),
+            content=cached.content if cached else None,
+            extraction_status="ready" if cached else "pending",
+            file_path=stored.path, # Add path
+            file_size=stored.size,
+            content_hash=stored.sha256,
+            uploaded_by=current_user.id,
+            parent_id=parent_id
+        )
+        db.add(new_doc)
+        db.flush()
+        index_document(db, new_doc)
+        if cached:
+            index_document_passages(db, new_doc)
+        db.commit()
+    except BaseException:
+        abandon_upload_blob(stored)
+        raise
+    confirm_upload_blob(stored)
     db.refresh(new_doc)
-    
-    return {"message": "Document uploaded successfully", "id": new_doc.id}
+    if new_doc.extraction_status == "pending":
+        enqueue_document_extraction(new_doc.id)
+
+    return {"message": "Document uploaded successfully", "id": new_doc.id, "extraction_status": new_doc.extraction_status}
+
+# Listings never touch Document.content, which can hold a whole book's text.
+_LISTING_COLUMNS = (
+    Document.id,
+    Document.title,
+    Document.file_path,
+    Document.is_folder,
+    Document.parent_id,
+    Document.uploaded_by,
+    Document.created_at,
+    Document.extraction_status,
+)
+_LISTING_SORTS = {"created_at": Document.created_at, "title": Document.title}
+MAX_LISTING_PAGE = 500
+DOWNLOAD_CACHE_MAX_AGE = 3600
+
+
+def _encode_cursor(doc_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"after": doc_id}).encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["after"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _paginate_listing(query, response: Response, sort: str, order: str, cursor: Optional[str], limit: Optional[int]):
+    # Keyset pagination on (sort column, id): each page is an index range scan,
+    # however deep the client has paged. The next cursor travels in X-Next-Cursor
+    # so the body stays the plain list existing clients expect.
+    if sort not in _LISTING_SORTS:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(_LISTING_SORTS)}")
+    if order not in {"asc", "desc"}:
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    column = _LISTING_SORTS[sort]
+    descending = order == "desc"
+
+    if cursor:
+        # The cursor names the last row served; its sort key is read back in SQL so
+        # the comparison uses the column's stored representation exactly.
+        last_id = _decode_cursor(cursor)
+        if query.session.query(Document.id).filter(Document.id == last_id).first() is None:
+            raise HTTPException(status_code=400, detail="Cursor is no longer valid")
+        sort_value = select(column).where(Document.id == last_id).scalar_subquery()
+        if descending:
+            query = query.filter(or_(column < sort_value, and_(column == sort_value, Document.id < last_id)))
+        else:
+            query = query.filter(or_(column > sort_value, and_(column == sort_value, Document.id > last_id)))
+    query = query.order_by(column.desc() if descending else column.asc(), Document.id.desc() if descending else Document.id.asc())
+
+    if limit is None:
+        return query.all()
+    limit = max(1, min(limit, MAX_LISTING_PAGE))
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1].id)
+    return rows
+
 
 @router.get("", response_model=List[DocumentResponse])
 @router.get("/", response_model=List[DocumentResponse])
 def list_documents(
+    response: Response,
     parent_id: Optional[int] = None,
     uploaded_by: Optional[int] = None,
     class_id: Optional[int] = None,
+    sort: str = "created_at",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
     db: Session = Depends(get_db), 
     current_user: User = Depends(get_current_user)
 ):
     if current_user.role not in ["teacher", "admin", "student"]:
         raise HTTPException(status_code=403, detail="Authorized personnel only")
     
-    query = db.query(Document)
+    with_visibility = class_id is not None and current_user.role in ["teacher", "admin"]
+    if with_visibility:
+        query = db.query(*_LISTING_COLUMNS, DocumentClassVisibility.visible).outerjoin(
+            DocumentClassVisibility,
+            and_(
+                DocumentClassVisibility.document_id == Document.id,
+                DocumentClassVisibility.class_id == class_id,
+            ),
+        )
+    else:
+        query = db.query(*_LISTING_COLUMNS)
     
     query = query.filter(Document.is_deleted == False)
 
@@ -209,17 +262,10 @@ def list_documents(
             DocumentClassVisibility.visible == True
         )
 
-    docs = query.all()
-    if class_id is not None and current_user.role in ["teacher", "admin"]:
-        visibility_rows = db.query(DocumentClassVisibility).filter(
-            DocumentClassVisibility.class_id == class_id,
-            DocumentClassVisibility.document_id.in_([d.id for d in docs])
-        ).all()
-        visibility_map = {row.document_id: row.visible for row in visibility_rows}
-        for doc in docs:
-            doc.visible = visibility_map.get(doc.id, False)
-
-    return docs
+    rows = _paginate_listing(query, response, sort, order, cursor, limit)
+    if with_visibility:
+        return [{**row._asdict(), "visible": bool(row.visible)} for row in rows]
+    return [row._asdict() for row in rows]
 
 
 def _ensure_document_access(doc: Document, current_user: User):
@@ -243,13 +289,62 @@ def _student_can_access_document(db: Session, document_id: int, student_id: int)
 
 
 @router.get("/folders", response_model=List[DocumentResponse])
-def list_folders(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_folders(
+    response: Response,
+    sort: str = "created_at",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     if current_user.role not in {"teacher", "admin"}:
         raise HTTPException(status_code=403, detail="Not authorized")
-    query = db.query(Document).filter(Document.is_deleted == False, Document.is_folder == True)
+    query = db.query(*_LISTING_COLUMNS).filter(Document.is_deleted == False, Document.is_folder == True)
     if current_user.role == "teacher":
         query = query.filter(Document.uploaded_by == current_user.id)
-    return query.order_by(Document.created_at.asc()).all()
+    return [row._asdict() for row in _paginate_listing(query, response, sort, order, cursor, limit)]
+
+
+class DocumentSearchHit(BaseModel):
+    id: int
+    title: str
+    parent_id: Optional[int] = None
+    uploaded_by: Optional[int] = None
+    snippet: Optional[str] = None
+    rank: float
+
+
+@router.get("/search", response_model=List[DocumentSearchHit])
+def search_documents_endpoint(
+    q: str,
+    class_id: Optional[int] = None,
+    uploaded_by: Optional[int] = None,
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role not in ["teacher", "admin", "student"]:
+        raise HTTPException(status_code=403, detail="Authorized personnel only")
+    if current_user.role == "student":
+        if class_id is None:
+            return []
+        enrollment = db.query(StudentClass).filter(
+            StudentClass.user_id == current_user.id,
+            StudentClass.class_id == class_id
+        ).first()
+        if not enrollment:
+            raise HTTPException(status_code=403, detail="Not enrolled in class")
+
+    return search_documents(
+        db,
+        q,
+        role=current_user.role,
+        user_id=current_user.id,
+        class_id=class_id,
+        uploaded_by=uploaded_by,
+        limit=max(1, min(limit, 100)),
+    )
 
 
 @router.get("/{document_id}")
@@ -269,6 +364,24 @@ def get_document(document_id: int, db: Session = Depends(get_db), current_user:
      raise HTTPException(status_code=403, detail="Not authorized")
 
 
+@router.post("/{document_id}/extract")
+def retry_document_extraction(document_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    doc = db.query(Document).filter(Document.id == document_id, Document.is_deleted == False).first()
+    if not doc or doc.is_folder:
+        raise HTTPException(status_code=404, detail="Document not found")
+    _ensure_document_access(doc, current_user)
+    if doc.extraction_status == "pending":
+        return {"id": doc.id, "extraction_status": doc.extraction_status}
+    if not doc.file_path or not os.path.exists(doc.file_path):
+        raise HTTPException(status_code=404, detail="File not found on server")
+
+    doc.extraction_status = "pending"
+    doc.extraction_error = None
+    db.commit()
+    enqueue_document_extraction(doc.id)
+    return {"id": doc.id, "extraction_status": doc.extraction_status}
+
+
 @router.patch("/{document_id}")
 def rename_document(
     document_id: int,
@@ -286,6 +399,7 @@ def rename_document(
         raise HTTPException(status_code=400, detail="title cannot be empty")
 
     doc.title = title
+    index_document(db, doc)
     db.commit()
     return {"message": "Document renamed", "id": doc.id, "title": doc.title}
 
@@ -315,27 +429,19 @@ def move_document(
         _ensure_document_access(target, current_user)
 
         if doc.is_folder:
-            descendants = _collect_descendants(db, doc.id)
-            descendant_ids = {d.id for d in descendants}
-            if target_parent_id in descendant_ids:
+            subtree = _subtree_cte(doc.id)
+            if db.execute(select(subtree.c.id).where(subtree.c.id == target_parent_id)).first():
                 raise HTTPException(status_code=400, detail="Cannot move folder into its descendant")
 
     doc.parent_id = target_parent_id
     db.commit()
     return {"message": "Document moved", "id": doc.id, "parent_id": doc.parent_id}
 
-def _collect_descendants(db: Session, root_id: int) -> list[Document]:
-    collected = []
-    stack = [root_id]
-    while stack:
-        current_id = stack.pop()
-        doc = db.query(Document).filter(Document.id == current_id).first()
-        if not doc:
-            continue
-        collected.append(doc)
-        child_ids = db.query(Document.id).filter(Document.parent_id == current_id).all()
-        stack.extend([cid for (cid,) in child_ids])
-    return collected
+def _subtree_cte(root_id: int):
+    # The document and everything below it, resolved in one recursive query.
+    # UNION (not UNION ALL) stops on rows already seen, so a corrupt parent cycle cannot loop forever.
+    subtree = select(Document.id).where(Document.id == root_id).cte("subtree", recursive=True)
+    return subtree.union(select(Document.id).where(Document.parent_id == subtree.c.id))
 
 
 @router.delete("/{document_id}")
@@ -351,27 +457,37 @@ def delete_document(
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
     _ensure_document_access(doc, current_user)
-    targets = _collect_descendants(db, doc.id)
+    subtree_ids = select(_subtree_cte(doc.id).c.id)
 
     if hard:
-        for target in targets:
-            if target.file_path and os.path.exists(target.file_path):
-                try:
-                    os.remove(target.file_path)
-                except Exception:
-                    pass
+        file_paths = set(db.scalars(
+            select(Document.file_path).where(Document.id.in_(subtree_ids), Document.file_path.isnot(None))
+        ).all())
+        remove_from_index(db, subtree_ids)
+        db.query(DocumentPassage).filter(
+            DocumentPassage.document_id.in_(subtree_ids)
+        ).delete(synchronize_session=False)
         db.query(DocumentClassVisibility).filter(
-            DocumentClassVisibility.document_id.in_([t.id for t in targets])
+            DocumentClassVisibility.document_id.in_(subtree_ids)
         ).delete(synchronize_session=False)
-        for target in targets:
-            db.delete(target)
+        db.query(Document).filter(Document.id.in_(subtree_ids)).delete(synchronize_session=False)
         db.commit()
+        # Blobs are shared by identical uploads: a file goes only when no document row points at it.
+        still_referenced = set(db.scalars(
+            select(Document.file_path).where(Document.file_path.in_(file_paths)).distinct()
+        ).all()) if file_paths else set()
+        for path in file_paths - still_referenced:
+            remove_unreferenced_blob(
+                path,
+                lambda path=path: db.scalar(select(Document.id).where(Document.file_path == path).limit(1)) is not None,
+            )
         return {"message": "Document deleted"}
 
     now = datetime.datetime.now(datetime.timezone.utc)
-    for target in targets:
-        target.is_deleted = True
-        target.deleted_at = now
+    db.query(Document).filter(Document.id.in_(subtree_ids)).update(
+        {Document.is_deleted: True, Document.deleted_at: now},
+        synchronize_session=False,
+    )
     db.commit()
     return {"message": "Document deleted"}
 
@@ -379,6 +495,7 @@ def delete_document(
 class VisibilityUpdate(BaseModel):
     class_id: int
     visible: bool
+    include_descendants: bool = False
 
 
 @router.post("/{document_id}/visibility")
@@ -402,6 +519,26 @@ def set_document_visibility(
     if current_user.role == "teacher" and class_row.teacher_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not your class")
 
+    if doc.is_folder and payload.include_descendants:
+        # Whole subtree in two statements: update existing rows, insert the missing ones.
+        subtree_ids = select(_subtree_cte(doc.id).c.id)
+        db.query(DocumentClassVisibility).filter(
+            DocumentClassVisibility.class_id == payload.class_id,
+            DocumentClassVisibility.document_id.in_(subtree_ids),
+        ).update({DocumentClassVisibility.visible: payload.visible}, synchronize_session=False)
+        subtree = _subtree_cte(doc.id)
+        already_set = select(DocumentClassVisibility.document_id).where(
+            DocumentClassVisibility.class_id == payload.class_id
+        )
+        db.execute(insert(DocumentClassVisibility).from_select(
+            ["document_id", "class_id", "visible"],
+            select(subtree.c.id, literal(payload.class_id), literal(payload.visible)).where(
+                subtree.c.id.not_in(already_set)
+            ),
+        ))
+        db.commit()
+        return {"message": "Visibility updated"}
+
     visibility = db.query(DocumentClassVisibility).filter(
         DocumentClassVisibility.document_id == document_id,
         DocumentClassVisibility.class_id == payload.class_id
@@ -420,7 +557,12 @@ def set_document_visibility(
     return {"message": "Visibility updated"}
 
 @router.get("/{doc_id}/download")
-def download_document(doc_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def download_document(
+    doc_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     doc = db.query(Document).filter(Document.id == doc_id).first()
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -438,4 +580,12 @@ def download_document(doc_id: int, db: Session = Depends(get_db), current_user:
     if not doc.file_path or not os.path.exists(doc.file_path):
         raise HTTPException(status_code=404, detail="File not found on server")
         
-    return FileResponse(doc.file_path, filename=doc.title)
+    # Downloads are per-user authorized, so caches may keep them only privately;
+    # the content hash (when known) is a strong validator for conditional and If-Range requests.
+    return serve_file(
+        request,
+        doc.file_path,
+        filename=doc.title,
+        etag=doc.content_hash,
+        cache_control=f"private, max-age={DOWNLOAD_CACHE_MAX_AGE}",
+    )
@@ -23,15 +23,51 @@ from ..services.ai_generator import _call_chat, _resolve_ai_config
 from ..services.writing_grader import grade_writing_response
 from ..services.writing_metrics import compute_writing_metrics, metric_improvement_hints
 from ..services.writing_prompt_generator import generate_writing_prompts
-from ..services.memory_compression import compress_dialogue, estimate_tokens
+from ..services.passage_index import retrieve_document_text
+from ..services.analytics_rollup import (
+    rebuild_analytics_rollups,
+    record_answer_scores,
+    record_score_change,
+    record_submission,
+    remove_paper_rollups,
+)
+from ..services.analytics_cache import invalidate_analytics, invalidate_student_reports
+from ..services.item_analysis import (
+    record_item_responses,
+    record_item_score_change,
+    remove_item_statistics,
+)
+from ..services.memory_compression import (
+    compact_dialogue,
+    estimate_tokens,
+    llm_summary_enabled,
+    schedule_llm_summary,
+    summary_token_budget,
+)
 from ..services.audio_synthesis import synthesize_role_script_to_wav, synthesize_single_text_to_wav
+from ..services.tts_cache import get_tts_cache_stats
+from ..services.listening_generator import generate_listening_package
+from ..services.listening_pipeline import (
+    create_listening_paper_record,
+    enqueue_listening_job,
+    listening_job_payload,
+    listening_job_stalled,
+)
 from ..services.qwen_realtime import probe_qwen_realtime_ws
 from ..models.assignment import Assignment
 from ..models.student_association import StudentClass
-from ..models.submission import Submission, Answer
+from ..models.submission import Submission, Answer, AnswerScore
 from ..models.speaking_session import SpeakingSession, SpeakingTurn
-from ..models.user_preference import UserPreference
+from ..models.listening_job import ListeningPaperJob
 from ..services.llm_access import resolve_llm_access
+from ..services.speaking_runtime import (
+    _pick_first_nonempty,
+    build_speaking_runtime_snapshot,
+    invalidate_speaking_runtime_snapshots,
+    load_session_runtime_snapshot,
+    resolve_speaking_llm_access,
+    resolve_speaking_secrets,
+)
 
 router = APIRouter(
     prefix="/papers",
@@ -157,6 +193,27 @@ class ListeningAudioSynthesisRequest(BaseModel):
     default_voice: Optional[str] = "Ethan"
     role_voice_map: Optional[Dict[str, str]] = None
     sample_rate: Optional[int] = 24000
+    previous_result: Optional[Dict[str, Any]] = None  # a partial result to retry: only its failed lines are synthesized
+
+
+class ListeningJobCreate(BaseModel):
+    prompt: Optional[str] = None
+    title: Optional[str] = None
+    question_count: Optional[int] = 5
+    transcript: Optional[str] = None
+    role_script: Optional[List[Dict[str, str]]] = None
+    questions: Optional[List[ListeningQuestionCreate]] = None
+    show_answers: Optional[bool] = True
+    ai_provider: Optional[str] = None
+    ai_model: Optional[str] = None
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    tts_model: Optional[str] = "cosyvoice-v3-plus"
+    tts_api_key: Optional[str] = None
+    tts_base_url: Optional[str] = "https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
+    default_voice: Optional[str] = "Ethan"
+    role_voice_map: Optional[Dict[str, str]] = None
+    sample_rate: Optional[int] = 24000
 
 
 class SpeakingPaperCreate(BaseModel):
@@ -236,30 +293,6 @@ def _parse_role_script_from_transcript(transcript: Optional[str]) -> List[Dict[s
     return parsed
 
 
-def _pick_first_nonempty(*values: Optional[str]) -> Optional[str]:
-    for value in values:
-        text = str(value or "").strip()
-        if text:
-            return text
-    return None
-
-
-def _load_user_runtime_ai_preference(db: Session, user_id: Optional[int]) -> Dict[str, Any]:
-    if not user_id:
-        return {}
-    row = db.query(UserPreference).filter(
-        UserPreference.user_id == user_id,
-        UserPreference.key == "runtime_ai",
-    ).first()
-    if not row:
-        return {}
-    try:
-        payload = json.loads(row.value)
-        return payload if isinstance(payload, dict) else {}
-    except Exception:
-        return {}
-
-
 def _build_dynamic_examiner_fallback(student_text: str, scenario: str, turn_index: int) -> str:
     cleaned = str(student_text or "").strip()
     lower = cleaned.lower()
@@ -399,6 +432,11 @@ def _to_list(value: Optional[object]) -> List[str]:
     return [str(value)]
 
 
+def _paper_student_ids(db: Session, paper_id: int) -> List[int]:
+    rows = db.query(Submission.student_id).filter(Submission.paper_id == paper_id).distinct().all()
+    return [row.student_id for row in rows]
+
+
 def _count_words(text: str) -> int:
     return len(re.findall(r"[A-Za-z']+", text or ""))
 
@@ -669,7 +707,11 @@ def generate_writing_prompt_bundle(
         doc = db.query(Document).filter(Document.id == payload.source_document_id).first()
         if not doc or doc.is_folder:
             raise HTTPException(status_code=404, detail="Document not found")
-        source_text = (doc.content or "").strip() or source_text
+        if doc.extraction_status == "pending" and not source_text:
+            raise HTTPException(status_code=409, detail="Document text is still being extracted")
+        if (doc.content or "").strip():
+            # Only the passages most relevant to the teacher's requirements go into the prompt.
+            source_text = retrieve_document_text(db, doc, query=payload.custom_requirements)
 
     llm_access = resolve_llm_access(
         db,
@@ -893,7 +935,10 @@ def update_writing_paper(
     elif task2_q:
         db.delete(task2_q)
 
+    rebuild_analytics_rollups(db, paper_id=paper.id)
     db.commit()
+    invalidate_analytics(paper.created_by)
+    invalidate_student_reports(*_paper_student_ids(db, paper.id))
     return {"message": "Writing paper updated", "paper_id": paper.id}
 
 
@@ -986,6 +1031,7 @@ def submit_writing_paper(
 
     total = 0.0
     count = 0
+    answers: List[Answer] = []
     for r in submit.responses:
         q = question_map.get(r.question_id)
         if not q:
@@ -1028,12 +1074,17 @@ def submit_writing_paper(
             sentence_feedback=rubric.get("sentence_feedback", []),
         )
         db.add(ans)
+        answers.append(ans)
 
         total += normalized
         count += 1
 
     submission.score = (total / count) * 100 if count else 0.0
+    record_answer_scores(db, answers)
+    record_submission(db, submission, answers)
     db.commit()
+    invalidate_analytics(paper.created_by)
+    invalidate_student_reports(submission.student_id)
 
     return {
         "message": "Writing submitted successfully",
@@ -1051,31 +1102,16 @@ def create_listening_paper(
     if current_user.role not in {"teacher", "admin"}:
         raise HTTPException(status_code=403, detail="Only teachers can create listening papers")
 
-    paper = Paper(
+    paper = create_listening_paper_record(
+        db,
+        teacher_id=current_user.id,
         title=payload.title,
-        article_content=payload.transcript,
-        created_by=current_user.id,
-        show_answers=payload.show_answers if payload.show_answers is not None else True,
-        paper_type="listening",
-        writing_config={
-            "audio_url": payload.audio_url,
-            "role_script": payload.role_script or [],
-            "source": "listening",
-        },
+        transcript=payload.transcript,
+        audio_url=payload.audio_url,
+        role_script=payload.role_script,
+        questions=[q.model_dump() for q in payload.questions],
+        show_answers=payload.show_answers,
     )
-    db.add(paper)
-    db.commit()
-    db.refresh(paper)
-
-    for q in payload.questions:
-        db.add(Question(
-            paper_id=paper.id,
-            question_text=q.question_text,
-            question_type=q.question_type,
-            options=q.options,
-            correct_answer=q.correct_answer,
-        ))
-    db.commit()
 
     return {"message": "Listening paper created", "paper_id": paper.id}
 
@@ -1110,114 +1146,15 @@ def generate_listening_script(
         "ai_model": llm_access.model if llm_access.allowed else payload.ai_model,
     })
 
-    system_prompt = (
-        "You are an English HKDSE listening paper assistant. "
-        "Return strict JSON only. No markdown. Use English only."
-    )
-    user_prompt = (
-        "Generate a listening practice package in JSON with this exact schema:\n"
-        "{\n"
-        "  \"transcript\": \"...\",\n"
-        "  \"role_script\": [{\"role\": \"A\", \"text\": \"...\"}],\n"
-        "  \"questions\": [\n"
-        "    {\"question_text\": \"...\", \"question_type\": \"mcq\", \"options\": [\"...\"], \"correct_answer\": \"A\"}\n"
-        "  ]\n"
-        "}\n"
-        f"Need exactly {question_count} questions. Mix mcq and short. "
-        "For mcq, correct_answer must be a letter like A/B/C/D. "
-        f"Topic/context: {prompt}"
+    return generate_listening_package(
+        prompt=prompt,
+        question_count=question_count,
+        provider=provider,
+        model=model,
+        api_key=llm_access.api_key if llm_access.allowed else payload.api_key,
+        base_url=llm_access.base_url if llm_access.allowed else payload.base_url,
     )
 
-    fallback_payload = {
-        "transcript": f"A: Hello. We are discussing {prompt}. B: Great, let's begin.",
-        "role_script": [
-            {"role": "A", "text": f"Hello, today we are discussing {prompt}."},
-            {"role": "B", "text": "Great, let's begin the conversation."},
-        ],
-        "questions": [
-            {
-                "question_text": "What are the speakers doing?",
-                "question_type": "mcq",
-                "options": ["Introducing a topic", "Ordering food", "Checking homework", "Booking a flight"],
-                "correct_answer": "A",
-            },
-            {
-                "question_text": "Write one key topic mentioned.",
-                "question_type": "short",
-                "correct_answer": prompt,
-            },
-        ],
-    }
-
-    try:
-        raw = _call_chat(
-            provider=provider,
-            model=model,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            temperature=0.5,
-            max_tokens=1600,
-            api_key=llm_access.api_key if llm_access.allowed else payload.api_key,
-            base_url=llm_access.base_url if llm_access.allowed else payload.base_url,
-        )
-        text = (raw or "").strip()
-        if "```" in text:
-            text = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
-
-        parsed = json.loads(text)
-        transcript = str(parsed.get("transcript") or "").strip()
-        role_script = parsed.get("role_script") or []
-        questions = parsed.get("questions") or []
-
-        if not transcript:
-            raise ValueError("Missing transcript")
-        if not isinstance(role_script, list) or not role_script:
-            raise ValueError("Missing role_script")
-        if not isinstance(questions, list) or not questions:
-            raise ValueError("Missing questions")
-
-        normalized_questions = []
-        for q in questions[:question_count]:
-            q_type = str(q.get("question_type") or "short").strip().lower()
-            q_text = str(q.get("question_text") or "").strip()
-            if not q_text:
-                continue
-            options = q.get("options") if isinstance(q.get("options"), list) else None
-            correct = q.get("correct_answer")
-            if q_type == "mcq" and isinstance(correct, str):
-                match = re.match(r"\s*([A-Da-d])", correct)
-                correct = match.group(1).upper() if match else correct
-            normalized_questions.append({
-                "question_text": q_text,
-                "question_type": q_type,
-                "options": options,
-                "correct_answer": correct,
-            })
-
-        if not normalized_questions:
-            raise ValueError("No valid questions generated")
-
-        return {
-            "transcript": transcript,
-            "role_script": [
-                {
-                    "role": str(item.get("role") or "A").strip(),
-                    "text": str(item.get("text") or "").strip(),
-                }
-                for item in role_script
-                if str(item.get("text") or "").strip()
-            ],
-            "questions": normalized_questions,
-            "provider": provider,
-            "model": model,
-        }
-    except Exception:
-        return {
-            **fallback_payload,
-            "provider": provider,
-            "model": model,
-        }
-
 
 @router.post("/listening/synthesize-audio")
 def synthesize_listening_audio(
@@ -1267,12 +1204,97 @@ def synthesize_listening_audio(
             api_key=api_key,
             base_url=base_url,
             sample_rate=sample_rate,
+            previous_result=payload.previous_result,
         )
         return synthesized
     except Exception as exc:
         raise HTTPException(status_code=400, detail=str(exc))
 
 
+@router.post("/listening/jobs")
+def submit_listening_job(
+    payload: ListeningJobCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if current_user.role not in {"teacher", "admin"}:
+        raise HTTPException(status_code=403, detail="Only teachers can produce listening papers")
+
+    prompt = (payload.prompt or "").strip()
+    has_script = bool(payload.role_script) and bool(payload.questions)
+    if not prompt and not has_script:
+        raise HTTPException(status_code=400, detail="Prompt or role_script with questions is required")
+
+    tts_model = (payload.tts_model or "cosyvoice-v3-plus").strip()
+    if not _has_audio_model_capability("qwen", tts_model):
+        raise HTTPException(status_code=400, detail="Selected model does not look like an audio-capable Qwen model")
+
+    request_payload = payload.model_dump(exclude={"api_key", "tts_api_key"})
+    request_payload["prompt"] = prompt
+    request_payload["tts_model"] = tts_model
+    if payload.questions:
+        request_payload["questions"] = [q.model_dump() for q in payload.questions]
+
+    job = ListeningPaperJob(
+        teacher_id=current_user.id,
+        status="queued",
+        stage="script",
+        progress=0,
+        request_payload=request_payload,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    enqueue_listening_job(job.id, {"api_key": payload.api_key, "tts_api_key": payload.tts_api_key})
+    return listening_job_payload(job)
+
+
+def _get_owned_listening_job(db: Session, job_id: int, current_user: User) -> ListeningPaperJob:
+    job = db.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if current_user.role != "admin" and job.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not your job")
+    return job
+
+
+@router.get("/listening/jobs")
+def list_listening_jobs(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    if current_user.role not in {"teacher", "admin"}:
+        raise HTTPException(status_code=403, detail="Only teachers can view listening jobs")
+    jobs = db.query(ListeningPaperJob).filter(
+        ListeningPaperJob.teacher_id == current_user.id
+    ).order_by(ListeningPaperJob.id.desc()).limit(50).all()
+    return [listening_job_payload(job) for job in jobs]
+
+
+@router.get("/listening/jobs/{job_id}")
+def get_listening_job(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    return listening_job_payload(_get_owned_listening_job(db, job_id, current_user))
+
+
+@router.post("/listening/jobs/{job_id}/retry")
+def retry_listening_job(job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    job = _get_owned_listening_job(db, job_id, current_user)
+    # A running job whose lease has lapsed lost its worker and can be taken over.
+    if job.status != "failed" and not listening_job_stalled(job):
+        raise HTTPException(status_code=400, detail="Only failed or stalled jobs can be retried")
+    job.status = "queued"
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    enqueue_listening_job(job.id)
+    return listening_job_payload(job)
+
+
+@router.get("/audio/tts-cache")
+def get_tts_cache_metrics(current_user: User = Depends(get_current_user)):
+    if current_user.role not in {"teacher", "admin"}:
+        raise HTTPException(status_code=403, detail="Only teachers can view TTS cache metrics")
+    return get_tts_cache_stats()
+
+
 @router.put("/listening/{paper_id}")
 def update_listening_paper(
     paper_id: int,
@@ -1297,6 +1319,8 @@ def update_listening_paper(
         "source": "listening",
     }
 
+    # Item statistics belong to the questions being replaced.
+    remove_item_statistics(db, paper.id)
     existing_questions = db.query(Question).filter(Question.paper_id == paper_id).all()
     for q in existing_questions:
         db.delete(q)
@@ -1311,7 +1335,10 @@ def update_listening_paper(
             correct_answer=q.correct_answer,
         ))
 
+    rebuild_analytics_rollups(db, paper_id=paper.id)
     db.commit()
+    invalidate_analytics(paper.created_by)
+    invalidate_student_reports(*_paper_student_ids(db, paper.id))
     return {"message": "Listening paper updated", "paper_id": paper.id}
 
 
@@ -1384,6 +1411,7 @@ def update_speaking_paper(
         "runtime_ai": payload.runtime_ai or {},
         "source": "speaking",
     }
+    invalidate_speaking_runtime_snapshots(db, paper_id=paper.id)
     db.commit()
     return {"message": "Speaking paper updated", "paper_id": paper.id}
 
@@ -1409,6 +1437,8 @@ def start_speaking_session(
         student_id=current_user.id,
         assignment_id=payload.assignment_id,
         max_context_tokens=payload.max_context_tokens or 1200,
+        runtime_config=build_speaking_runtime_snapshot(db, paper, current_user),
+        runtime_config_version=1,
     )
     db.add(session)
     db.commit()
@@ -1425,6 +1455,7 @@ def start_speaking_session(
     db.add(starter_turn)
     session.token_estimate = starter_turn.token_estimate
     db.commit()
+    invalidate_student_reports(session.student_id)
 
     return {
         "session_id": session.id,
@@ -1465,69 +1496,31 @@ def append_speaking_turn(
     db.add(new_turn)
     db.flush()
 
-    paper = db.query(Paper).filter(Paper.id == session.paper_id).first()
     active_turns = turns + [new_turn]
 
     if role == "student":
-        scenario = (paper.writing_config or {}).get("scenario") if paper and paper.writing_config else (paper.article_content if paper else "")
-        persona = (paper.writing_config or {}).get("examiner_persona") if paper and paper.writing_config else "Friendly examiner"
-        runtime_ai_cfg = (paper.writing_config or {}).get("runtime_ai") if paper and paper.writing_config else {}
+        snapshot = load_session_runtime_snapshot(db, session, current_user)
+        snapshot_secrets = resolve_speaking_secrets(db, snapshot)
+        scenario = snapshot.get("scenario")
+        persona = snapshot.get("persona")
         recent_turns = "\n".join([
             f"{t.speaker_role}: {t.text}" for t in active_turns[-6:]
         ])
         summary = session.summary_text or ""
-        paper_owner = None
-        if paper and paper.created_by:
-            paper_owner = db.query(User).filter(User.id == paper.created_by).first()
-        owner_runtime_ai_cfg = _load_user_runtime_ai_preference(db, paper_owner.id if paper_owner else None)
-        request_provider = _pick_first_nonempty(
-            payload.ai_provider,
-            runtime_ai_cfg.get("ai_provider") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("ai_provider"),
-            paper_owner.ai_provider if paper_owner else None,
-            current_user.ai_provider,
-        )
-        request_model = _pick_first_nonempty(
-            payload.ai_model,
-            runtime_ai_cfg.get("ai_model") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("ai_model"),
-            paper_owner.ai_model if paper_owner else None,
-            current_user.ai_model,
-        )
-        request_api_key = _pick_first_nonempty(
-            payload.api_key,
-            runtime_ai_cfg.get("api_key") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("api_key"),
-            owner_runtime_ai_cfg.get("qwen_api_key"),
-            owner_runtime_ai_cfg.get("deepseek_api_key"),
-            owner_runtime_ai_cfg.get("openrouter_api_key"),
-        )
-        request_base_url = _pick_first_nonempty(
-            payload.base_url,
-            runtime_ai_cfg.get("base_url") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("base_url"),
-            owner_runtime_ai_cfg.get("qwen_base_url"),
-            owner_runtime_ai_cfg.get("deepseek_base_url"),
-            owner_runtime_ai_cfg.get("openrouter_base_url"),
-        )
+        request_provider = _pick_first_nonempty(payload.ai_provider, snapshot.get("ai_provider"))
+        request_model = _pick_first_nonempty(payload.ai_model, snapshot.get("ai_model"))
+        request_api_key = _pick_first_nonempty(payload.api_key, snapshot_secrets["api_key"])
+        request_base_url = _pick_first_nonempty(payload.base_url, snapshot.get("base_url"))
         provider, model = _resolve_ai_config({
             "ai_provider": request_provider,
             "ai_model": request_model,
         })
-        if paper_owner:
-            llm_access = resolve_llm_access(
-                db,
-                teacher_id=paper_owner.id,
-                feature="speaking.dialogue",
-                provider=provider,
-                model=model,
-                estimated_usage=1,
-            )
-            if llm_access.allowed:
-                provider = llm_access.provider
-                model = llm_access.model
-                request_api_key = request_api_key or llm_access.api_key
-                request_base_url = request_base_url or llm_access.base_url
+        llm_access = resolve_speaking_llm_access(db, snapshot.get("owner_id"), request_provider, request_model)
+        if llm_access and llm_access.get("allowed"):
+            provider = llm_access["provider"]
+            model = llm_access["model"]
+            request_api_key = request_api_key or llm_access.get("api_key")
+            request_base_url = request_base_url or llm_access.get("base_url")
         system_prompt = (
             "You are an English speaking examiner for students. "
             "Use English only. Keep response concise (1-2 sentences), ask one follow-up question, and maintain scenario role."
@@ -1567,24 +1560,10 @@ def append_speaking_turn(
             )
 
         examiner_audio_url = None
-        runtime_tts_model = _pick_first_nonempty(
-            runtime_ai_cfg.get("tts_model") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("tts_model"),
-        )
-        runtime_tts_api_key = _pick_first_nonempty(
-            runtime_ai_cfg.get("tts_api_key") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("tts_api_key"),
-            owner_runtime_ai_cfg.get("qwen_api_key"),
-        )
-        runtime_tts_base_url = _pick_first_nonempty(
-            runtime_ai_cfg.get("tts_base_url") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("tts_base_url"),
-            owner_runtime_ai_cfg.get("qwen_base_url"),
-        )
-        runtime_tts_voice = _pick_first_nonempty(
-            runtime_ai_cfg.get("tts_voice") if isinstance(runtime_ai_cfg, dict) else None,
-            owner_runtime_ai_cfg.get("tts_voice"),
-        )
+        runtime_tts_model = snapshot.get("tts_model")
+        runtime_tts_api_key = snapshot_secrets["tts_api_key"]
+        runtime_tts_base_url = snapshot.get("tts_base_url")
+        runtime_tts_voice = snapshot.get("tts_voice")
         tts_api_key = _pick_first_nonempty(
             payload.tts_api_key,
             runtime_tts_api_key,
@@ -1647,16 +1626,29 @@ def append_speaking_turn(
         db.flush()
         active_turns.append(examiner_turn)
 
+    llm_summary_request: Optional[Dict[str, Any]] = None
     live_text = " ".join([f"{t.speaker_role}: {t.text}" for t in active_turns if not t.is_compacted])
     token_estimate_total = estimate_tokens(session.summary_text) + estimate_tokens(live_text)
 
     if token_estimate_total > session.max_context_tokens and len(active_turns) > 4:
         compact_candidates = [t for t in active_turns[:-3] if not t.is_compacted]
         compressed_lines = [f"{t.speaker_role}: {t.text}" for t in compact_candidates]
-        session.summary_text = compress_dialogue(session.summary_text, compressed_lines)
+        summary_budget = summary_token_budget(session.max_context_tokens)
+        session.summary_text = compact_dialogue(session.summary_text, compressed_lines, summary_budget)
         for turn in compact_candidates:
             turn.is_compacted = True
         session.compaction_count = (session.compaction_count or 0) + 1
+        if role == "student" and llm_summary_enabled() and request_api_key:
+            llm_summary_request = {
+                "session_id": session.id,
+                "compaction_count": session.compaction_count,
+                "extractive_summary": session.summary_text,
+                "max_tokens": summary_budget,
+                "provider": provider,
+                "model": model,
+                "api_key": request_api_key,
+                "base_url": request_base_url,
+            }
 
         remaining_live = " ".join([f"{t.speaker_role}: {t.text}" for t in active_turns if not t.is_compacted])
         token_estimate_total = estimate_tokens(session.summary_text) + estimate_tokens(remaining_live)
@@ -1664,6 +1656,9 @@ def append_speaking_turn(
     session.token_estimate = token_estimate_total
     db.commit()
     db.refresh(session)
+    if llm_summary_request:
+        # Refine the extractive summary off the request path; the turn response never waits on it.
+        schedule_llm_summary(**llm_summary_request)
 
     return {
         "session_id": session.id,
@@ -1692,6 +1687,7 @@ def complete_speaking_session(
 
     session.status = "completed"
     db.commit()
+    invalidate_student_reports(session.student_id)
     db.refresh(session)
     return {"session_id": session.id, "status": session.status}
 
@@ -1807,11 +1803,12 @@ def delete_paper(paper_id: int, db: Session = Depends(get_db), current_user: Use
     if current_user.role != "admin" and paper.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Not your paper")
 
-    submission_rows = db.query(Submission.id).filter(Submission.paper_id == paper_id).all()
+    submission_rows = db.query(Submission.id, Submission.student_id).filter(Submission.paper_id == paper_id).all()
     submission_ids = [row.id for row in submission_rows]
 
-    speaking_session_rows = db.query(SpeakingSession.id).filter(SpeakingSession.paper_id == paper_id).all()
+    speaking_session_rows = db.query(SpeakingSession.id, SpeakingSession.student_id).filter(SpeakingSession.paper_id == paper_id).all()
     speaking_session_ids = [row.id for row in speaking_session_rows]
+    speaking_student_ids = [row.student_id for row in speaking_session_rows]
 
     # Delete speaking conversations first, because speaking_sessions may reference assignments
     # and papers via foreign keys.
@@ -1820,13 +1817,20 @@ def delete_paper(paper_id: int, db: Session = Depends(get_db), current_user: Use
         db.query(SpeakingSession).filter(SpeakingSession.id.in_(speaking_session_ids)).delete(synchronize_session=False)
 
     if submission_ids:
+        answer_ids = db.query(Answer.id).filter(Answer.submission_id.in_(submission_ids))
+        db.query(AnswerScore).filter(AnswerScore.answer_id.in_(answer_ids)).delete(synchronize_session=False)
         db.query(Answer).filter(Answer.submission_id.in_(submission_ids)).delete(synchronize_session=False)
         db.query(Submission).filter(Submission.id.in_(submission_ids)).delete(synchronize_session=False)
 
+    remove_paper_rollups(db, paper_id)
+    remove_item_statistics(db, paper_id)
     db.query(Assignment).filter(Assignment.paper_id == paper_id).delete(synchronize_session=False)
     db.query(Question).filter(Question.paper_id == paper_id).delete(synchronize_session=False)
+    owner_id = paper.created_by
     db.delete(paper)
     db.commit()
+    invalidate_analytics(owner_id)
+    invalidate_student_reports(*(row.student_id for row in submission_rows), *speaking_student_ids)
     return {"message": "Paper deleted"}
 
 class PaperUpdate(BaseModel):
@@ -1993,14 +1997,19 @@ def update_question(question_id: int, question: QuestionUpdate, db: Session = De
 
     if question.question_text is not None:
         q.question_text = question.question_text
-    if question.question_type is not None:
+    type_changed = question.question_type is not None and question.question_type != q.question_type
+    if type_changed:
         q.question_type = question.question_type
+        rebuild_analytics_rollups(db, paper_id=q.paper_id)
     if question.options is not None:
         q.options = question.options
     if question.correct_answer is not None:
         q.correct_answer = question.correct_answer
 
     db.commit()
+    if type_changed:
+        invalidate_analytics(paper.created_by)
+        invalidate_student_reports(*_paper_student_ids(db, q.paper_id))
     db.refresh(q)
     return q
 
@@ -2029,6 +2038,7 @@ def submit_paper(paper_id: int, submit: PaperSubmit, db: Session = Depends(get_d
 
     correct_count = 0.0
     total_q = 0
+    new_answers: List[Answer] = []
 
     # Save answers and calculate initial grade
     for ans in submit.answers:
@@ -2082,6 +2092,7 @@ def submit_paper(paper_id: int, submit: PaperSubmit, db: Session = Depends(get_d
         new_ans.is_correct = is_correct
         new_ans.score = score
         db.add(new_ans)
+        new_answers.append(new_ans)
     
     # Update total score
     if total_q > 0:
@@ -2089,8 +2100,13 @@ def submit_paper(paper_id: int, submit: PaperSubmit, db: Session = Depends(get_d
     else:
         # Maybe text only?
         sub.score = 0 
-        
+
+    record_submission(db, sub, new_answers)
+    record_item_responses(db, sub, new_answers)
     db.commit()
+    paper = db.query(Paper).filter(Paper.id == paper_id).first()
+    invalidate_analytics(paper.created_by if paper else None)
+    invalidate_student_reports(sub.student_id)
     return {"message": "Submitted successfully", "submission_id": sub.id, "score": sub.score}
 
 class GradeUpdate(BaseModel):
@@ -2120,9 +2136,14 @@ def update_answer_score(answer_id: int, grade: GradeUpdate, db: Session = Depend
     
     all_answers = db.query(Answer).filter(Answer.submission_id == sub.id).all()
     total = _aggregate_submission_score([a.score for a in all_answers])
+    previous_score = sub.score
     sub.score = total
+    record_score_change(db, sub, previous_score)
+    record_item_score_change(db, sub, all_answers, previous_score)
     
     db.commit()
+    invalidate_analytics(paper.created_by)
+    invalidate_student_reports(sub.student_id)
     return {"message": "Score updated", "total_score": total}
 
 @router.get("/students/{student_id}/submissions")
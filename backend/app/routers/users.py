@@ -8,9 +8,10 @@ from ..database import get_db
 from ..models.user import User
 from ..models.user_preference import UserPreference
 from ..auth.jwt import get_current_user, get_password_hash
+from ..services.speaking_runtime import invalidate_speaking_runtime_snapshots
+from ..services.upload_storage import UploadTooLargeError, max_upload_bytes, safe_upload_filename, save_upload_stream
 import os
 import uuid
-import shutil
 
 router = APIRouter(
     prefix="/users",
@@ -162,7 +163,8 @@ def update_user_profile(
             current_user.ai_provider = data.ai_provider
         if data.ai_model is not None:
             current_user.ai_model = data.ai_model
-        
+        invalidate_speaking_runtime_snapshots(db, owner_id=current_user.id)
+
     db.commit()
     db.refresh(current_user)
     return {
@@ -184,12 +186,12 @@ def upload_avatar(
         os.makedirs(upload_dir)
         
     # Generate unique filename
-    ext = file.filename.split('.')[-1]
+    ext = safe_upload_filename(file.filename).split('.')[-1]
     filename = f"avatar_{current_user.id}_{uuid.uuid4().hex[:8]}.{ext}"
-    file_path = os.path.join(upload_dir, filename)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    try:
+        save_upload_stream(file.file, upload_dir, filename, max_upload_bytes("MAX_AVATAR_UPLOAD_BYTES", 5 * 1024 * 1024))
+    except UploadTooLargeError as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
         
     # Update DB
     # Store relative path for frontend access
@@ -343,5 +345,7 @@ def upsert_user_preference(
         )
         db.add(row)
 
+    if pref_key == "runtime_ai":
+        invalidate_speaking_runtime_snapshots(db, owner_id=current_user.id)
     db.commit()
     return {"key": pref_key, "value": _redact_runtime_ai_preference(pref_key, payload.value)}
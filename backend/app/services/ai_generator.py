@@ -5,6 +5,8 @@ from typing import Dict, List, Optional, Tuple
 import requests
 from openai import OpenAI
 
+from .passage_index import budget_source_text
+
 QWEN_NON_CHAT_MODELS = {
     "qwen3-tts-instruct-flash",
     "qwen3-livetranslate-flash",
@@ -312,9 +314,10 @@ def generate_dse_questions(article_content: str, options: Optional[Dict[str, obj
         "- HKDSE-level difficulty and tone\n"
     )
 
+    # Articles longer than the source budget are cut down to their leading passages.
     user_prompt = f"""
     <ARTICLE>
-    {article_content}
+    {budget_source_text(article_content)}
     </ARTICLE>
     """
 
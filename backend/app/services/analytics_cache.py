@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+# Cached analytics responses are keyed by viewer scope, endpoint, filters and the
+# generation counters below. Writes that change analytics bump a counter after
+# commit, so old entries are never read again and simply age out of the LRU/TTL.
+ALL_SCOPE = "all"
+ROSTER_SCOPE = "roster"
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def analytics_cache_ttl() -> int:
+    return _env_int("ANALYTICS_CACHE_TTL", 300)
+
+
+class MemoryAnalyticsCache:
+    """Per-process LRU. Correct for a single worker; use the redis backend otherwise."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, scope: str) -> int:
+        with self._lock:
+            return self._generations.get(scope, 0)
+
+    def bump(self, scope: str) -> None:
+        with self._lock:
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+class RedisAnalyticsCache:
+    """Shared backend so every worker sees the same entries and generation counters."""
+
+    def __init__(self, client, prefix: str = "analytics:"):
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._client.get(self._prefix + key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self._client.set(self._prefix + key, value, ex=ttl or None)
+
+    def generation(self, scope: str) -> int:
+        return int(self._client.get(f"{self._prefix}gen:{scope}") or 0)
+
+    def bump(self, scope: str) -> None:
+        self._client.incr(f"{self._prefix}gen:{scope}")
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._prefix + "*"):
+            self._client.delete(key)
+
+
+def _default_backend():
+    mode = os.getenv("ANALYTICS_CACHE_BACKEND", "memory").strip().lower()
+    if mode in {"off", "none", "0"}:
+        return None
+    if mode == "redis":
+        try:
+            import redis
+        except ImportError:
+            logger.warning("ANALYTICS_CACHE_BACKEND=redis but redis is not installed; using memory")
+        else:
+            url = os.getenv("ANALYTICS_CACHE_REDIS_URL", "redis://localhost:6379/0")
+            return RedisAnalyticsCache(redis.Redis.from_url(url))
+    return MemoryAnalyticsCache(_env_int("ANALYTICS_CACHE_MAX_ENTRIES", 1024))
+
+
+_backend = _default_backend()
+
+
+def set_analytics_cache_backend(backend) -> None:
+    # Any object with get/set/generation/bump/clear works; None disables caching.
+    global _backend
+    _backend = backend
+
+
+def clear_analytics_cache() -> None:
+    if _backend is not None:
+        _backend.clear()
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def get_analytics_cache_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+def _bump_stat(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _safe_bump(scope: str) -> None:
+    try:
+        _backend.bump(scope)
+    except Exception:
+        logger.exception("Failed to bump analytics cache generation %s", scope)
+
+
+def invalidate_analytics(teacher_id: Optional[int] = None) -> None:
+    # Call after commit: bumping first would let a concurrent reader cache the
+    # pre-commit result under the new generation.
+    if _backend is None:
+        return
+    if teacher_id is not None:
+        _safe_bump(f"teacher:{teacher_id}")
+    _safe_bump(ALL_SCOPE)
+
+
+def invalidate_class_rosters() -> None:
+    # Class filters resolve through the roster, so membership changes affect every view.
+    if _backend is not None:
+        _safe_bump(ROSTER_SCOPE)
+
+
+def invalidate_student_reports(*student_ids: Optional[int]) -> None:
+    # A student's own report changes with their submissions, regrades and speaking sessions.
+    if _backend is None:
+        return
+    for student_id in {sid for sid in student_ids if sid is not None}:
+        _safe_bump(f"student:{student_id}")
+
+
+def _viewer_scope(role: str, user_id: int) -> Tuple[str, str]:
+    # Admins see every teacher's data and share one entry per filter set.
+    if role == "admin":
+        return "admin", ALL_SCOPE
+    if role == "student":
+        return f"student:{user_id}", f"student:{user_id}"
+    return f"teacher:{user_id}", f"teacher:{user_id}"
+
+
+def cached_analytics(
+    role: str,
+    user_id: int,
+    endpoint: str,
+    filters: Dict[str, Any],
+    compute: Callable[[], Any],
+    max_age: Optional[int] = None,
+) -> Any:
+    # max_age caps the entry lifetime below the configured TTL, e.g. for results read
+    # from a lagging replica that may predate the write that bumped the generation.
+    if _backend is None:
+        return compute()
+    viewer, scope = _viewer_scope(role, user_id)
+    try:
+        generations = f"{_backend.generation(scope)}.{_backend.generation(ROSTER_SCOPE)}"
+        digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        key = f"{endpoint}:{viewer}:{generations}:{digest}"
+        cached = _backend.get(key)
+    except Exception:
+        logger.exception("Analytics cache lookup failed; computing directly")
+        return compute()
+    if cached is not None:
+        _bump_stat("hits")
+        return json.loads(cached)
+
+    _bump_stat("misses")
+    # Store the JSON form so hits return exactly what a fresh response would serialize to.
+    value = jsonable_encoder(compute())
+    if max_age is not None and max_age <= 0:
+        return value
+    ttl = analytics_cache_ttl()
+    if max_age is not None:
+        # A TTL of 0 means "no expiry", so max_age replaces it rather than min()-ing to 0.
+        ttl = min(ttl, max_age) if ttl else max_age
+    try:
+        _backend.set(key, json.dumps(value), ttl)
+    except Exception:
+        logger.exception("Failed to store analytics cache entry %s", key)
+    return value
@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Iterator, Sequence
+
+from sqlalchemy import Select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+# Raw exports stream rows straight from a database cursor, so memory stays flat no
+# matter how many answers match. Rows come out in primary-key order; a client that
+# loses the connection resumes with after_id=<last exported id>.
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def export_batch_size() -> int:
+    return max(1, _env_int("ANALYTICS_EXPORT_BATCH_SIZE", 1000))
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _csv_cell(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if value is None:
+        return ""
+    return _plain(value)
+
+
+def _encode_csv(columns: Sequence[str], rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_csv_cell(value) for value in row])
+    return buffer.getvalue()
+
+
+def _encode_ndjson(columns: Sequence[str], rows) -> str:
+    return "".join(
+        json.dumps({name: _plain(value) for name, value in zip(columns, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def stream_export_rows(bind: Engine, stmt: Select, fmt: str, batch_size: int = None) -> Iterator[bytes]:
+    # The export gets its own session: the request session may be closed before the
+    # body finishes, and a server-side cursor pins its connection until exhausted.
+    batch_size = batch_size or export_batch_size()
+    columns = [column.name for column in stmt.selected_columns]
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    if fmt == "csv":
+        yield _encode_csv(columns, [columns]).encode("utf-8")
+
+    with Session(bind=bind) as session:
+        # yield_per turns on stream_results, i.e. a named cursor on Postgres.
+        result = session.execute(stmt.execution_options(yield_per=batch_size))
+        for partition in result.partitions():
+            yield encode(columns, partition).encode("utf-8")
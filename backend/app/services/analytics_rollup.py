@@ -0,0 +1,361 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import Date, case, exists, func, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+
+from ..models.analytics_rollup import (
+    AnalyticsAnswerRollup,
+    AnalyticsDailySkillRollup,
+    AnalyticsDailySubmissionRollup,
+    AnalyticsSubmissionRollup,
+)
+from ..models.paper import Paper
+from ..models.question import Question
+from ..models.submission import Answer, AnswerScore, Submission
+
+# Inline literals so the SELECT and GROUP BY expressions render identically on Postgres.
+_PAPER_TYPE = func.coalesce(Paper.paper_type, literal_column("'reading'"))
+_SKILL_TAG = func.coalesce(Question.skill_tag, literal_column("''"))
+_QUESTION_TYPE = func.coalesce(Question.question_type, literal_column("''"))
+
+
+class utc_date(FunctionElement):
+    """Calendar day of a timestamp in UTC, whatever the session time zone is."""
+
+    type = Date()
+    name = "utc_date"
+    inherit_cache = True
+
+
+@compiles(utc_date)
+def _compile_utc_date(element, compiler, **kw):
+    # SQLite keeps the wall time written by the app, which Submission normalizes to UTC.
+    return "date(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(utc_date, "postgresql")
+def _compile_utc_date_postgresql(element, compiler, **kw):
+    return "CAST((%s AT TIME ZONE 'UTC') AS DATE)" % compiler.process(element.clauses, **kw)
+
+
+def utc_day(value: datetime) -> date:
+    """Python twin of utc_date; naive values are taken to be UTC already."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+_DAY = utc_date(Submission.submitted_at)
+
+# Writing answers keep these numbers inside JSON; AnswerScore holds them as floats.
+RUBRIC_KEYS = ["content", "language", "organization", "overall"]
+METRIC_KEYS = [
+    "LD", "TTR", "MSTTR",
+    "MLS", "MLT", "C/S",
+    "Temporal_token_density", "Expansion_token_density", "Comparison_token_density",
+]
+
+
+def _upsert(db: Session, model, key: Dict[str, object], attrs: Dict[str, object], deltas: Dict[str, object]) -> None:
+    # Counters are added in the database so concurrent graders never lose an update.
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in {"sqlite", "postgresql"}:
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table).values(**key, **attrs, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + stmt.excluded[name] for name in deltas},
+        )
+        db.execute(stmt)
+        return
+
+    row = db.query(model).filter_by(**key).with_for_update().first()
+    if row is None:
+        db.add(model(**key, **attrs, **deltas))
+        db.flush()
+        return
+    for name, delta in deltas.items():
+        setattr(row, name, getattr(row, name) + delta)
+
+
+def _submission_day(db: Session, submission: Submission) -> date:
+    # submitted_at is a server default; flushing makes the value loadable.
+    if submission.submitted_at is None:
+        db.flush()
+    return utc_day(submission.submitted_at or datetime.now(timezone.utc))
+
+
+def record_submission(db: Session, submission: Submission, answers: Iterable[Answer]) -> None:
+    paper = db.get(Paper, submission.paper_id) if submission.paper_id is not None else None
+    if paper is None or submission.student_id is None:
+        return
+    submission_deltas = {
+        "submissions": 1,
+        "score_sum": float(submission.score or 0.0),
+        "scored": 1 if submission.score is not None else 0,
+    }
+    _upsert(
+        db,
+        AnalyticsSubmissionRollup,
+        {"paper_id": paper.id, "student_id": submission.student_id},
+        {"teacher_id": paper.created_by, "paper_type": paper.paper_type or "reading"},
+        submission_deltas,
+    )
+    day = _submission_day(db, submission)
+    _upsert(
+        db,
+        AnalyticsDailySubmissionRollup,
+        {"day": day, "paper_id": paper.id, "student_id": submission.student_id},
+        {"teacher_id": paper.created_by, "paper_type": paper.paper_type or "reading"},
+        submission_deltas,
+    )
+
+    answers = list(answers)
+    question_ids = {a.question_id for a in answers if a.question_id is not None}
+    if not question_ids:
+        return
+    questions = {q.id: q for q in db.query(Question).filter(Question.id.in_(question_ids)).all()}
+    papers = {paper.id: paper}
+    missing = {q.paper_id for q in questions.values()} - set(papers)
+    if missing:
+        papers.update({p.id: p for p in db.query(Paper).filter(Paper.id.in_(missing)).all()})
+
+    totals: Dict[tuple, Counter] = {}
+    for answer in answers:
+        question = questions.get(answer.question_id)
+        if question is None or question.paper_id not in papers:
+            continue
+        bucket = totals.setdefault((question.paper_id, question.skill_tag or "", question.question_type or ""), Counter())
+        bucket["answers"] += 1
+        if answer.is_correct is True:
+            bucket["correct"] += 1
+        elif answer.is_correct is False:
+            bucket["incorrect"] += 1
+
+    daily: Dict[tuple, Counter] = {}
+    for (paper_id, skill_tag, _), bucket in totals.items():
+        daily.setdefault((paper_id, skill_tag), Counter()).update(bucket)
+
+    for (paper_id, skill_tag, question_type), bucket in totals.items():
+        answer_paper = papers[paper_id]
+        _upsert(
+            db,
+            AnalyticsAnswerRollup,
+            {
+                "paper_id": paper_id,
+                "student_id": submission.student_id,
+                "skill_tag": skill_tag,
+                "question_type": question_type,
+            },
+            {"teacher_id": answer_paper.created_by, "paper_type": answer_paper.paper_type or "reading"},
+            {name: bucket[name] for name in ("answers", "correct", "incorrect")},
+        )
+
+    for (paper_id, skill_tag), bucket in daily.items():
+        answer_paper = papers[paper_id]
+        _upsert(
+            db,
+            AnalyticsDailySkillRollup,
+            {"day": day, "paper_id": paper_id, "student_id": submission.student_id, "skill_tag": skill_tag},
+            {"teacher_id": answer_paper.created_by, "paper_type": answer_paper.paper_type or "reading"},
+            {"answers": bucket["answers"], "correct": bucket["correct"]},
+        )
+
+
+def _answer_score_values(answer_id: int, rubric, metrics) -> list[dict]:
+    values = []
+    for kind, source, keys in (("rubric", rubric, RUBRIC_KEYS), ("metric", metrics, METRIC_KEYS)):
+        if not isinstance(source, dict):
+            continue
+        for key in keys:
+            value = source.get(key)
+            # bool is an int subclass but never a band or metric.
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                values.append({"answer_id": answer_id, "kind": kind, "name": key, "value": float(value)})
+    return values
+
+
+def record_answer_scores(db: Session, answers: Iterable[Answer]) -> None:
+    answers = list(answers)
+    if not answers:
+        return
+    db.flush()
+    values = [
+        value
+        for answer in answers
+        for value in _answer_score_values(answer.id, answer.rubric_scores, answer.writing_metrics)
+    ]
+    if values:
+        db.execute(AnswerScore.__table__.insert(), values)
+
+
+def backfill_answer_scores(db: Session, paper_id: Optional[int] = None, batch_size: int = 500) -> int:
+    # Only answers without score rows are read, so reruns skip what grading already wrote.
+    query = (
+        select(Answer.id, Answer.rubric_scores, Answer.writing_metrics)
+        .where(~exists().where(AnswerScore.answer_id == Answer.id))
+        .order_by(Answer.id)
+    )
+    if paper_id is not None:
+        query = query.join(Question, Question.id == Answer.question_id).where(Question.paper_id == paper_id)
+    written = 0
+    result = db.execute(query.execution_options(yield_per=batch_size))
+    for partition in result.partitions():
+        values = [
+            value
+            for answer_id, rubric, metrics in partition
+            for value in _answer_score_values(answer_id, rubric, metrics)
+        ]
+        if values:
+            db.execute(AnswerScore.__table__.insert(), values)
+            written += len(values)
+    return written
+
+
+def record_score_change(db: Session, submission: Submission, previous_score: Optional[float]) -> None:
+    if submission.score == previous_score:
+        return
+    paper = db.get(Paper, submission.paper_id) if submission.paper_id is not None else None
+    if paper is None or submission.student_id is None:
+        return
+    deltas = {
+        "submissions": 0,
+        "score_sum": float(submission.score or 0.0) - float(previous_score or 0.0),
+        "scored": int(submission.score is not None) - int(previous_score is not None),
+    }
+    attrs = {"teacher_id": paper.created_by, "paper_type": paper.paper_type or "reading"}
+    _upsert(db, AnalyticsSubmissionRollup, {"paper_id": paper.id, "student_id": submission.student_id}, attrs, deltas)
+    _upsert(
+        db,
+        AnalyticsDailySubmissionRollup,
+        {"day": _submission_day(db, submission), "paper_id": paper.id, "student_id": submission.student_id},
+        attrs,
+        deltas,
+    )
+
+
+def remove_paper_rollups(db: Session, paper_id: int) -> None:
+    db.query(AnalyticsDailySkillRollup).filter(AnalyticsDailySkillRollup.paper_id == paper_id).delete(synchronize_session=False)
+    db.query(AnalyticsDailySubmissionRollup).filter(AnalyticsDailySubmissionRollup.paper_id == paper_id).delete(synchronize_session=False)
+    db.query(AnalyticsAnswerRollup).filter(AnalyticsAnswerRollup.paper_id == paper_id).delete(synchronize_session=False)
+    db.query(AnalyticsSubmissionRollup).filter(AnalyticsSubmissionRollup.paper_id == paper_id).delete(synchronize_session=False)
+
+
+def rebuild_analytics_rollups(db: Session, paper_id: Optional[int] = None) -> Dict[str, int]:
+    # Recomputes rollups from submissions/answers: a backfill for existing data, or a
+    # per-paper refresh after edits that change question tags or remove questions.
+    db.flush()
+    if paper_id is None:
+        for model in (AnalyticsDailySkillRollup, AnalyticsDailySubmissionRollup, AnalyticsAnswerRollup, AnalyticsSubmissionRollup):
+            db.query(model).delete(synchronize_session=False)
+    else:
+        remove_paper_rollups(db, paper_id)
+
+    paper_type = _PAPER_TYPE.label("paper_type")
+    submission_rows = (
+        select(
+            Paper.created_by,
+            Submission.paper_id,
+            Submission.student_id,
+            paper_type,
+            func.count(Submission.id),
+            func.coalesce(func.sum(Submission.score), 0.0),
+            func.count(Submission.score),
+        )
+        .join(Paper, Paper.id == Submission.paper_id)
+        .where(Submission.student_id.isnot(None))
+        .group_by(Paper.created_by, Submission.paper_id, Submission.student_id, _PAPER_TYPE)
+    )
+    answer_rows = (
+        select(
+            Paper.created_by,
+            Question.paper_id,
+            Submission.student_id,
+            paper_type,
+            _SKILL_TAG,
+            _QUESTION_TYPE,
+            func.count(Answer.id),
+            func.sum(case((Answer.is_correct == True, 1), else_=0)),
+            func.sum(case((Answer.is_correct == False, 1), else_=0)),
+        )
+        .select_from(Answer)
+        .join(Submission, Submission.id == Answer.submission_id)
+        .join(Question, Question.id == Answer.question_id)
+        .join(Paper, Paper.id == Question.paper_id)
+        .where(Submission.student_id.isnot(None))
+        .group_by(Paper.created_by, Question.paper_id, Submission.student_id, _PAPER_TYPE, _SKILL_TAG, _QUESTION_TYPE)
+    )
+    daily_submission_rows = (
+        select(
+            _DAY,
+            Paper.created_by,
+            Submission.paper_id,
+            Submission.student_id,
+            paper_type,
+            func.count(Submission.id),
+            func.coalesce(func.sum(Submission.score), 0.0),
+            func.count(Submission.score),
+        )
+        .join(Paper, Paper.id == Submission.paper_id)
+        .where(Submission.student_id.isnot(None), Submission.submitted_at.isnot(None))
+        .group_by(_DAY, Paper.created_by, Submission.paper_id, Submission.student_id, _PAPER_TYPE)
+    )
+    daily_skill_rows = (
+        select(
+            _DAY,
+            Paper.created_by,
+            Question.paper_id,
+            Submission.student_id,
+            paper_type,
+            _SKILL_TAG,
+            func.count(Answer.id),
+            func.sum(case((Answer.is_correct == True, 1), else_=0)),
+        )
+        .select_from(Answer)
+        .join(Submission, Submission.id == Answer.submission_id)
+        .join(Question, Question.id == Answer.question_id)
+        .join(Paper, Paper.id == Question.paper_id)
+        .where(Submission.student_id.isnot(None), Submission.submitted_at.isnot(None))
+        .group_by(_DAY, Paper.created_by, Question.paper_id, Submission.student_id, _PAPER_TYPE, _SKILL_TAG)
+    )
+    if paper_id is not None:
+        submission_rows = submission_rows.where(Submission.paper_id == paper_id)
+        answer_rows = answer_rows.where(Question.paper_id == paper_id)
+        daily_submission_rows = daily_submission_rows.where(Submission.paper_id == paper_id)
+        daily_skill_rows = daily_skill_rows.where(Question.paper_id == paper_id)
+
+    submissions = db.execute(
+        AnalyticsSubmissionRollup.__table__.insert().from_select(
+            ["teacher_id", "paper_id", "student_id", "paper_type", "submissions", "score_sum", "scored"],
+            submission_rows,
+        )
+    ).rowcount
+    answers = db.execute(
+        AnalyticsAnswerRollup.__table__.insert().from_select(
+            ["teacher_id", "paper_id", "student_id", "paper_type", "skill_tag", "question_type", "answers", "correct", "incorrect"],
+            answer_rows,
+        )
+    ).rowcount
+    db.execute(
+        AnalyticsDailySubmissionRollup.__table__.insert().from_select(
+            ["day", "teacher_id", "paper_id", "student_id", "paper_type", "submissions", "score_sum", "scored"],
+            daily_submission_rows,
+        )
+    )
+    db.execute(
+        AnalyticsDailySkillRollup.__table__.insert().from_select(
+            ["day", "teacher_id", "paper_id", "student_id", "paper_type", "skill_tag", "answers", "correct"],
+            daily_skill_rows,
+        )
+    )
+    return {
+        "submission_rows": submissions,
+        "answer_rows": answers,
+        "answer_score_rows": backfill_answer_scores(db, paper_id=paper_id),
+    }
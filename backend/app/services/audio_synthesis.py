@@ -1,12 +1,51 @@
 import os
+import threading
+import time
 import uuid
 import wave
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Deque, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
 import requests
 from .qwen_realtime import synthesize_text_pcm_via_realtime_ws
+from .tts_cache import (
+    cache_file_url,
+    link_cached_wav,
+    lookup_cached_wav,
+    read_cached_pcm,
+    store_cached_wav,
+    tts_cache_enabled,
+    tts_cache_key,
+)
+
+
+# Canonical PCM WAV header written by the wave module (RIFF + fmt + data chunk headers).
+WAV_HEADER_BYTES = 44
+
+_provider_limits_lock = threading.Lock()
+_provider_limits: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _provider_slot(base_url: str) -> threading.BoundedSemaphore:
+    # One semaphore per provider host so parallel segment workers never exceed
+    # the provider's concurrent-request allowance, across concurrent requests too.
+    host = (urlparse(_normalize_base_url(base_url or "")).netloc or "default").lower()
+    with _provider_limits_lock:
+        slot = _provider_limits.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(_env_int("TTS_PROVIDER_CONCURRENCY", 4, minimum=1))
+            _provider_limits[host] = slot
+        return slot
 
 
 def _normalize_base_url(base_url: str) -> str:
@@ -115,6 +154,60 @@ def synthesize_qwen_tts_pcm(
         raise ValueError(f"Qwen TTS failed: HTTP {response.status_code}: {detail}; realtime fallback failed: {ws_exc_text}")
 
 
+def _synthesize_cached(
+    text: str,
+    model: str,
+    voice: str,
+    api_key: str,
+    base_url: str,
+    sample_rate: int,
+    need_pcm: bool = True,
+) -> Tuple[Optional[bytes], Optional[str]]:
+    key = tts_cache_key(text, voice, model, sample_rate)
+    cached_path = lookup_cached_wav(key)
+    if cached_path is not None:
+        pcm = read_cached_pcm(cached_path) if need_pcm else None
+        return pcm, cache_file_url(key)
+
+    with _provider_slot(base_url):
+        pcm = synthesize_qwen_tts_pcm(
+            text=text,
+            model=model,
+            voice=voice,
+            api_key=api_key,
+            base_url=base_url,
+        )
+    if not tts_cache_enabled():
+        return pcm, None
+    store_cached_wav(key, pcm, sample_rate=sample_rate)
+    return pcm, cache_file_url(key)
+
+
+def _reusable_segments(previous_result: Optional[Dict[str, object]], uploads_dir: Path) -> Dict[int, Dict[str, object]]:
+    if not previous_result:
+        return {}
+    # Only merged listening files are read back, whatever URL the caller passed.
+    merged_path = uploads_dir / Path(str(previous_result.get("audio_url") or "")).name
+    if not merged_path.name.startswith("listening_") or not merged_path.is_file():
+        return {}
+    return {
+        int(segment["index"]): {**segment, "path": merged_path}
+        for segment in previous_result.get("segments") or []
+        if "byte_start" in segment and "byte_end" in segment
+    }
+
+
+def _read_segment_pcm(segment: Dict[str, object]) -> bytes:
+    start = int(segment["byte_start"])
+    length = int(segment["byte_end"]) - start + 1
+    with open(segment["path"], "rb") as merged:
+        merged.seek(start)
+        pcm = merged.read(length)
+    if len(pcm) != length:
+        raise OSError(f"segment {segment.get('index')} is truncated")
+    return pcm
+
+
 def synthesize_role_script_to_wav(
     role_script: List[Dict[str, str]],
     model: str,
@@ -123,7 +216,15 @@ def synthesize_role_script_to_wav(
     api_key: str,
     base_url: str,
     sample_rate: int = 24000,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+    previous_result: Optional[Dict[str, object]] = None,
 ) -> Dict[str, object]:
+    """Synthesize a role script into one merged WAV.
+
+    With previous_result (an earlier, partial result for the same script), lines
+    it already holds are copied out of its merged WAV and only the rest are sent
+    to the provider.
+    """
     rows = []
     for item in role_script or []:
         role = str((item or {}).get("role") or "A").strip() or "A"
@@ -136,43 +237,112 @@ def synthesize_role_script_to_wav(
 
     voice_map = {str(k).strip(): str(v).strip() for k, v in (role_voice_map or {}).items() if str(k).strip() and str(v).strip()}
     uploads_dir = _safe_upload_dir()
+    retries = _env_int("TTS_SEGMENT_RETRIES", 2)
+    reusable = _reusable_segments(previous_result, uploads_dir)
 
-    combined_pcm_parts: List[bytes] = []
-    segment_payload: List[Dict[str, object]] = []
-
-    for idx, row in enumerate(rows, start=1):
+    def synthesize_segment(idx: int, row: Dict[str, str]) -> Dict[str, object]:
         role = str(row["role"])
         voice = voice_map.get(role) or default_voice
-        pcm = synthesize_qwen_tts_pcm(
-            text=str(row["text"]),
-            model=model,
-            voice=voice,
-            api_key=api_key,
-            base_url=base_url,
-        )
-        combined_pcm_parts.append(pcm)
-
-        segment_name = f"segment_{uuid.uuid4().hex}_{idx}.wav"
-        segment_path = uploads_dir / segment_name
-        _write_pcm_wav(pcm, segment_path, sample_rate=sample_rate)
-
-        duration_ms = int((len(pcm) / 2 / max(sample_rate, 1)) * 1000)
-        segment_payload.append({
-            "role": role,
-            "voice": voice,
-            "text": row["text"],
-            "audio_url": f"/uploads/audio/{segment_name}",
-            "duration_ms": duration_ms,
-        })
-
-    merged_pcm = b"".join(combined_pcm_parts)
+        previous = reusable.get(idx)
+        if previous and previous.get("text") == row["text"] and previous.get("voice") == voice:
+            try:
+                return {"index": idx, "role": role, "voice": voice, "pcm": _read_segment_pcm(previous)}
+            except OSError:
+                pass
+        last_error: Optional[Exception] = None
+        for attempt in range(retries + 1):
+            try:
+                # Lines are cached individually so regenerating or editing a
+                # paper only synthesizes the lines that changed.
+                pcm, _ = _synthesize_cached(
+                    text=str(row["text"]),
+                    model=model,
+                    voice=voice,
+                    api_key=api_key,
+                    base_url=base_url,
+                    sample_rate=sample_rate,
+                )
+                return {"index": idx, "role": role, "voice": voice, "pcm": pcm}
+            except Exception as exc:
+                last_error = exc
+                if attempt < retries:
+                    time.sleep(min(0.5 * (2 ** attempt), 4.0))
+        return {"index": idx, "role": role, "voice": voice, "error": str(last_error)}
+
     merged_name = f"listening_{uuid.uuid4().hex}.wav"
     merged_path = uploads_dir / merged_name
-    _write_pcm_wav(merged_pcm, merged_path, sample_rate=sample_rate)
+    merged_url = f"/uploads/audio/{merged_name}"
+    bytes_per_ms = sample_rate * 2 / 1000.0
+
+    segment_payload: List[Dict[str, object]] = []
+    failed_segments: List[Dict[str, object]] = []
+    pcm_offset = 0
+
+    max_workers = min(len(rows), _env_int("TTS_MAX_WORKERS", 4, minimum=1))
+    # Only a window of segments is in flight at once; each one is appended to
+    # the merged WAV in script order and dropped, so memory does not grow with
+    # the length of the paper. The wave writer patches the RIFF sizes on close.
+    window = max_workers * 2
+    pending: Deque[Tuple[Dict[str, str], Future]] = deque()
+    indexed_rows = iter(enumerate(rows, start=1))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts-segment") as pool, \
+            wave.open(str(merged_path), "wb") as merged_wav:
+        merged_wav.setnchannels(1)
+        merged_wav.setsampwidth(2)  # 16-bit
+        merged_wav.setframerate(sample_rate)
+
+        while True:
+            while len(pending) < window:
+                next_row = next(indexed_rows, None)
+                if next_row is None:
+                    break
+                pending.append((next_row[1], pool.submit(synthesize_segment, *next_row)))
+            if not pending:
+                break
+
+            row, future = pending.popleft()
+            result = future.result()
+            idx = int(result["index"])
+            if progress_callback is not None:
+                progress_callback(idx, len(rows))
+            if "error" in result:
+                failed_segments.append({
+                    "index": idx,
+                    "role": result["role"],
+                    "text": row["text"],
+                    "error": result["error"],
+                })
+                continue
+
+            pcm = result["pcm"]
+            merged_wav.writeframes(pcm)
+            start_ms = int(pcm_offset / bytes_per_ms)
+            end_ms = int((pcm_offset + len(pcm)) / bytes_per_ms)
+            segment_payload.append({
+                "index": idx,
+                "role": result["role"],
+                "voice": result["voice"],
+                "text": row["text"],
+                "audio_url": f"{merged_url}#t={start_ms / 1000:.3f},{end_ms / 1000:.3f}",
+                "byte_start": WAV_HEADER_BYTES + pcm_offset,
+                "byte_end": WAV_HEADER_BYTES + pcm_offset + len(pcm) - 1,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "duration_ms": end_ms - start_ms,
+            })
+            pcm_offset += len(pcm)
+
+    if not segment_payload:
+        merged_path.unlink(missing_ok=True)
+        first_error = failed_segments[0]["error"] if failed_segments else "unknown error"
+        raise ValueError(f"All {len(rows)} role_script lines failed to synthesize: {first_error}")
 
     return {
-        "audio_url": f"/uploads/audio/{merged_name}",
+        "audio_url": merged_url,
         "segments": segment_payload,
+        "failed_segments": failed_segments,
+        "partial": bool(failed_segments),
+        "duration_ms": int(pcm_offset / bytes_per_ms),
         "sample_rate": sample_rate,
         "format": "wav",
         "provider": "qwen",
@@ -189,15 +359,32 @@ def synthesize_single_text_to_wav(
     base_url: str,
     sample_rate: int = 24000,
 ) -> str:
-    pcm = synthesize_qwen_tts_pcm(
-        text=text,
+    cleaned_text = (text or "").strip()
+    pcm, cached_url = _synthesize_cached(
+        text=cleaned_text,
         model=model,
         voice=voice,
         api_key=api_key,
         base_url=base_url,
+        sample_rate=sample_rate,
+        need_pcm=False,
     )
     uploads_dir = _safe_upload_dir()
     file_name = f"speaking_{uuid.uuid4().hex}.wav"
     file_path = uploads_dir / file_name
+    # The returned URL is stored on the speaking turn, so it must outlive the
+    # cache entry: hand out a link to the cached WAV rather than its own URL.
+    if cached_url and link_cached_wav(tts_cache_key(cleaned_text, voice, model, sample_rate), file_path):
+        return f"/uploads/audio/{file_name}"
+    if pcm is None:
+        # Evicted between the lookup and the link.
+        pcm, _ = _synthesize_cached(
+            text=cleaned_text,
+            model=model,
+            voice=voice,
+            api_key=api_key,
+            base_url=base_url,
+            sample_rate=sample_rate,
+        )
     _write_pcm_wav(pcm, file_path, sample_rate=sample_rate)
     return f"/uploads/audio/{file_name}"
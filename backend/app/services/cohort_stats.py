@@ -0,0 +1,114 @@
+import bisect
+import math
+from typing import Dict, List, Optional, Sequence
+
+# Scores are percentages, so histograms always span 0-100 and stay comparable
+# between cohorts. NumPy (in requirements.txt) does the work; the pure-Python
+# path only serves installs without it and gives the same numbers, more slowly.
+SCORE_RANGE = (0.0, 100.0)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _empty(bins: int) -> Dict[str, object]:
+    return {
+        "count": 0,
+        "mean": None,
+        "std": None,
+        "min": None,
+        "max": None,
+        "percentiles": {f"p{p}": None for p in PERCENTILES},
+        "histogram": _histogram_items([0] * bins, bins),
+        "z_scores": [],
+        "percentile_ranks": [],
+    }
+
+
+def _histogram_items(counts: Sequence[int], bins: int) -> List[Dict[str, object]]:
+    low, high = SCORE_RANGE
+    width = (high - low) / bins
+    return [
+        {"lower": round(low + i * width, 2), "upper": round(low + (i + 1) * width, 2), "count": int(count)}
+        for i, count in enumerate(counts)
+    ]
+
+
+def _numpy_stats(scores: Sequence[float], bins: int) -> Dict[str, object]:
+    values = np.asarray(scores, dtype=float)
+    mean = float(values.mean())
+    std = float(values.std())
+    counts, _ = np.histogram(np.clip(values, *SCORE_RANGE), bins=bins, range=SCORE_RANGE)
+    ordered = np.sort(values)
+    # Mean of the "strictly below" and "at or below" ranks, so ties share a rank.
+    ranks = (np.searchsorted(ordered, values, "left") + np.searchsorted(ordered, values, "right")) * 50.0 / len(values)
+    z_scores = (values - mean) / std if std else np.zeros_like(values)
+    return {
+        "count": int(len(values)),
+        "mean": mean,
+        "std": std,
+        "min": float(ordered[0]),
+        "max": float(ordered[-1]),
+        "percentiles": {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "histogram": _histogram_items(counts.tolist(), bins),
+        "z_scores": z_scores.tolist(),
+        "percentile_ranks": ranks.tolist(),
+    }
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    # Linear interpolation between closest ranks, as numpy.percentile does by default.
+    position = (len(ordered) - 1) * q / 100.0
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _python_stats(scores: Sequence[float], bins: int) -> Dict[str, object]:
+    values = [float(score) for score in scores]
+    count = len(values)
+    mean = math.fsum(values) / count
+    std = math.sqrt(math.fsum((v - mean) ** 2 for v in values) / count)
+    ordered = sorted(values)
+
+    low, high = SCORE_RANGE
+    width = (high - low) / bins
+    counts = [0] * bins
+    for value in values:
+        clipped = min(max(value, low), high)
+        # The last bin is closed on the right, matching numpy.histogram.
+        counts[min(int((clipped - low) / width), bins - 1)] += 1
+
+    return {
+        "count": count,
+        "mean": mean,
+        "std": std,
+        "min": ordered[0],
+        "max": ordered[-1],
+        "percentiles": {f"p{p}": _percentile(ordered, p) for p in PERCENTILES},
+        "histogram": _histogram_items(counts, bins),
+        "z_scores": [(v - mean) / std if std else 0.0 for v in values],
+        "percentile_ranks": [
+            (bisect.bisect_left(ordered, v) + bisect.bisect_right(ordered, v)) * 50.0 / count
+            for v in values
+        ],
+    }
+
+
+def cohort_statistics(scores: Sequence[float], bins: int = 10, use_numpy: Optional[bool] = None) -> Dict[str, object]:
+    """Summarize a cohort's scores.
+
+    Returns count, mean, population std, min/max, percentiles, a 0-100 histogram and,
+    aligned with the input order, each score's z-score and percentile rank.
+    """
+    bins = max(1, int(bins))
+    if not scores:
+        return _empty(bins)
+    if use_numpy is None:
+        use_numpy = np is not None
+    if use_numpy and np is not None:
+        return _numpy_stats(scores, bins)
+    return _python_stats(scores, bins)
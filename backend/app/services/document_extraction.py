@@ -0,0 +1,195 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.document import Document
+from ..models.document_page_text import DocumentPageText
+from .document_search import index_document
+from .passage_index import index_document_passages
+from .document_text import (
+    extract_document_text,
+    extract_pdf_pages,
+    join_page_texts,
+    normalize_extracted_text,
+    pdf_page_count,
+)
+
+logger = logging.getLogger(__name__)
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = max(1, _env_int("DOCUMENT_EXTRACTION_WORKERS", 2))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="document-extract")
+        return _executor
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    # PDF parsing is CPU-bound and holds the GIL, so by default page ranges are
+    # parsed in separate processes. DOCUMENT_EXTRACTION_PROCESSES=0 parses in the worker thread.
+    global _process_pool
+    processes = _env_int("DOCUMENT_EXTRACTION_PROCESSES", 2)
+    if processes == 0:
+        return None
+    with _executor_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _page_ranges(pages: List[int], per_task: int) -> List[Tuple[int, int]]:
+    # Contiguous runs of missing pages, cut into tasks of at most per_task pages.
+    ranges: List[Tuple[int, int]] = []
+    for page in pages:
+        if ranges and ranges[-1][1] == page and page - ranges[-1][0] < per_task:
+            ranges[-1] = (ranges[-1][0], page + 1)
+        else:
+            ranges.append((page, page + 1))
+    return ranges
+
+
+def _load_cached_pages(db: Session, content_hash: Optional[str]) -> Dict[int, str]:
+    if not content_hash:
+        return {}
+    rows = db.query(DocumentPageText.page_number, DocumentPageText.text).filter(
+        DocumentPageText.content_hash == content_hash
+    ).all()
+    return {page_number: text for page_number, text in rows}
+
+
+def _store_cached_pages(db: Session, content_hash: Optional[str], pages: Dict[int, str]) -> None:
+    if not content_hash or not pages:
+        return
+    for page_number, text in pages.items():
+        db.add(DocumentPageText(content_hash=content_hash, page_number=page_number, text=text))
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another job cached the same file concurrently; its rows are equivalent.
+        db.rollback()
+
+
+def _extract_pdf(db: Session, file_path: str, content_hash: Optional[str], page_count: int) -> str:
+    cached = _load_cached_pages(db, content_hash)
+    missing = [page for page in range(page_count) if page not in cached]
+    ranges = _page_ranges(missing, max(1, _env_int("PDF_PAGES_PER_TASK", 8)))
+
+    pool = _get_process_pool()
+    if pool is None:
+        results = [extract_pdf_pages(file_path, start, end) for start, end in ranges]
+    else:
+        futures = [pool.submit(extract_pdf_pages, file_path, start, end) for start, end in ranges]
+        results = [future.result() for future in futures]
+
+    extracted: Dict[int, str] = {}
+    for (start, _end), texts in zip(ranges, results):
+        for offset, text in enumerate(texts):
+            extracted[start + offset] = text
+    _store_cached_pages(db, content_hash, extracted)
+
+    pages = {**cached, **extracted}
+    return normalize_extracted_text(join_page_texts([pages.get(page, "") for page in range(page_count)]))
+
+
+def _extract(db: Session, file_path: str, filename: str, content_hash: Optional[str]) -> str:
+    if filename.endswith(".pdf"):
+        page_count = pdf_page_count(file_path)
+        if page_count:
+            return _extract_pdf(db, file_path, content_hash, page_count)
+    # Non-PDFs, and PDFs pypdf cannot open, go through the whole-file path.
+    pool = _get_process_pool()
+    if pool is None:
+        return extract_document_text(file_path, filename)
+    return pool.submit(extract_document_text, file_path, filename).result()
+
+
+def find_extracted_text(db: Session, content_hash: Optional[str]) -> Optional[Document]:
+    # Any document already extracted from the same bytes serves as the text cache,
+    # including soft-deleted ones.
+    if not content_hash:
+        return None
+    return db.query(Document).filter(
+        Document.content_hash == content_hash,
+        Document.extraction_status == "ready",
+        Document.is_folder == False,
+    ).order_by(Document.id.asc()).first()
+
+
+def run_document_extraction(document_id: int, session_factory: Callable[[], Session] = SessionLocal) -> None:
+    db = session_factory()
+    try:
+        doc = db.query(Document).filter(Document.id == document_id).first()
+        if not doc or doc.extraction_status != "pending":
+            return
+        file_path, filename = doc.file_path, os.path.basename(doc.file_path or "")
+        content_hash = doc.content_hash
+        db.commit()
+
+        try:
+            if not file_path or not os.path.isfile(file_path):
+                raise FileNotFoundError("Stored file is missing")
+            text = _extract(db, file_path, filename, content_hash)
+        except Exception as exc:
+            logger.exception("Document extraction failed: document=%s", document_id)
+            db.rollback()
+            doc = db.query(Document).filter(Document.id == document_id).first()
+            if doc:
+                doc.extraction_status = "failed"
+                doc.extraction_error = str(exc)[:2000]
+                db.commit()
+            return
+
+        doc = db.query(Document).filter(Document.id == document_id).first()
+        if doc:
+            doc.content = text or None
+            doc.extraction_status = "ready"
+            doc.extraction_error = None
+            index_document(db, doc)
+            index_document_passages(db, doc)
+            db.commit()
+    finally:
+        db.close()
+
+
+def enqueue_document_extraction(document_id: int) -> None:
+    _get_executor().submit(run_document_extraction, document_id)
+
+
+def resume_document_extractions(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    db = session_factory()
+    try:
+        document_ids = [
+            doc_id
+            for (doc_id,) in db.query(Document.id).filter(
+                Document.extraction_status == "pending",
+                Document.is_deleted == False,
+            ).order_by(Document.id.asc()).all()
+        ]
+    finally:
+        db.close()
+    for document_id in document_ids:
+        enqueue_document_extraction(document_id)
+    return len(document_ids)
@@ -0,0 +1,135 @@
+import re
+from typing import Any, Dict, List, Optional, Union
+
+from sqlalchemy import Select, bindparam, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from ..models.document import Document
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+SNIPPET_OPEN = "<mark>"
+SNIPPET_CLOSE = "</mark>"
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def index_document(db: Session, doc: Document) -> None:
+    # Postgres keeps search_vector current through the generated column.
+    if _dialect(db) != "sqlite" or doc.id is None:
+        return
+    db.execute(text("DELETE FROM document_search WHERE rowid = :id"), {"id": doc.id})
+    if doc.is_folder:
+        return
+    db.execute(
+        text("INSERT INTO document_search(rowid, title, content) VALUES (:id, :title, :content)"),
+        {"id": doc.id, "title": doc.title or "", "content": doc.content or ""},
+    )
+
+
+def remove_from_index(db: Session, document_ids: Union[List[int], Select]) -> None:
+    if _dialect(db) != "sqlite":
+        return
+    if isinstance(document_ids, Select):
+        document_ids = list(db.scalars(document_ids).all())
+    if not document_ids:
+        return
+    db.execute(
+        text("DELETE FROM document_search WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)),
+        {"ids": list(document_ids)},
+    )
+
+
+def ensure_document_search_index(engine: Engine) -> None:
+    # Databases created before the index existed get it built once from current rows.
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'document_search'")
+        ).first()
+        if exists:
+            return
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS document_search USING fts5(title, content, tokenize='porter unicode61')"
+        ))
+        conn.execute(text(
+            "INSERT INTO document_search(rowid, title, content) "
+            "SELECT id, coalesce(title, ''), coalesce(content, '') FROM documents WHERE is_folder = 0 OR is_folder IS NULL"
+        ))
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    # Quote every term so user input can never hit FTS5 operator syntax; the last
+    # term is a prefix match so results show up while the user is still typing.
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _visibility_clause(role: str, user_id: int, class_id: Optional[int], uploaded_by: Optional[int]):
+    params: Dict[str, Any] = {}
+    if role == "teacher":
+        params["owner_id"] = user_id
+        return "d.uploaded_by = :owner_id", params
+    if role == "student":
+        params.update({"class_id": class_id, "student_id": user_id})
+        return (
+            "EXISTS (SELECT 1 FROM document_class_visibility v "
+            "JOIN students sc ON sc.class_id = v.class_id "
+            "WHERE v.document_id = d.id AND v.visible = :visible AND v.class_id = :class_id "
+            "AND sc.user_id = :student_id)",
+            {**params, "visible": True},
+        )
+    if uploaded_by is not None:
+        params["owner_id"] = uploaded_by
+        return "d.uploaded_by = :owner_id", params
+    return "1 = 1", params
+
+
+def search_documents(
+    db: Session,
+    query: str,
+    role: str,
+    user_id: int,
+    class_id: Optional[int] = None,
+    uploaded_by: Optional[int] = None,
+    limit: int = 20,
+) -> List[Dict[str, Any]]:
+    visibility, params = _visibility_clause(role, user_id, class_id, uploaded_by)
+    params["limit"] = limit
+
+    if _dialect(db) == "sqlite":
+        match = _fts5_query(query)
+        if not match:
+            return []
+        params["match"] = match
+        sql = (
+            "SELECT d.id, d.title, d.parent_id, d.uploaded_by, "
+            f"snippet(document_search, 1, '{SNIPPET_OPEN}', '{SNIPPET_CLOSE}', ' ... ', 16) AS snippet, "
+            # bm25() is lower-is-better; negate it so rank reads like ts_rank_cd.
+            "-bm25(document_search, 4.0, 1.0) AS rank "
+            "FROM document_search JOIN documents d ON d.id = document_search.rowid "
+            f"WHERE document_search MATCH :match AND d.is_deleted = 0 AND {visibility} "
+            "ORDER BY rank DESC LIMIT :limit"
+        )
+        return [dict(row) for row in db.execute(text(sql), params).mappings().all()]
+
+    if not _TOKEN_RE.search(query):
+        return []
+    params["query"] = query
+    sql = (
+        "SELECT d.id, d.title, d.parent_id, d.uploaded_by, "
+        "ts_headline('english', coalesce(d.content, ''), q, "
+        f"'StartSel={SNIPPET_OPEN}, StopSel={SNIPPET_CLOSE}, MaxFragments=2, MaxWords=30, MinWords=8') AS snippet, "
+        "ts_rank_cd(d.search_vector, q) AS rank "
+        "FROM documents d, websearch_to_tsquery('english', :query) q "
+        f"WHERE d.search_vector @@ q AND d.is_deleted = false AND {visibility} "
+        "ORDER BY rank DESC LIMIT :limit"
+    )
+    return [dict(row) for row in db.execute(text(sql), params).mappings().all()]
@@ -0,0 +1,116 @@
+import io
+from typing import BinaryIO, Callable, List, Optional
+
+import docx
+import pdfplumber
+import pypdf
+
+
+# Pages whose pypdf text is shorter than this (typically scanned pages or odd
+# encodings) are re-read with pdfplumber; the longer result wins.
+PAGE_MIN_CHARS = 20
+
+
+def _pdf_page_texts(open_stream: Callable[[], BinaryIO], start: int = 0, end: Optional[int] = None) -> List[str]:
+    texts: List[str] = []
+    try:
+        with open_stream() as stream:
+            pages = pypdf.PdfReader(stream).pages
+            stop = len(pages) if end is None else min(end, len(pages))
+            for index in range(start, stop):
+                try:
+                    texts.append(pages[index].extract_text() or "")
+                except Exception as e:
+                    print(f"PyPDF page {index} extraction failed: {e}")
+                    texts.append("")
+    except Exception as e:
+        print(f"PyPDF extraction failed: {e}")
+        return []
+
+    weak = [offset for offset, text in enumerate(texts) if len(text.strip()) < PAGE_MIN_CHARS]
+    if weak:
+        try:
+            with open_stream() as stream, pdfplumber.open(stream) as pdf:
+                for offset in weak:
+                    plumber_text = pdf.pages[start + offset].extract_text() or ""
+                    if len(plumber_text.strip()) > len(texts[offset].strip()):
+                        texts[offset] = plumber_text
+        except Exception as e:
+            print(f"PDFPlumber extraction failed: {e}")
+    return texts
+
+
+def join_page_texts(texts: List[str]) -> str:
+    return "".join(text + "\n" for text in texts if text)
+
+
+def _extract_text(open_stream: Callable[[], BinaryIO], filename: str) -> str:
+    text = ""
+    if filename.endswith(".pdf"):
+        text = join_page_texts(_pdf_page_texts(open_stream))
+
+        # pypdf could not open the file at all: let pdfplumber try the whole document
+        if not text.strip():
+            try:
+                 with open_stream() as stream, pdfplumber.open(stream) as pdf:
+                     text = join_page_texts([page.extract_text() or "" for page in pdf.pages])
+            except Exception as e:
+                print(f"PDFPlumber extraction failed: {e}")
+            
+    elif filename.endswith(".docx"):
+        try:
+            with open_stream() as stream:
+                doc = docx.Document(stream)
+            for para in doc.paragraphs:
+                text += para.text + "\n"
+        except Exception:
+            return ""
+            
+    elif filename.endswith(".txt"):
+        try:
+            with open_stream() as stream:
+                text = stream.read().decode("utf-8")
+        except:
+             return ""
+    
+    return text.strip()
+
+
+def extract_text_from_file(file_content: bytes, filename: str) -> str:
+    return _extract_text(lambda: io.BytesIO(file_content), filename)
+
+
+def extract_text_from_path(file_path: str, filename: str) -> str:
+    # Parsers read from the stored file, so the upload is never held in memory whole.
+    return _extract_text(lambda: open(file_path, "rb"), filename)
+
+
+def normalize_extracted_text(text: str) -> str:
+    if not text:
+        return ""
+    normalized = text.replace("\r\n", "\n").replace("\r", "\n")
+    normalized = normalized.replace("-\n", "")
+    paragraphs = [p.strip() for p in normalized.split("\n\n") if p.strip()]
+    cleaned_paragraphs = []
+    for paragraph in paragraphs:
+        cleaned_paragraphs.append(" ".join(paragraph.splitlines()))
+    return "\n\n".join(cleaned_paragraphs).strip()
+
+
+def extract_document_text(file_path: str, filename: str) -> str:
+    # Module-level so it can be shipped to a worker process.
+    return normalize_extracted_text(extract_text_from_path(file_path, filename))
+
+
+def pdf_page_count(file_path: str) -> int:
+    try:
+        with open(file_path, "rb") as stream:
+            return len(pypdf.PdfReader(stream).pages)
+    except Exception:
+        return 0
+
+
+def extract_pdf_pages(file_path: str, start: int, end: int) -> List[str]:
+    # One task per page range; module-level so it can be shipped to a worker process.
+    texts = _pdf_page_texts(lambda: open(file_path, "rb"), start, end)
+    return texts + [""] * max(0, (end - start) - len(texts))
@@ -0,0 +1,108 @@
+import mimetypes
+import os
+from email.utils import parsedate
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Names under uploads/ that are derived from their content never change once written.
+_IMMUTABLE_PREFIXES = ("audio/tts_", "audio/listening_")
+# Document blobs are access-controlled and only leave through serve_file; their
+# content-hash names are guessable, so the public mount must not serve them.
+_PRIVATE_PREFIXES = ("blobs/",)
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def file_delivery_mode() -> str:
+    # app: Python streams the file. x-accel: nginx serves it via X-Accel-Redirect.
+    # x-sendfile: Apache/lighttpd serve it via X-Sendfile.
+    mode = os.getenv("FILE_DELIVERY_MODE", "app").strip().lower()
+    return mode if mode in {"app", "x-accel", "x-sendfile"} else "app"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def _offload_response(path: str, headers: dict, media_type: Optional[str]) -> Response:
+    # The proxy answers Range and conditional requests itself from these headers.
+    if file_delivery_mode() == "x-accel":
+        prefix = os.getenv("X_ACCEL_REDIRECT_PREFIX", "/protected/").rstrip("/") + "/"
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(os.getenv("UPLOADS_ROOT", "uploads")))
+        headers["X-Accel-Redirect"] = prefix + relative.replace(os.sep, "/")
+    else:
+        headers["X-Sendfile"] = os.path.abspath(path)
+    return Response(status_code=200, headers=headers, media_type=media_type or "application/octet-stream")
+
+
+def serve_file(
+    request: Request,
+    path: str,
+    filename: Optional[str] = None,
+    etag: Optional[str] = None,
+    cache_control: Optional[str] = None,
+) -> Response:
+    headers = {}
+    if etag:
+        headers["etag"] = f'"{etag}"'
+    if cache_control:
+        headers["cache-control"] = cache_control
+
+    response = FileResponse(path, filename=filename, headers=headers)
+    # FileResponse fills in etag/last-modified from the file when not given.
+    if _is_not_modified(response.headers, request.headers):
+        return NotModifiedResponse(response.headers)
+    if file_delivery_mode() != "app":
+        offload_headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name in {"etag", "last-modified", "cache-control", "content-disposition"}
+        }
+        return _offload_response(path, offload_headers, response.media_type or mimetypes.guess_type(path)[0])
+    return response
+
+
+def _is_not_modified(response_headers: Headers, request_headers: Headers) -> bool:
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        etag = response_headers.get("etag", "")
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if_modified_since = parsedate(request_headers.get("if-modified-since") or "")
+    last_modified = parsedate(response_headers.get("last-modified") or "")
+    return bool(if_modified_since and last_modified and if_modified_since >= last_modified)
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with Cache-Control and optional proxy offload for /uploads."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if (path.replace(os.sep, "/").rstrip("/") + "/").startswith(_PRIVATE_PREFIXES):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        relative = os.path.relpath(str(full_path), str(self.directory)).replace(os.sep, "/")
+        if relative.startswith(_IMMUTABLE_PREFIXES):
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        else:
+            cache_control = f"public, max-age={_env_int('UPLOADS_CACHE_MAX_AGE', 3600)}"
+        response.headers["cache-control"] = cache_control
+        if response.status_code == 200 and file_delivery_mode() != "app":
+            offload_headers = {
+                name: value
+                for name, value in response.headers.items()
+                if name in {"etag", "last-modified", "cache-control"}
+            }
+            return _offload_response(str(full_path), offload_headers, response.media_type)
+        return response
@@ -0,0 +1,190 @@
+import math
+from collections import Counter
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import case, func, literal_column, select
+from sqlalchemy.orm import Session
+
+from ..models.item_analysis import QuestionItemStat, QuestionOptionStat
+from ..models.paper import Paper
+from ..models.question import Question
+from ..models.submission import Answer, Submission
+from .analytics_rollup import _upsert
+
+# Writing and speaking answers are rubric-graded, so facility/discrimination say
+# nothing useful about them.
+PRODUCTIVE_PAPER_TYPES = ("writing", "speaking")
+_PAPER_TYPE = func.coalesce(Paper.paper_type, literal_column("'reading'"))
+
+
+def _option_key(answer: Optional[str]) -> str:
+    return (answer or "").strip(" ")
+
+
+def _item_paper(db: Session, submission: Submission) -> Optional[Paper]:
+    paper = db.get(Paper, submission.paper_id) if submission.paper_id is not None else None
+    if paper is None or (paper.paper_type or "reading") in PRODUCTIVE_PAPER_TYPES:
+        return None
+    return paper
+
+
+def _apply_item_deltas(db: Session, paper: Paper, answers: Iterable[Answer], score: float, sign: int) -> None:
+    for answer in answers:
+        if answer.question_id is None or answer.is_correct is None:
+            continue
+        correct = 1 if answer.is_correct else 0
+        _upsert(
+            db,
+            QuestionItemStat,
+            {"question_id": answer.question_id},
+            {"paper_id": paper.id, "teacher_id": paper.created_by},
+            {
+                "responses": sign,
+                "correct": sign * correct,
+                "score_sum": sign * score,
+                "score_sq_sum": sign * score * score,
+                "correct_score_sum": sign * score * correct,
+            },
+        )
+
+
+def record_item_responses(db: Session, submission: Submission, answers: Iterable[Answer]) -> None:
+    paper = _item_paper(db, submission)
+    if paper is None:
+        return
+    answers = [a for a in answers if a.question_id is not None]
+    if submission.score is not None:
+        _apply_item_deltas(db, paper, answers, float(submission.score), 1)
+
+    # Distractor counts only mean something for questions that offer options.
+    question_ids = {a.question_id for a in answers}
+    with_options = {
+        q.id for q in db.query(Question.id, Question.options).filter(Question.id.in_(question_ids)).all() if q.options
+    } if question_ids else set()
+    counts = Counter((a.question_id, _option_key(a.answer)) for a in answers if a.question_id in with_options)
+    for (question_id, option), count in counts.items():
+        _upsert(
+            db,
+            QuestionOptionStat,
+            {"question_id": question_id, "option": option},
+            {"paper_id": paper.id},
+            {"responses": count},
+        )
+
+
+def record_item_score_change(
+    db: Session,
+    submission: Submission,
+    answers: Iterable[Answer],
+    previous_score: Optional[float],
+) -> None:
+    # A regrade moves every item this submission answered: take out the old total, add the new.
+    if submission.score == previous_score:
+        return
+    paper = _item_paper(db, submission)
+    if paper is None:
+        return
+    answers = list(answers)
+    if previous_score is not None:
+        _apply_item_deltas(db, paper, answers, float(previous_score), -1)
+    if submission.score is not None:
+        _apply_item_deltas(db, paper, answers, float(submission.score), 1)
+
+
+def remove_item_statistics(db: Session, paper_id: int) -> None:
+    db.query(QuestionOptionStat).filter(QuestionOptionStat.paper_id == paper_id).delete(synchronize_session=False)
+    db.query(QuestionItemStat).filter(QuestionItemStat.paper_id == paper_id).delete(synchronize_session=False)
+
+
+def rebuild_item_statistics(db: Session, paper_id: Optional[int] = None) -> Dict[str, int]:
+    # Set-based recompute over the whole answers x submissions matrix, one GROUP BY per table.
+    db.flush()
+    if paper_id is None:
+        db.query(QuestionOptionStat).delete(synchronize_session=False)
+        db.query(QuestionItemStat).delete(synchronize_session=False)
+    else:
+        remove_item_statistics(db, paper_id)
+
+    score = Submission.score
+    is_correct = case((Answer.is_correct == True, 1), else_=0)
+    item_rows = (
+        select(
+            Question.id,
+            Question.paper_id,
+            Paper.created_by,
+            func.count(Answer.id),
+            func.sum(is_correct),
+            func.sum(score),
+            func.sum(score * score),
+            func.sum(score * is_correct),
+        )
+        .select_from(Answer)
+        .join(Submission, Submission.id == Answer.submission_id)
+        .join(Question, Question.id == Answer.question_id)
+        .join(Paper, Paper.id == Question.paper_id)
+        .where(Answer.is_correct.isnot(None), Submission.score.isnot(None))
+        .where(_PAPER_TYPE.notin_(PRODUCTIVE_PAPER_TYPES))
+        .group_by(Question.id, Question.paper_id, Paper.created_by)
+    )
+
+    # options is JSON, so "has options" is decided in Python rather than per dialect.
+    option_query = (
+        db.query(Question.id, Question.options)
+        .join(Paper, Paper.id == Question.paper_id)
+        .filter(_PAPER_TYPE.notin_(PRODUCTIVE_PAPER_TYPES))
+    )
+    if paper_id is not None:
+        item_rows = item_rows.where(Question.paper_id == paper_id)
+        option_query = option_query.filter(Question.paper_id == paper_id)
+    with_options = [q.id for q in option_query.all() if q.options]
+
+    option_key = func.trim(func.coalesce(Answer.answer, literal_column("''")))
+    option_rows = (
+        select(Question.id, Question.paper_id, option_key, func.count(Answer.id))
+        .select_from(Answer)
+        .join(Submission, Submission.id == Answer.submission_id)
+        .join(Question, Question.id == Answer.question_id)
+        .where(Question.id.in_(with_options))
+        .group_by(Question.id, Question.paper_id, option_key)
+    )
+
+    items = db.execute(
+        QuestionItemStat.__table__.insert().from_select(
+            ["question_id", "paper_id", "teacher_id", "responses", "correct", "score_sum", "score_sq_sum", "correct_score_sum"],
+            item_rows,
+        )
+    ).rowcount
+    options = 0
+    if with_options:
+        options = db.execute(
+            QuestionOptionStat.__table__.insert().from_select(
+                ["question_id", "paper_id", "option", "responses"],
+                option_rows,
+            )
+        ).rowcount
+    return {"item_rows": items, "option_rows": options}
+
+
+def item_facility(responses: int, correct: int) -> Optional[float]:
+    return correct / responses if responses else None
+
+
+def item_discrimination(
+    responses: int,
+    correct: int,
+    score_sum: float,
+    score_sq_sum: float,
+    correct_score_sum: float,
+) -> Optional[float]:
+    # Point-biserial correlation between getting the item right and the submission score:
+    # (mean score of correct - mean score of incorrect) / sd * sqrt(p * q).
+    if responses < 2 or correct in (0, responses):
+        return None
+    mean = score_sum / responses
+    variance = score_sq_sum / responses - mean * mean
+    if variance <= 1e-9:
+        return None
+    mean_correct = correct_score_sum / correct
+    mean_incorrect = (score_sum - correct_score_sum) / (responses - correct)
+    p = correct / responses
+    return (mean_correct - mean_incorrect) / math.sqrt(variance) * math.sqrt(p * (1 - p))
@@ -0,0 +1,124 @@
+import json
+import re
+from typing import Any, Dict, Optional
+
+from .ai_generator import _call_chat
+
+
+def _fallback_listening_package(prompt: str) -> Dict[str, Any]:
+    return {
+        "transcript": f"A: Hello. We are discussing {prompt}. B: Great, let's begin.",
+        "role_script": [
+            {"role": "A", "text": f"Hello, today we are discussing {prompt}."},
+            {"role": "B", "text": "Great, let's begin the conversation."},
+        ],
+        "questions": [
+            {
+                "question_text": "What are the speakers doing?",
+                "question_type": "mcq",
+                "options": ["Introducing a topic", "Ordering food", "Checking homework", "Booking a flight"],
+                "correct_answer": "A",
+            },
+            {
+                "question_text": "Write one key topic mentioned.",
+                "question_type": "short",
+                "correct_answer": prompt,
+            },
+        ],
+    }
+
+
+def generate_listening_package(
+    prompt: str,
+    question_count: int,
+    provider: str,
+    model: str,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+) -> Dict[str, Any]:
+    system_prompt = (
+        "You are an English HKDSE listening paper assistant. "
+        "Return strict JSON only. No markdown. Use English only."
+    )
+    user_prompt = (
+        "Generate a listening practice package in JSON with this exact schema:\n"
+        "{\n"
+        "  \"transcript\": \"...\",\n"
+        "  \"role_script\": [{\"role\": \"A\", \"text\": \"...\"}],\n"
+        "  \"questions\": [\n"
+        "    {\"question_text\": \"...\", \"question_type\": \"mcq\", \"options\": [\"...\"], \"correct_answer\": \"A\"}\n"
+        "  ]\n"
+        "}\n"
+        f"Need exactly {question_count} questions. Mix mcq and short. "
+        "For mcq, correct_answer must be a letter like A/B/C/D. "
+        f"Topic/context: {prompt}"
+    )
+
+    try:
+        raw = _call_chat(
+            provider=provider,
+            model=model,
+            system_prompt=system_prompt,
+            user_prompt=user_prompt,
+            temperature=0.5,
+            max_tokens=1600,
+            api_key=api_key,
+            base_url=base_url,
+        )
+        text = (raw or "").strip()
+        if "```" in text:
+            text = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+
+        parsed = json.loads(text)
+        transcript = str(parsed.get("transcript") or "").strip()
+        role_script = parsed.get("role_script") or []
+        questions = parsed.get("questions") or []
+
+        if not transcript:
+            raise ValueError("Missing transcript")
+        if not isinstance(role_script, list) or not role_script:
+            raise ValueError("Missing role_script")
+        if not isinstance(questions, list) or not questions:
+            raise ValueError("Missing questions")
+
+        normalized_questions = []
+        for q in questions[:question_count]:
+            q_type = str(q.get("question_type") or "short").strip().lower()
+            q_text = str(q.get("question_text") or "").strip()
+            if not q_text:
+                continue
+            options = q.get("options") if isinstance(q.get("options"), list) else None
+            correct = q.get("correct_answer")
+            if q_type == "mcq" and isinstance(correct, str):
+                match = re.match(r"\s*([A-Da-d])", correct)
+                correct = match.group(1).upper() if match else correct
+            normalized_questions.append({
+                "question_text": q_text,
+                "question_type": q_type,
+                "options": options,
+                "correct_answer": correct,
+            })
+
+        if not normalized_questions:
+            raise ValueError("No valid questions generated")
+
+        return {
+            "transcript": transcript,
+            "role_script": [
+                {
+                    "role": str(item.get("role") or "A").strip(),
+                    "text": str(item.get("text") or "").strip(),
+                }
+                for item in role_script
+                if str(item.get("text") or "").strip()
+            ],
+            "questions": normalized_questions,
+            "provider": provider,
+            "model": model,
+        }
+    except Exception:
+        return {
+            **_fallback_listening_package(prompt),
+            "provider": provider,
+            "model": model,
+        }
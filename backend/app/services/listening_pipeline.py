@@ -0,0 +1,407 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal
+from ..models.listening_job import ListeningPaperJob
+from ..models.paper import Paper
+from ..models.question import Question
+from ..models.user import User
+from .ai_generator import _resolve_ai_config
+from .audio_synthesis import synthesize_role_script_to_wav
+from .listening_generator import generate_listening_package
+from .llm_access import resolve_llm_access
+
+logger = logging.getLogger(__name__)
+
+# Stage boundaries on the 0-100 progress scale.
+SCRIPT_PROGRESS = (5, 30)
+AUDIO_PROGRESS = (35, 90)
+PAPER_PROGRESS = (95, 100)
+
+# Identifies this process in listening_paper_jobs.owner.
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_executor_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_pending_jobs: Set[int] = set()
+
+# API keys supplied with a job request are kept in memory only. After a
+# restart a resumed job falls back to server-side keys via resolve_llm_access.
+_job_secrets: Dict[int, Dict[str, str]] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            try:
+                workers = max(1, int(os.getenv("LISTENING_JOB_WORKERS", "2")))
+            except ValueError:
+                workers = 2
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="listening-job")
+        return _executor
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job after this worker's lease expired."""
+
+
+def _lease_seconds() -> int:
+    try:
+        return max(1, int(os.getenv("LISTENING_JOB_LEASE_SECONDS", "300")))
+    except ValueError:
+        return 300
+
+
+def _lease_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=_lease_seconds())
+
+
+def _claimable():
+    # Queued jobs, and running jobs whose worker stopped renewing its lease.
+    return or_(
+        ListeningPaperJob.status == "queued",
+        (ListeningPaperJob.status == "running")
+        & or_(ListeningPaperJob.lease_until.is_(None), ListeningPaperJob.lease_until < datetime.now(timezone.utc)),
+    )
+
+
+def claim_listening_job(db: Session, job_id: int) -> bool:
+    claimed = db.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id, _claimable()).update(
+        {
+            ListeningPaperJob.status: "running",
+            ListeningPaperJob.owner: WORKER_ID,
+            ListeningPaperJob.lease_until: _lease_deadline(),
+            ListeningPaperJob.error: None,
+            ListeningPaperJob.attempts: func.coalesce(ListeningPaperJob.attempts, 0) + 1,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return claimed == 1
+
+
+def _renew_lease(db: Session, job: ListeningPaperJob) -> None:
+    renewed = db.query(ListeningPaperJob).filter(
+        ListeningPaperJob.id == job.id,
+        ListeningPaperJob.owner == WORKER_ID,
+        ListeningPaperJob.status == "running",
+    ).update({ListeningPaperJob.lease_until: _lease_deadline()}, synchronize_session=False)
+    if renewed != 1:
+        raise LeaseLost(f"listening job {job.id} is no longer owned by {WORKER_ID}")
+
+
+def create_listening_paper_record(
+    db: Session,
+    teacher_id: int,
+    title: str,
+    transcript: Optional[str],
+    audio_url: Optional[str],
+    role_script: Optional[List[Dict[str, str]]],
+    questions: List[Dict[str, Any]],
+    show_answers: Optional[bool] = True,
+    job: Optional[ListeningPaperJob] = None,
+) -> Paper:
+    paper = Paper(
+        title=title,
+        article_content=transcript,
+        created_by=teacher_id,
+        show_answers=show_answers if show_answers is not None else True,
+        paper_type="listening",
+        writing_config={
+            "audio_url": audio_url,
+            "role_script": role_script or [],
+            "source": "listening",
+        },
+    )
+    db.add(paper)
+    db.flush()
+
+    for q in questions:
+        db.add(Question(
+            paper_id=paper.id,
+            question_text=q.get("question_text"),
+            question_type=q.get("question_type"),
+            options=q.get("options"),
+            correct_answer=q.get("correct_answer"),
+        ))
+    if job is not None:
+        # Committed together with the paper, so a resumed job never creates a second one.
+        job.paper_id = paper.id
+    db.commit()
+    db.refresh(paper)
+    return paper
+
+
+def listening_job_payload(job: ListeningPaperJob) -> Dict[str, Any]:
+    audio = job.audio_result or {}
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": job.progress or 0,
+        "paper_id": job.paper_id,
+        "error": job.error,
+        "attempts": job.attempts or 0,
+        "title": (job.request_payload or {}).get("title"),
+        "audio_url": audio.get("audio_url"),
+        "failed_segments": audio.get("failed_segments") or [],
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def _set_progress(db: Session, job: ListeningPaperJob, stage: str, progress: int) -> None:
+    job.stage = stage
+    job.progress = max(int(job.progress or 0), int(progress))
+    _renew_lease(db, job)
+    db.commit()
+
+
+def _run_script_stage(db: Session, job: ListeningPaperJob, request: Dict[str, Any], secrets: Dict[str, str]) -> Dict[str, Any]:
+    provided_script = request.get("role_script") or []
+    provided_questions = request.get("questions") or []
+    if provided_script and provided_questions:
+        transcript = request.get("transcript") or "\n".join(
+            f"{row.get('role') or 'A'}: {row.get('text') or ''}" for row in provided_script
+        )
+        return {"transcript": transcript, "role_script": provided_script, "questions": provided_questions}
+
+    teacher = db.query(User).filter(User.id == job.teacher_id).first()
+    llm_access = resolve_llm_access(
+        db,
+        teacher_id=job.teacher_id,
+        feature="listening.generate",
+        provider=request.get("ai_provider") or (teacher.ai_provider if teacher else None),
+        model=request.get("ai_model") or (teacher.ai_model if teacher else None),
+        estimated_usage=1,
+    )
+    api_key = llm_access.api_key if llm_access.allowed else secrets.get("api_key")
+    if not api_key:
+        raise ValueError(llm_access.deny_reason or "AI access is not available")
+    provider, model = _resolve_ai_config({
+        "ai_provider": llm_access.provider if llm_access.allowed else request.get("ai_provider"),
+        "ai_model": llm_access.model if llm_access.allowed else request.get("ai_model"),
+    })
+    return generate_listening_package(
+        prompt=request.get("prompt") or "",
+        question_count=max(2, min(int(request.get("question_count") or 5), 10)),
+        provider=provider,
+        model=model,
+        api_key=api_key,
+        base_url=llm_access.base_url if llm_access.allowed else request.get("base_url"),
+    )
+
+
+def _run_audio_stage(
+    db: Session,
+    job: ListeningPaperJob,
+    request: Dict[str, Any],
+    secrets: Dict[str, str],
+    script: Dict[str, Any],
+    previous_result: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    model = (request.get("tts_model") or "cosyvoice-v3-plus").strip()
+    llm_access = resolve_llm_access(
+        db,
+        teacher_id=job.teacher_id,
+        feature="listening.tts",
+        provider="qwen",
+        model=model,
+        estimated_usage=1,
+    )
+    api_key = (llm_access.api_key if llm_access.allowed else secrets.get("tts_api_key") or os.getenv("QWEN_API_KEY") or "").strip()
+    if not api_key:
+        raise ValueError(llm_access.deny_reason or "Qwen TTS access is not available")
+    base_url = (
+        llm_access.base_url
+        if llm_access.allowed
+        else request.get("tts_base_url") or os.getenv("QWEN_BASE_URL") or "https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
+    ).strip()
+    sample_rate = int(request.get("sample_rate") or 24000)
+    low, high = AUDIO_PROGRESS
+
+    def on_segment(done: int, total: int) -> None:
+        _set_progress(db, job, "audio", low + int((high - low) * done / max(total, 1)))
+
+    return synthesize_role_script_to_wav(
+        role_script=script.get("role_script") or [],
+        model=model,
+        default_voice=(request.get("default_voice") or "Ethan").strip() or "Ethan",
+        role_voice_map=request.get("role_voice_map"),
+        api_key=api_key,
+        base_url=base_url,
+        sample_rate=24000 if sample_rate <= 0 else sample_rate,
+        progress_callback=on_segment,
+        previous_result=previous_result,
+    )
+
+
+def _discard_merged_audio(audio_result: Optional[Dict[str, Any]]) -> None:
+    # A superseded partial WAV is referenced by nothing once its retry has run.
+    name = os.path.basename(str((audio_result or {}).get("audio_url") or ""))
+    if name.startswith("listening_"):
+        try:
+            os.remove(os.path.join("uploads", "audio", name))
+        except OSError:
+            pass
+
+
+def run_listening_job(job_id: int, session_factory: Callable[[], Session] = SessionLocal) -> None:
+    db = session_factory()
+    try:
+        if not claim_listening_job(db, job_id):
+            return
+        job = db.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).first()
+
+        request = dict(job.request_payload or {})
+        secrets = _job_secrets.get(job.id, {})
+
+        # Each stage checkpoints its output on the job row, so a retried or
+        # resumed job continues from the first stage that has no result yet.
+        if job.script_result is None:
+            _set_progress(db, job, "script", SCRIPT_PROGRESS[0])
+            job.script_result = _run_script_stage(db, job, request, secrets)
+            _set_progress(db, job, "script", SCRIPT_PROGRESS[1])
+
+        # A partial audio result is a checkpoint too: the retry only synthesizes the failed lines.
+        if job.audio_result is None or job.audio_result.get("failed_segments"):
+            _set_progress(db, job, "audio", AUDIO_PROGRESS[0])
+            previous_audio = job.audio_result
+            job.audio_result = _run_audio_stage(db, job, request, secrets, job.script_result, previous_audio)
+            _set_progress(db, job, "audio", AUDIO_PROGRESS[1])
+            _discard_merged_audio(previous_audio)
+
+        failed_segments = job.audio_result.get("failed_segments") or []
+        if failed_segments:
+            # Never publish a paper whose audio silently skips lines.
+            missing = "; ".join(f"line {seg['index']} ({seg['role']}): {seg['error']}" for seg in failed_segments)
+            raise ValueError(f"{len(failed_segments)} role_script line(s) failed to synthesize: {missing}"[:2000])
+
+        if job.paper_id is None:
+            _set_progress(db, job, "paper", PAPER_PROGRESS[0])
+            script = job.script_result or {}
+            _renew_lease(db, job)
+            create_listening_paper_record(
+                db,
+                teacher_id=job.teacher_id,
+                title=request.get("title") or f"Listening: {request.get('prompt') or 'untitled'}"[:200],
+                transcript=script.get("transcript"),
+                audio_url=(job.audio_result or {}).get("audio_url"),
+                role_script=script.get("role_script"),
+                questions=script.get("questions") or [],
+                show_answers=request.get("show_answers"),
+                job=job,
+            )
+
+        _renew_lease(db, job)
+        job.stage = "done"
+        job.progress = PAPER_PROGRESS[1]
+        job.status = "completed"
+        job.lease_until = None
+        db.commit()
+        _job_secrets.pop(job.id, None)
+    except LeaseLost:
+        logger.warning("Listening paper job taken over by another worker: job=%s", job_id)
+        db.rollback()
+    except Exception as exc:
+        logger.exception("Listening paper job failed: job=%s", job_id)
+        db.rollback()
+        job = db.query(ListeningPaperJob).filter(
+            ListeningPaperJob.id == job_id,
+            ListeningPaperJob.owner == WORKER_ID,
+        ).first()
+        if job:
+            job.status = "failed"
+            job.error = str(exc)[:2000]
+            job.lease_until = None
+            db.commit()
+    finally:
+        db.close()
+
+
+def _run_pending_job(job_id: int) -> None:
+    try:
+        run_listening_job(job_id)
+    finally:
+        with _executor_lock:
+            _pending_jobs.discard(job_id)
+
+
+def enqueue_listening_job(job_id: int, secrets: Optional[Dict[str, str]] = None) -> None:
+    if secrets:
+        _job_secrets[job_id] = {k: v for k, v in secrets.items() if v}
+    with _executor_lock:
+        # The sweeper finds queued jobs that are already waiting for a worker here.
+        if job_id in _pending_jobs:
+            return
+        _pending_jobs.add(job_id)
+    _get_executor().submit(_run_pending_job, job_id)
+
+
+def listening_job_stalled(job: ListeningPaperJob) -> bool:
+    if job.status != "running":
+        return False
+    lease_until = job.lease_until
+    if lease_until is None:
+        return True
+    if lease_until.tzinfo is None:
+        lease_until = lease_until.replace(tzinfo=timezone.utc)
+    return lease_until < datetime.now(timezone.utc)
+
+
+def resume_listening_jobs(session_factory: Callable[[], Session] = SessionLocal) -> int:
+    # Only queued jobs and stale leases are picked up; run_listening_job claims
+    # each one atomically, so several workers resuming at once run it only once.
+    db = session_factory()
+    try:
+        job_ids = [
+            job_id
+            for (job_id,) in db.query(ListeningPaperJob.id).filter(
+                _claimable()
+            ).order_by(ListeningPaperJob.id.asc()).all()
+        ]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        enqueue_listening_job(job_id)
+    return len(job_ids)
+
+
+def start_listening_job_sweeper(
+    interval_seconds: Optional[float] = None,
+    session_factory: Callable[[], Session] = SessionLocal,
+) -> Optional[threading.Event]:
+    """Re-run resume_listening_jobs periodically so jobs whose worker died are
+    taken over once their lease lapses, not only at the next process start.
+
+    Returns an event that stops the sweeper, or None when it is disabled.
+    """
+    if interval_seconds is None:
+        try:
+            interval_seconds = float(os.getenv("LISTENING_JOB_SWEEP_SECONDS", "60"))
+        except ValueError:
+            interval_seconds = 60.0
+    if interval_seconds <= 0:
+        return None
+
+    stop = threading.Event()
+
+    def sweep() -> None:
+        while not stop.wait(interval_seconds):
+            try:
+                resume_listening_jobs(session_factory)
+            except Exception:
+                logger.exception("Listening job sweep failed")
+
+    threading.Thread(target=sweep, name="listening-job-sweeper", daemon=True).start()
+    return stop
@@ -1,27 +1,216 @@
-from typing import Iterable, Optional
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TokenCounter = Callable[[str], int]
+
+# Share of a session's max_context_tokens the rolling summary may occupy; the
+# rest is left for the live (uncompacted) turns and the prompt scaffold.
+SUMMARY_BUDGET_RATIO = 0.4
+
+_ROLE_WEIGHTS = {"student": 1.0, "examiner": 0.7, "system": 0.3, "summary": 0.6}
+_LINE_RE = re.compile(r"^\s*(student|examiner|system)\s*:\s*(.*)$", re.IGNORECASE | re.DOTALL)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_FILLER_RE = re.compile(r"\b(um+|uh+|er+|like|you know|i mean)\b", re.IGNORECASE)
+
+
+def _heuristic_token_count(text: str) -> int:
+    # Rough heuristic: ~4 chars/token for English-like text
+    return max(1, len(text) // 4)
+
+
+def _default_token_counter() -> TokenCounter:
+    if os.getenv("TOKEN_COUNTER", "heuristic").strip().lower() != "tiktoken":
+        return _heuristic_token_count
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("TOKEN_COUNTER=tiktoken but tiktoken is not installed; using heuristic")
+        return _heuristic_token_count
+    encoding = tiktoken.get_encoding(os.getenv("TIKTOKEN_ENCODING", "cl100k_base"))
+    return lambda text: max(1, len(encoding.encode(text)))
+
+
+_token_counter: TokenCounter = _default_token_counter()
+
+
+def set_token_counter(counter: Optional[TokenCounter]) -> None:
+    global _token_counter
+    _token_counter = counter or _heuristic_token_count
 
 
 def estimate_tokens(text: Optional[str]) -> int:
     if not text:
         return 0
-    # Rough heuristic: ~4 chars/token for English-like text
-    return max(1, len(text) // 4)
+    return _token_counter(text)
+
+
+def summary_token_budget(max_context_tokens: Optional[int]) -> int:
+    return max(32, int((max_context_tokens or 1200) * SUMMARY_BUDGET_RATIO))
+
 
+def _split_line(line: str) -> Tuple[str, str]:
+    matched = _LINE_RE.match(line)
+    if matched:
+        return matched.group(1).lower(), matched.group(2).strip()
+    return "summary", line.strip()
 
-def compress_dialogue(previous_summary: Optional[str], lines: Iterable[str], max_chars: int = 900) -> str:
-    joined = " ".join([line.strip() for line in lines if line and line.strip()])
-    if not joined:
+
+def _score_unit(role: str, text: str, position: int, total: int) -> float:
+    words = text.split()
+    score = _ROLE_WEIGHTS.get(role, 0.5)
+    if role == "examiner" and "?" in text:
+        score += 0.4
+    if role == "student":
+        # Longer, content-bearing answers carry more of the student's performance.
+        score += min(len(words), 40) / 40.0 * 0.5
+        score -= min(len(_FILLER_RE.findall(text)), 5) * 0.05
+    if len(words) < 3:
+        score -= 0.4
+    # Recency: later material is worth up to +0.6 over the oldest material.
+    score += 0.6 * (position + 1) / max(total, 1)
+    return score
+
+
+def _units(previous_summary: Optional[str], lines: Iterable[str]) -> List[Tuple[str, str]]:
+    units: List[Tuple[str, str]] = []
+    for raw in (previous_summary or "").splitlines():
+        if raw.strip():
+            units.append(_split_line(raw))
+    for line in lines:
+        if not line or not line.strip():
+            continue
+        role, text = _split_line(line)
+        for sentence in _SENTENCE_RE.split(text):
+            if sentence.strip():
+                units.append((role, sentence.strip()))
+    return units
+
+
+def compact_dialogue(
+    previous_summary: Optional[str],
+    lines: Iterable[str],
+    max_tokens: int,
+) -> str:
+    units = _units(previous_summary, lines)
+    if not units:
         return previous_summary or ""
 
-    head = joined[:max_chars]
-    if len(joined) > max_chars:
-        head = head.rstrip() + " ..."
+    rendered = [text if role == "summary" else f"{role}: {text}" for role, text in units]
+    costs = [estimate_tokens(item) for item in rendered]
+    ranked = sorted(
+        range(len(units)),
+        key=lambda idx: _score_unit(units[idx][0], units[idx][1], idx, len(units)),
+        reverse=True,
+    )
+
+    chosen = set()
+    used = 0
+    for idx in ranked:
+        if used + costs[idx] > max_tokens:
+            continue
+        chosen.add(idx)
+        used += costs[idx]
+
+    if not chosen:
+        # Nothing fits whole: keep the head of the single most relevant unit.
+        best = rendered[ranked[0]]
+        return best[: max(16, max_tokens * 4)].rstrip() + " ..."
+
+    # Keep the selected units in dialogue order so the summary still reads as a conversation.
+    return "\n".join(rendered[idx] for idx in sorted(chosen))
+
+
+def compress_dialogue(
+    previous_summary: Optional[str],
+    lines: Iterable[str],
+    max_chars: int = 900,
+    max_tokens: Optional[int] = None,
+) -> str:
+    budget = max_tokens if max_tokens is not None else max(1, (max_chars * 2) // 4)
+    return compact_dialogue(previous_summary, lines, budget)
+
+
+_summarizer_lock = threading.Lock()
+_summarizer: Optional[ThreadPoolExecutor] = None
+
+
+def llm_summary_enabled() -> bool:
+    return os.getenv("SPEAKING_SUMMARY_MODE", "extractive").strip().lower() == "llm"
+
+
+def _run_llm_summary(
+    session_id: int,
+    compaction_count: int,
+    extractive_summary: str,
+    max_tokens: int,
+    provider: str,
+    model: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+) -> None:
+    from ..database import SessionLocal
+    from ..models.speaking_session import SpeakingSession
+    from .ai_generator import _call_chat
+
+    try:
+        summary = _call_chat(
+            provider=provider,
+            model=model,
+            system_prompt=(
+                "You condense English speaking-exam transcripts. Keep what the student said "
+                "(claims, examples, errors) and the examiner's open questions. Plain text only."
+            ),
+            user_prompt=f"Summarize in at most {max_tokens} tokens:\n{extractive_summary}",
+            temperature=0.2,
+            max_tokens=max_tokens,
+            api_key=api_key,
+            base_url=base_url,
+        ).strip()
+    except Exception:
+        logger.exception("Speaking LLM summary failed: session=%s", session_id)
+        return
+    if not summary or estimate_tokens(summary) > max_tokens:
+        return
+
+    db = SessionLocal()
+    try:
+        session = db.query(SpeakingSession).filter(SpeakingSession.id == session_id).first()
+        # Only replace the summary this job was derived from; a newer compaction wins.
+        if session and (session.compaction_count or 0) == compaction_count:
+            session.summary_text = summary
+            db.commit()
+    finally:
+        db.close()
 
-    if previous_summary:
-        merged = f"{previous_summary}\n{head}"
-    else:
-        merged = head
 
-    if len(merged) > max_chars * 2:
-        merged = merged[-(max_chars * 2):]
-    return merged
+def schedule_llm_summary(
+    session_id: int,
+    compaction_count: int,
+    extractive_summary: str,
+    max_tokens: int,
+    provider: str,
+    model: str,
+    api_key: Optional[str] = None,
+    base_url: Optional[str] = None,
+) -> None:
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speaking-summary")
+    _summarizer.submit(
+        _run_llm_summary,
+        session_id,
+        compaction_count,
+        extractive_summary,
+        max_tokens,
+        provider,
+        model,
+        api_key,
+        base_url,
+    )
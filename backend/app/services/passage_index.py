@@ -0,0 +1,166 @@
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models.document import Document
+from ..models.document_passage import DocumentPassage
+from .memory_compression import estimate_tokens
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our she that the their "
+    "them they this to was we were what when which who will with you your".split()
+)
+
+# BM25 parameters (Robertson/Sparck Jones defaults).
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@dataclass
+class Passage:
+    position: int
+    text: str
+    token_count: int
+    terms: Dict[str, int]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+def passage_target_tokens() -> int:
+    return _env_int("PASSAGE_TARGET_TOKENS", 220)
+
+
+def source_token_budget() -> int:
+    return _env_int("SOURCE_PROMPT_TOKENS", 3000)
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD_RE.findall((text or "").lower()) if word not in _STOPWORDS and len(word) > 1]
+
+
+def _pieces(text: str, target: int) -> List[str]:
+    pieces: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= target:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(sentence.strip() for sentence in _SENTENCE_RE.split(paragraph) if sentence.strip())
+    return pieces
+
+
+def chunk_passages(text: Optional[str], target_tokens: Optional[int] = None) -> List[Passage]:
+    # Paragraphs are packed greedily up to the target size; paragraphs that are
+    # too long on their own are packed sentence by sentence.
+    target = target_tokens or passage_target_tokens()
+    passages: List[Passage] = []
+    buffer: List[str] = []
+    used = 0
+
+    def flush() -> None:
+        nonlocal buffer, used
+        if buffer:
+            body = "\n\n".join(buffer)
+            passages.append(Passage(len(passages), body, estimate_tokens(body), dict(Counter(tokenize(body)))))
+        buffer, used = [], 0
+
+    for piece in _pieces(text or "", target):
+        cost = estimate_tokens(piece)
+        if buffer and used + cost > target:
+            flush()
+        buffer.append(piece)
+        used += cost
+    flush()
+    return passages
+
+
+def _bm25_scores(passages: List[Passage], query: str) -> List[float]:
+    query_terms = set(tokenize(query))
+    if not query_terms or not passages:
+        return [0.0] * len(passages)
+    total = len(passages)
+    avg_len = sum(sum(p.terms.values()) for p in passages) / total or 1.0
+    doc_freq = {term: sum(1 for p in passages if term in p.terms) for term in query_terms}
+    scores = []
+    for passage in passages:
+        length = sum(passage.terms.values())
+        score = 0.0
+        for term in query_terms:
+            freq = passage.terms.get(term, 0)
+            if not freq:
+                continue
+            idf = math.log(1 + (total - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * freq * (BM25_K1 + 1) / (freq + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        scores.append(score)
+    return scores
+
+
+def select_passages(passages: List[Passage], query: Optional[str], token_budget: int) -> str:
+    if sum(p.token_count for p in passages) <= token_budget:
+        return "\n\n".join(p.text for p in passages)
+
+    scores = _bm25_scores(passages, query or "")
+    # Best BM25 score first; ties (including "no query") fall back to document order.
+    ranked = sorted(range(len(passages)), key=lambda idx: (-scores[idx], idx))
+    chosen = []
+    used = 0
+    for idx in ranked:
+        if used + passages[idx].token_count > token_budget:
+            continue
+        chosen.append(idx)
+        used += passages[idx].token_count
+    if not chosen:
+        # Even the best passage is over budget on its own: keep its head.
+        return passages[ranked[0]].text[: token_budget * 4].rstrip()
+    # Selected passages go back into reading order so the excerpt stays coherent.
+    return "\n\n".join(passages[idx].text for idx in sorted(chosen))
+
+
+def budget_source_text(text: Optional[str], query: Optional[str] = None, token_budget: Optional[int] = None) -> str:
+    text = (text or "").strip()
+    budget = token_budget or source_token_budget()
+    if estimate_tokens(text) <= budget:
+        return text
+    return select_passages(chunk_passages(text), query, budget)
+
+
+def index_document_passages(db: Session, doc: Document) -> List[Passage]:
+    db.query(DocumentPassage).filter(DocumentPassage.document_id == doc.id).delete(synchronize_session=False)
+    passages = chunk_passages(doc.content)
+    for passage in passages:
+        db.add(DocumentPassage(
+            document_id=doc.id,
+            position=passage.position,
+            text=passage.text,
+            token_count=passage.token_count,
+            terms=passage.terms,
+        ))
+    return passages
+
+
+def retrieve_document_text(db: Session, doc: Document, query: Optional[str], token_budget: Optional[int] = None) -> str:
+    rows = db.query(DocumentPassage).filter(
+        DocumentPassage.document_id == doc.id
+    ).order_by(DocumentPassage.position.asc()).all()
+    if rows:
+        passages = [Passage(row.position, row.text, row.token_count, row.terms or {}) for row in rows]
+    else:
+        # Documents extracted before passages existed are chunked on first use.
+        passages = index_document_passages(db, doc)
+        db.commit()
+    return select_passages(passages, query, token_budget or source_token_budget())
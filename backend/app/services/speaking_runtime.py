@@ -0,0 +1,189 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models.paper import Paper
+from ..models.speaking_session import SpeakingSession
+from ..models.user import User
+from ..models.user_preference import UserPreference
+from .ai_generator import _resolve_ai_config
+from .llm_access import resolve_llm_access
+
+# Bump when the snapshot layout changes so stored snapshots are rebuilt.
+SNAPSHOT_SCHEMA = 2
+
+
+def _pick_first_nonempty(*values: Optional[str]) -> Optional[str]:
+    for value in values:
+        text = str(value or "").strip()
+        if text:
+            return text
+    return None
+
+
+def _load_user_runtime_ai_preference(db: Session, user_id: Optional[int]) -> Dict[str, Any]:
+    if not user_id:
+        return {}
+    row = db.query(UserPreference).filter(
+        UserPreference.user_id == user_id,
+        UserPreference.key == "runtime_ai",
+    ).first()
+    if not row:
+        return {}
+    try:
+        payload = json.loads(row.value)
+        return payload if isinstance(payload, dict) else {}
+    except Exception:
+        return {}
+
+
+def _pick_secret_ref(*candidates: Tuple[str, str, Optional[str]]) -> Optional[Dict[str, str]]:
+    # Records where the first configured key lives rather than the key itself.
+    for source, field, value in candidates:
+        if str(value or "").strip():
+            return {"source": source, "field": field}
+    return None
+
+
+def build_speaking_runtime_snapshot(db: Session, paper: Optional[Paper], current_user: User) -> Dict[str, Any]:
+    """Resolve the non-secret LLM/TTS settings for a speaking session.
+
+    API keys are stored only as references to the paper or owner preference
+    that holds them and are looked up per turn with resolve_speaking_secrets.
+    """
+    config = (paper.writing_config or {}) if paper else {}
+    runtime_ai_cfg = config.get("runtime_ai") if isinstance(config.get("runtime_ai"), dict) else {}
+    paper_owner = None
+    if paper and paper.created_by:
+        paper_owner = db.query(User).filter(User.id == paper.created_by).first()
+    owner_cfg = _load_user_runtime_ai_preference(db, paper_owner.id if paper_owner else None)
+
+    return {
+        "schema": SNAPSHOT_SCHEMA,
+        "paper_id": paper.id if paper else None,
+        "owner_id": paper_owner.id if paper_owner else None,
+        "scenario": config.get("scenario") if paper and paper.writing_config else (paper.article_content if paper else ""),
+        "persona": config.get("examiner_persona") if paper and paper.writing_config else "Friendly examiner",
+        "ai_provider": _pick_first_nonempty(
+            runtime_ai_cfg.get("ai_provider"),
+            owner_cfg.get("ai_provider"),
+            paper_owner.ai_provider if paper_owner else None,
+            current_user.ai_provider,
+        ),
+        "ai_model": _pick_first_nonempty(
+            runtime_ai_cfg.get("ai_model"),
+            owner_cfg.get("ai_model"),
+            paper_owner.ai_model if paper_owner else None,
+            current_user.ai_model,
+        ),
+        "api_key_ref": _pick_secret_ref(
+            ("paper", "api_key", runtime_ai_cfg.get("api_key")),
+            ("preference", "api_key", owner_cfg.get("api_key")),
+            ("preference", "qwen_api_key", owner_cfg.get("qwen_api_key")),
+            ("preference", "deepseek_api_key", owner_cfg.get("deepseek_api_key")),
+            ("preference", "openrouter_api_key", owner_cfg.get("openrouter_api_key")),
+        ),
+        "base_url": _pick_first_nonempty(
+            runtime_ai_cfg.get("base_url"),
+            owner_cfg.get("base_url"),
+            owner_cfg.get("qwen_base_url"),
+            owner_cfg.get("deepseek_base_url"),
+            owner_cfg.get("openrouter_base_url"),
+        ),
+        "tts_model": _pick_first_nonempty(runtime_ai_cfg.get("tts_model"), owner_cfg.get("tts_model")),
+        "tts_api_key_ref": _pick_secret_ref(
+            ("paper", "tts_api_key", runtime_ai_cfg.get("tts_api_key")),
+            ("preference", "tts_api_key", owner_cfg.get("tts_api_key")),
+            ("preference", "qwen_api_key", owner_cfg.get("qwen_api_key")),
+        ),
+        "tts_base_url": _pick_first_nonempty(
+            runtime_ai_cfg.get("tts_base_url"),
+            owner_cfg.get("tts_base_url"),
+            owner_cfg.get("qwen_base_url"),
+        ),
+        "tts_voice": _pick_first_nonempty(runtime_ai_cfg.get("tts_voice"), owner_cfg.get("tts_voice")),
+    }
+
+
+def resolve_speaking_secrets(db: Session, snapshot: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    # One indexed lookup per referenced source, so rotated or removed keys take effect on the next turn.
+    sources: Dict[str, Dict[str, Any]] = {}
+
+    def load(source: str) -> Dict[str, Any]:
+        if source not in sources:
+            if source == "paper":
+                paper = db.query(Paper).filter(Paper.id == snapshot.get("paper_id")).first() if snapshot.get("paper_id") else None
+                config = (paper.writing_config or {}) if paper else {}
+                sources[source] = config.get("runtime_ai") if isinstance(config.get("runtime_ai"), dict) else {}
+            else:
+                sources[source] = _load_user_runtime_ai_preference(db, snapshot.get("owner_id"))
+        return sources[source]
+
+    secrets: Dict[str, Optional[str]] = {}
+    for name in ("api_key", "tts_api_key"):
+        ref = snapshot.get(f"{name}_ref")
+        secrets[name] = _pick_first_nonempty(load(ref["source"]).get(ref["field"])) if isinstance(ref, dict) else None
+    return secrets
+
+
+def resolve_speaking_llm_access(
+    db: Session,
+    owner_id: Optional[int],
+    request_provider: Optional[str],
+    request_model: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    # Called on every turn rather than snapshotted: entitlements, quota and
+    # control-plane secrets change independently of the session.
+    if not owner_id:
+        return None
+    provider, model = _resolve_ai_config({"ai_provider": request_provider, "ai_model": request_model})
+    llm_access = resolve_llm_access(
+        db,
+        teacher_id=owner_id,
+        feature="speaking.dialogue",
+        provider=provider,
+        model=model,
+        estimated_usage=1,
+    )
+    if not llm_access.allowed:
+        return {"allowed": False}
+    return {
+        "allowed": True,
+        "provider": llm_access.provider,
+        "model": llm_access.model,
+        "api_key": llm_access.api_key,
+        "base_url": llm_access.base_url,
+    }
+
+
+def load_session_runtime_snapshot(db: Session, session: SpeakingSession, current_user: User) -> Dict[str, Any]:
+    snapshot = session.runtime_config
+    if isinstance(snapshot, dict) and snapshot.get("schema") == SNAPSHOT_SCHEMA:
+        return snapshot
+    paper = db.query(Paper).filter(Paper.id == session.paper_id).first()
+    snapshot = build_speaking_runtime_snapshot(db, paper, current_user)
+    session.runtime_config = snapshot
+    session.runtime_config_version = (session.runtime_config_version or 0) + 1
+    return snapshot
+
+
+def invalidate_speaking_runtime_snapshots(
+    db: Session,
+    owner_id: Optional[int] = None,
+    paper_id: Optional[int] = None,
+) -> int:
+    # Snapshots are rebuilt lazily on the next turn; clearing them here keeps
+    # the per-turn path free of settings resolution.
+    query = db.query(SpeakingSession).filter(
+        SpeakingSession.status == "active",
+        SpeakingSession.runtime_config.isnot(None),
+    )
+    if paper_id is not None:
+        query = query.filter(SpeakingSession.paper_id == paper_id)
+    elif owner_id is not None:
+        owned_papers = db.query(Paper.id).filter(Paper.created_by == owner_id, Paper.paper_type == "speaking")
+        query = query.filter(SpeakingSession.paper_id.in_(owned_papers))
+    else:
+        return 0
+    return query.update({SpeakingSession.runtime_config: None}, synchronize_session=False)
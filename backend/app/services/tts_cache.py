@@ -0,0 +1,195 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+import wave
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+CACHE_FILE_PREFIX = "tts_"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+# Running byte total of the cache directory, so a store only walks the directory
+# when the limit is crossed. Other workers write to the same directory, so the
+# total is re-read from disk at most once per TTS_CACHE_RESYNC_SECONDS.
+_size_lock = threading.Lock()
+_size_bytes: Optional[int] = None
+_size_synced_at = 0.0
+
+
+def tts_cache_enabled() -> bool:
+    return os.getenv("TTS_CACHE_ENABLED", "1") != "0"
+
+
+def _cache_max_bytes() -> int:
+    try:
+        return max(0, int(os.getenv("TTS_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def _resync_seconds() -> float:
+    try:
+        return max(0.0, float(os.getenv("TTS_CACHE_RESYNC_SECONDS", "60")))
+    except ValueError:
+        return 60.0
+
+
+def _cache_dir() -> Path:
+    cache_dir = Path("uploads") / "audio"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _bump(name: str, amount: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] = _stats.get(name, 0) + amount
+
+
+def tts_cache_key(text: str, voice: str, model: str, sample_rate: int) -> str:
+    raw = "\x1f".join([
+        (text or "").strip(),
+        (voice or "").strip(),
+        (model or "").strip(),
+        str(int(sample_rate or 0)),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cache_file_path(key: str) -> Path:
+    return _cache_dir() / f"{CACHE_FILE_PREFIX}{key}.wav"
+
+
+def cache_file_url(key: str) -> str:
+    return f"/uploads/audio/{CACHE_FILE_PREFIX}{key}.wav"
+
+
+def lookup_cached_wav(key: str) -> Optional[Path]:
+    if not tts_cache_enabled():
+        return None
+    path = cache_file_path(key)
+    if not path.exists():
+        _bump("misses")
+        return None
+    try:
+        # mtime doubles as the LRU clock for the eviction sweep.
+        os.utime(path, None)
+    except OSError:
+        pass
+    _bump("hits")
+    return path
+
+
+def read_cached_pcm(path: Path) -> bytes:
+    with wave.open(str(path), "rb") as wav_file:
+        return wav_file.readframes(wav_file.getnframes())
+
+
+def store_cached_wav(key: str, pcm_bytes: bytes, sample_rate: int) -> Path:
+    path = cache_file_path(key)
+    try:
+        replaced_bytes = path.stat().st_size
+    except OSError:
+        replaced_bytes = 0
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with wave.open(str(tmp_path), "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)  # 16-bit
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_bytes)
+    stored_bytes = tmp_path.stat().st_size
+    os.replace(tmp_path, path)
+    _bump("stores")
+    if _track_cache_bytes(stored_bytes - replaced_bytes) > _cache_max_bytes():
+        sweep_tts_cache()
+    return path
+
+
+def _scan_cache() -> List[Tuple[float, int, Path]]:
+    entries = []
+    for path in _cache_dir().glob(f"{CACHE_FILE_PREFIX}*.wav"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _track_cache_bytes(delta: int) -> int:
+    global _size_bytes, _size_synced_at
+    with _size_lock:
+        now = time.monotonic()
+        if _size_bytes is None or now - _size_synced_at >= _resync_seconds():
+            _size_bytes = sum(size for _, size, _ in _scan_cache())
+            _size_synced_at = now
+        else:
+            _size_bytes = max(0, _size_bytes + delta)
+        return _size_bytes
+
+
+def link_cached_wav(key: str, target: Path) -> bool:
+    # Persisted rows get their own name for the audio so a later eviction of the
+    # cache entry cannot leave them pointing at a deleted file.
+    path = cache_file_path(key)
+    try:
+        os.link(path, target)
+    except FileNotFoundError:
+        return False
+    except OSError:
+        try:
+            shutil.copyfile(path, target)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def sweep_tts_cache(max_bytes: Optional[int] = None) -> int:
+    global _size_bytes, _size_synced_at
+    limit = _cache_max_bytes() if max_bytes is None else max(0, int(max_bytes))
+    entries = _scan_cache()
+    total = sum(size for _, size, _ in entries)
+
+    evicted = 0
+    if total > limit:
+        for _, size, path in sorted(entries, key=lambda item: item[0]):
+            if total <= limit:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+    with _size_lock:
+        _size_bytes = total
+        _size_synced_at = time.monotonic()
+    if evicted:
+        _bump("evictions", evicted)
+    return evicted
+
+
+def get_tts_cache_stats() -> Dict[str, object]:
+    with _stats_lock:
+        snapshot: Dict[str, object] = dict(_stats)
+    lookups = int(snapshot["hits"]) + int(snapshot["misses"])
+    snapshot["hit_rate"] = round(int(snapshot["hits"]) / lookups, 4) if lookups else 0.0
+    snapshot["enabled"] = tts_cache_enabled()
+    snapshot["max_bytes"] = _cache_max_bytes()
+    snapshot["size_bytes"] = sum(size for _, size, _ in _scan_cache())
+    return snapshot
+
+
+def reset_tts_cache_stats() -> None:
+    global _size_bytes
+    with _stats_lock:
+        for name in list(_stats.keys()):
+            _stats[name] = 0
+    with _size_lock:
+        _size_bytes = None
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Optional, Tuple
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# Document uploads are stored once per distinct content, named by SHA-256.
+DOCUMENT_BLOB_DIR = os.path.join("uploads", "blobs")
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size: int
+    sha256: str
+    reused: bool = False
+    # For a reused blob, this upload's own copy of the bytes, kept until the
+    # document row commits in case a concurrent delete removes the shared file.
+    spare_path: Optional[str] = None
+
+
+def max_upload_bytes(env_name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(env_name, str(default))))
+    except ValueError:
+        return default
+
+
+def safe_upload_filename(filename: str, fallback: str = "upload") -> str:
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    return name or fallback
+
+
+def _write_temp(source: BinaryIO, dest_dir: str, max_bytes: int) -> Tuple[str, int, str]:
+    # Chunks go to a temp file in the destination directory (same filesystem),
+    # so the final os.replace is atomic and memory stays at one chunk per upload.
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(prefix=".upload_", suffix=".part", dir=dest_dir)
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the upload limit of {max_bytes} bytes")
+                digest.update(chunk)
+                tmp_file.write(chunk)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+
+def _discard(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def save_upload_stream(source: BinaryIO, dest_dir: str, filename: str, max_bytes: int) -> StoredUpload:
+    tmp_path, size, sha256 = _write_temp(source, dest_dir, max_bytes)
+    final_path = os.path.join(dest_dir, filename)
+    try:
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return StoredUpload(path=final_path, size=size, sha256=sha256)
+
+
+def blob_path(sha256: str, filename: str, blob_dir: str = DOCUMENT_BLOB_DIR) -> str:
+    # The extension is kept because text extraction dispatches on it.
+    ext = os.path.splitext(filename)[1]
+    return os.path.join(blob_dir, f"{sha256}{ext}")
+
+
+def save_upload_blob(source: BinaryIO, filename: str, max_bytes: int, blob_dir: str = DOCUMENT_BLOB_DIR) -> StoredUpload:
+    tmp_path, size, sha256 = _write_temp(source, blob_dir, max_bytes)
+    final_path = blob_path(sha256, filename, blob_dir)
+    if os.path.isfile(final_path):
+        # Identical content is already stored; concurrent writers produce the same bytes.
+        return StoredUpload(path=final_path, size=size, sha256=sha256, reused=True, spare_path=tmp_path)
+    try:
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+    return StoredUpload(path=final_path, size=size, sha256=sha256)
+
+
+def confirm_upload_blob(stored: StoredUpload) -> None:
+    """Call once the row pointing at a reused blob has committed.
+
+    A hard delete may have removed the shared file after this upload found it
+    and before its row was visible; the upload's own copy then takes its place.
+    """
+    if not stored.spare_path:
+        return
+    if os.path.isfile(stored.path):
+        _discard(stored.spare_path)
+    else:
+        try:
+            os.replace(stored.spare_path, stored.path)
+        except OSError:
+            _discard(stored.spare_path)
+    stored.spare_path = None
+
+
+def abandon_upload_blob(stored: StoredUpload) -> None:
+    if stored.spare_path:
+        _discard(stored.spare_path)
+        stored.spare_path = None
+
+
+def remove_unreferenced_blob(path: str, is_referenced: Callable[[], bool]) -> bool:
+    # The file is moved aside before the reference check is repeated: an upload
+    # that reused it and committed in between gets it back, and one that commits
+    # later finds it missing and restores it from its own copy.
+    trash_path = f"{path}.{uuid.uuid4().hex}.deleting"
+    try:
+        os.replace(path, trash_path)
+    except OSError:
+        return False
+    if is_referenced():
+        if os.path.isfile(path):
+            _discard(trash_path)
+        else:
+            os.replace(trash_path, path)
+        return False
+    _discard(trash_path)
+    return True
@@ -3,6 +3,7 @@ from __future__ import annotations
 from typing import Any, Dict, Optional
 
 from .ai_generator import _call_chat, _extract_json_block, _resolve_ai_config
+from .passage_index import budget_source_text
 
 
 def _build_system_prompt(task_mode: str) -> str:
@@ -49,7 +50,7 @@ def generate_writing_prompts(
 
     user_prompt = (
         f"Task mode: {mode}\n\n"
-        f"Source material:\n{(source_text or '').strip()[:12000]}\n\n"
+        f"Source material:\n{budget_source_text(source_text, custom_requirements)}\n\n"
         "Custom user specifications (must integrate all):\n"
         f"{(custom_requirements or '').strip() or 'None'}\n\n"
         "For task2_prompt_pool, generate 6 high-quality options when task2 is included."
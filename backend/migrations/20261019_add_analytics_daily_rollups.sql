@@ -0,0 +1,36 @@
+-- Per-day analytics rollups for trend lines, maintained at grading time. Backfill
+-- existing data afterwards with:
+--   python rebuild_analytics.py
+CREATE INDEX IF NOT EXISTS ix_submissions_submitted_at ON submissions(submitted_at);
+
+CREATE TABLE IF NOT EXISTS analytics_daily_submission_rollups (
+    id SERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    teacher_id INTEGER REFERENCES users(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    student_id INTEGER NOT NULL REFERENCES users(id),
+    paper_type VARCHAR NOT NULL DEFAULT 'reading',
+    submissions INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    scored INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_analytics_daily_submission_rollups_key UNIQUE (day, paper_id, student_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_daily_submission_rollups_teacher_day ON analytics_daily_submission_rollups(teacher_id, day);
+CREATE INDEX IF NOT EXISTS idx_analytics_daily_submission_rollups_paper ON analytics_daily_submission_rollups(paper_id);
+
+CREATE TABLE IF NOT EXISTS analytics_daily_skill_rollups (
+    id SERIAL PRIMARY KEY,
+    day DATE NOT NULL,
+    teacher_id INTEGER REFERENCES users(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    student_id INTEGER NOT NULL REFERENCES users(id),
+    paper_type VARCHAR NOT NULL DEFAULT 'reading',
+    skill_tag VARCHAR NOT NULL DEFAULT '',
+    answers INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_analytics_daily_skill_rollups_key UNIQUE (day, paper_id, student_id, skill_tag)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_daily_skill_rollups_teacher_day ON analytics_daily_skill_rollups(teacher_id, day);
+CREATE INDEX IF NOT EXISTS idx_analytics_daily_skill_rollups_paper ON analytics_daily_skill_rollups(paper_id);
@@ -0,0 +1,33 @@
+-- Dashboard rollups maintained at grading time. Backfill existing data afterwards with:
+--   python rebuild_analytics.py
+CREATE TABLE IF NOT EXISTS analytics_submission_rollups (
+    id SERIAL PRIMARY KEY,
+    teacher_id INTEGER REFERENCES users(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    student_id INTEGER NOT NULL REFERENCES users(id),
+    paper_type VARCHAR NOT NULL DEFAULT 'reading',
+    submissions INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    scored INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_analytics_submission_rollups_paper_student UNIQUE (paper_id, student_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_submission_rollups_teacher ON analytics_submission_rollups(teacher_id, paper_type);
+CREATE INDEX IF NOT EXISTS idx_analytics_submission_rollups_student ON analytics_submission_rollups(student_id);
+
+CREATE TABLE IF NOT EXISTS analytics_answer_rollups (
+    id SERIAL PRIMARY KEY,
+    teacher_id INTEGER REFERENCES users(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    student_id INTEGER NOT NULL REFERENCES users(id),
+    paper_type VARCHAR NOT NULL DEFAULT 'reading',
+    skill_tag VARCHAR NOT NULL DEFAULT '',
+    question_type VARCHAR NOT NULL DEFAULT '',
+    answers INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    incorrect INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_analytics_answer_rollups_key UNIQUE (paper_id, student_id, skill_tag, question_type)
+);
+
+CREATE INDEX IF NOT EXISTS idx_analytics_answer_rollups_teacher ON analytics_answer_rollups(teacher_id, paper_type);
+CREATE INDEX IF NOT EXISTS idx_analytics_answer_rollups_student ON analytics_answer_rollups(student_id);
@@ -0,0 +1,32 @@
+-- Numeric rubric bands and writing metrics, copied out of answers.rubric_scores /
+-- answers.writing_metrics so analytics can average them with AVG().
+CREATE TABLE IF NOT EXISTS answer_scores (
+    id SERIAL PRIMARY KEY,
+    answer_id INTEGER NOT NULL REFERENCES answers(id),
+    kind VARCHAR NOT NULL,
+    name VARCHAR NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    CONSTRAINT uq_answer_scores_answer_kind_name UNIQUE (answer_id, kind, name)
+);
+
+-- Backfill from existing JSON. Re-running is safe; `python rebuild_analytics.py`
+-- performs the same backfill on databases without JSON operators.
+INSERT INTO answer_scores (answer_id, kind, name, value)
+SELECT a.id, k.kind, k.name, (a.rubric_scores ->> k.name)::double precision
+FROM answers a
+CROSS JOIN (VALUES
+    ('rubric', 'content'), ('rubric', 'language'), ('rubric', 'organization'), ('rubric', 'overall')
+) AS k(kind, name)
+WHERE json_typeof(a.rubric_scores -> k.name) = 'number'
+ON CONFLICT (answer_id, kind, name) DO NOTHING;
+
+INSERT INTO answer_scores (answer_id, kind, name, value)
+SELECT a.id, k.kind, k.name, (a.writing_metrics ->> k.name)::double precision
+FROM answers a
+CROSS JOIN (VALUES
+    ('metric', 'LD'), ('metric', 'TTR'), ('metric', 'MSTTR'),
+    ('metric', 'MLS'), ('metric', 'MLT'), ('metric', 'C/S'),
+    ('metric', 'Temporal_token_density'), ('metric', 'Expansion_token_density'), ('metric', 'Comparison_token_density')
+) AS k(kind, name)
+WHERE json_typeof(a.writing_metrics -> k.name) = 'number'
+ON CONFLICT (answer_id, kind, name) DO NOTHING;
@@ -0,0 +1,3 @@
+-- Uploads are stored content-addressed under uploads/blobs; identical uploads share
+-- one file_path, which is reference-counted on hard delete.
+CREATE INDEX IF NOT EXISTS idx_documents_file_path ON documents(file_path);
@@ -0,0 +1,4 @@
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS extraction_status VARCHAR(16) DEFAULT 'ready';
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS extraction_error TEXT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_documents_extraction_pending ON documents(extraction_status) WHERE extraction_status = 'pending';
@@ -0,0 +1,4 @@
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS file_size INTEGER NULL;
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64) NULL;
+
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash);
@@ -0,0 +1,2 @@
+-- Keyset-paginated folder listings: owner/parent filter, then (created_at, id) order.
+CREATE INDEX IF NOT EXISTS idx_documents_listing ON documents(uploaded_by, parent_id, created_at, id);
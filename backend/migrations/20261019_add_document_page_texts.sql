@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS document_page_texts (
+    id SERIAL PRIMARY KEY,
+    content_hash VARCHAR(64) NOT NULL,
+    page_number INTEGER NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    CONSTRAINT uq_document_page_texts_hash_page UNIQUE (content_hash, page_number)
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_page_texts_hash ON document_page_texts(content_hash);
@@ -0,0 +1,2 @@
+-- Folder subtrees are resolved with a recursive CTE that joins on parent_id.
+CREATE INDEX IF NOT EXISTS idx_documents_parent_id ON documents(parent_id);
@@ -0,0 +1,11 @@
+CREATE TABLE IF NOT EXISTS document_passages (
+    id SERIAL PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id),
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    token_count INTEGER NOT NULL DEFAULT 0,
+    terms JSON NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_passages_document ON document_passages(document_id, position);
@@ -0,0 +1,6 @@
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(content, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_documents_search_vector ON documents USING GIN (search_vector);
@@ -0,0 +1,26 @@
+-- Item-analysis running sums maintained at grading time. Backfill existing data afterwards with:
+--   python rebuild_analytics.py
+CREATE TABLE IF NOT EXISTS question_item_stats (
+    id SERIAL PRIMARY KEY,
+    question_id INTEGER NOT NULL UNIQUE REFERENCES questions(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    teacher_id INTEGER REFERENCES users(id),
+    responses INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    score_sq_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    correct_score_sum DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS ix_question_item_stats_paper_id ON question_item_stats(paper_id);
+
+CREATE TABLE IF NOT EXISTS question_option_stats (
+    id SERIAL PRIMARY KEY,
+    question_id INTEGER NOT NULL REFERENCES questions(id),
+    paper_id INTEGER NOT NULL REFERENCES papers(id),
+    option VARCHAR NOT NULL,
+    responses INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_question_option_stats_question_option UNIQUE (question_id, option)
+);
+
+CREATE INDEX IF NOT EXISTS ix_question_option_stats_paper_id ON question_option_stats(paper_id);
@@ -0,0 +1,2 @@
+ALTER TABLE listening_paper_jobs ADD COLUMN IF NOT EXISTS owner VARCHAR(255) NULL;
+ALTER TABLE listening_paper_jobs ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ NULL;
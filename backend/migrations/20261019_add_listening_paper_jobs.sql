@@ -0,0 +1,18 @@
+CREATE TABLE IF NOT EXISTS listening_paper_jobs (
+    id SERIAL PRIMARY KEY,
+    teacher_id INTEGER NOT NULL REFERENCES users(id),
+    status VARCHAR(32) DEFAULT 'queued',
+    stage VARCHAR(32) DEFAULT 'script',
+    progress INTEGER DEFAULT 0,
+    request_payload JSON NOT NULL,
+    script_result JSON NULL,
+    audio_result JSON NULL,
+    paper_id INTEGER NULL REFERENCES papers(id),
+    error TEXT NULL,
+    attempts INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_listening_paper_jobs_teacher ON listening_paper_jobs(teacher_id);
+CREATE INDEX IF NOT EXISTS idx_listening_paper_jobs_status ON listening_paper_jobs(status);
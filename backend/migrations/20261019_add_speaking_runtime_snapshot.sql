@@ -0,0 +1,2 @@
+ALTER TABLE speaking_sessions ADD COLUMN IF NOT EXISTS runtime_config JSON NULL;
+ALTER TABLE speaking_sessions ADD COLUMN IF NOT EXISTS runtime_config_version INTEGER DEFAULT 0;
@@ -0,0 +1,2 @@
+-- Earlier snapshots embedded API keys; drop them so they are rebuilt with key references only.
+UPDATE speaking_sessions SET runtime_config = NULL WHERE runtime_config IS NOT NULL;
@@ -0,0 +1,31 @@
+import argparse
+
+from app.database import SessionLocal, engine, Base
+from app.services.analytics_rollup import rebuild_analytics_rollups
+from app.services.item_analysis import rebuild_item_statistics
+
+# Ensure tables exist
+Base.metadata.create_all(bind=engine)
+
+
+def rebuild(paper_id=None):
+    db = SessionLocal()
+    try:
+        counts = rebuild_analytics_rollups(db, paper_id=paper_id)
+        items = rebuild_item_statistics(db, paper_id=paper_id)
+        db.commit()
+        scope = f"paper {paper_id}" if paper_id is not None else "all papers"
+        print(
+            f"Rebuilt analytics rollups for {scope}: {counts['submission_rows']} submission rows, "
+            f"{counts['answer_rows']} answer rows, {counts['answer_score_rows']} new answer scores"
+        )
+        print(f"Rebuilt item statistics for {scope}: {items['item_rows']} questions, {items['option_rows']} option rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild analytics rollup and item-statistics tables from submissions and answers.")
+    parser.add_argument("--paper-id", type=int, default=None, help="Only rebuild rollups for this paper")
+    args = parser.parse_args()
+    rebuild(args.paper_id)
@@ -13,6 +13,8 @@ from app.models.paper import Paper
 from app.models.question import Question
 from app.models.submission import Submission, Answer
 from app.auth.jwt import get_password_hash
+from app.services.analytics_rollup import rebuild_analytics_rollups
+from app.services.item_analysis import rebuild_item_statistics
 
 def seed_analytics():
     db = SessionLocal()
@@ -101,6 +103,8 @@ def seed_analytics():
     final_score = (correct_count / total) * 100
     submission.score = final_score
     db.add(submission)
+    rebuild_analytics_rollups(db, paper_id=paper.id)
+    rebuild_item_statistics(db, paper_id=paper.id)
     
     db.commit()
     print(f"Analytics Data Seeded. Student Score: {final_score}. Weak Skill: Geometry.")
@@ -8,8 +8,9 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import pytest
 
-from app.database import Base, get_db
+from app.database import Base, get_db, get_read_db
 from app.main import app
+from app.services.analytics_cache import clear_analytics_cache
 
 SQLALCHEMY_DATABASE_URL = os.environ["DATABASE_URL"]
 connect_args = {"check_same_thread": False}
@@ -29,12 +30,15 @@ def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
 
 
 @pytest.fixture()
 def db_session():
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # Ids are reused across the recreated database, so cached analytics must go too.
+    clear_analytics_cache()
     db = TestingSessionLocal()
     try:
         yield db
@@ -5,6 +5,7 @@ from app.models.student_association import StudentClass
 from app.models.paper import Paper
 from app.models.question import Question
 from app.models.submission import Submission, Answer
+from app.services.analytics_rollup import rebuild_analytics_rollups
 
 
 def seed_analytics_data(db):
@@ -39,6 +40,10 @@ def seed_analytics_data(db):
     db.add_all([a1, a2])
     db.commit()
 
+    # Rows inserted directly bypass grading, so backfill the dashboard rollups.
+    rebuild_analytics_rollups(db)
+    db.commit()
+
     return teacher, student, class_
 
 
@@ -0,0 +1,69 @@
+from app.models.paper import Paper
+from app.models.question import Question
+from app.models.user import User
+from tests.test_analytics_rollup import auth_header, seed_paper
+
+
+def seed_mixed(client, db_session):
+    teacher, student, other, class_, paper, q1, q2 = seed_paper(db_session)
+    third = User(username="student_rollup_third", password_hash="x", role="student")
+    db_session.add(third)
+    writing = Paper(title="Essay", article_content="", created_by=teacher.id, paper_type="writing")
+    db_session.add(writing)
+    db_session.commit()
+    essay = Question(paper_id=writing.id, question_text="Essay", question_type="writing_task1", writing_task_type="task1")
+    db_session.add(essay)
+    db_session.commit()
+
+    for user, answers in [
+        (student, [("A", q1), ("C", q2)]),
+        (other, [("D", q1), ("B", q2)]),
+        (third, [("D", q1), ("C", q2)]),
+        (student, [("A", q1), ("B", q2)]),
+    ]:
+        res = client.post(
+            f"/papers/{paper.id}/submit",
+            headers=auth_header(user),
+            json={"answers": [{"question_id": q.id, "answer": a} for a, q in answers]},
+        )
+        assert res.status_code == 200
+    res = client.post(
+        f"/papers/writing/{writing.id}/submit",
+        headers=auth_header(student),
+        json={"responses": [{"question_id": essay.id, "answer": "School life is busy but rewarding."}]},
+    )
+    assert res.status_code == 200
+    return teacher, class_
+
+
+def test_bundle_matches_individual_endpoints(client, db_session):
+    teacher, class_ = seed_mixed(client, db_session)
+
+    for query in ["", f"class_id={class_.id}", "paper_type=writing", "limit=1"]:
+        bundle = client.get(f"/analytics/bundle?{query}", headers=auth_header(teacher)).json()
+        for section, path in [
+            ("overview", "overview"),
+            ("subject_breakdown", "subject-breakdown"),
+            ("weak_skills", "weak-skills"),
+            ("student_performance", "student-performance"),
+            ("weak_areas", "weak-areas"),
+        ]:
+            single = client.get(f"/analytics/{path}?{query}", headers=auth_header(teacher)).json()
+            assert bundle[section] == single, (query, section)
+
+
+def test_subject_breakdown_reports_productive_papers_alongside_objective(client, db_session):
+    teacher, _ = seed_mixed(client, db_session)
+
+    payload = client.get("/analytics/subject-breakdown", headers=auth_header(teacher)).json()
+    assert payload["objective"]["reading_accuracy"] == 50.0
+    assert [item["paper_type"] for item in payload["productive"]["by_paper_type"]] == ["writing"]
+
+
+def test_exports_use_bundle(client, db_session):
+    teacher, _ = seed_mixed(client, db_session)
+
+    res = client.get("/analytics/export.csv", headers=auth_header(teacher))
+    assert res.status_code == 200
+    assert "student_rollup_third" in res.text
+    assert client.get("/analytics/export.pdf", headers=auth_header(teacher)).content.startswith(b"%PDF-")
@@ -0,0 +1,93 @@
+from app.auth import jwt
+from app.models.submission import Submission
+from app.models.user import User
+from app.services.analytics_cache import MemoryAnalyticsCache, get_analytics_cache_stats
+from app.services.analytics_rollup import rebuild_analytics_rollups
+from tests.test_analytics_rollup import seed_paper
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_repeat_views_hit_cache_until_a_submission(client, db_session):
+    teacher, student, _, _, paper, q1, q2 = seed_paper(db_session)
+    answers = [{"question_id": q1.id, "answer": "A"}, {"question_id": q2.id, "answer": "B"}]
+    assert client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={"answers": answers}).status_code == 200
+
+    first = client.get("/analytics/overview?paper_type=all", headers=auth_header(teacher)).json()
+    # Same filters spelled differently share the entry.
+    second = client.get("/analytics/overview", headers=auth_header(teacher)).json()
+    assert first == second == {"total_submissions": 1, "average_score": 100.0, "active_students": 1}
+    assert get_analytics_cache_stats() == {"hits": 1, "misses": 1}
+
+    # Data written around the grading path is not seen until something invalidates.
+    db_session.add(Submission(student_id=student.id, paper_id=paper.id, score=0.0))
+    db_session.commit()
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
+    assert client.get("/analytics/overview", headers=auth_header(teacher)).json()["total_submissions"] == 1
+
+    assert client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={"answers": answers}).status_code == 200
+    assert client.get("/analytics/overview", headers=auth_header(teacher)).json()["total_submissions"] == 3
+
+
+def test_roster_change_invalidates_class_filtered_views(client, db_session):
+    teacher, _, other, class_, paper, q1, _ = seed_paper(db_session)
+    client.post(f"/papers/{paper.id}/submit", headers=auth_header(other), json={"answers": [{"question_id": q1.id, "answer": "A"}]})
+
+    url = f"/analytics/overview?class_id={class_.id}"
+    assert client.get(url, headers=auth_header(teacher)).json()["total_submissions"] == 0
+
+    res = client.post(f"/classes/{class_.id}/students", headers=auth_header(teacher), json={"username": other.username})
+    assert res.status_code == 200
+    assert client.get(url, headers=auth_header(teacher)).json()["total_submissions"] == 1
+
+
+def test_student_report_is_cached_per_student_until_their_activity(client, db_session):
+    teacher, student, other, _, paper, q1, q2 = seed_paper(db_session)
+    answers = [{"question_id": q1.id, "answer": "A"}, {"question_id": q2.id, "answer": "C"}]
+    assert client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={"answers": answers}).status_code == 200
+
+    report = client.get("/analytics/student-report", headers=auth_header(student)).json()
+    assert report["overview"]["total_submissions"] == 1
+    assert report["weak_skills"] == [{"skill": "Vocabulary", "errors": 1}]
+    assert [item["skill"] for item in report["skill_accuracy"]] == ["Inference", "Vocabulary"]
+    assert client.get("/analytics/student-report", headers=auth_header(student)).json() == report
+    assert get_analytics_cache_stats() == {"hits": 1, "misses": 1}
+
+    # Another student's activity leaves this entry alone.
+    client.post(f"/papers/{paper.id}/submit", headers=auth_header(other), json={"answers": answers})
+    client.get("/analytics/student-report", headers=auth_header(student))
+    assert get_analytics_cache_stats()["hits"] == 2
+
+    assert client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={"answers": answers}).status_code == 200
+    assert client.get("/analytics/student-report", headers=auth_header(student)).json()["overview"]["total_submissions"] == 2
+
+    speaking = client.post(
+        "/papers/speaking",
+        headers=auth_header(teacher),
+        json={"title": "Oral", "scenario": "Travel", "starter_prompt": "Hello.", "max_turns": 4},
+    ).json()["paper_id"]
+    session_id = client.post(f"/papers/speaking/{speaking}/sessions", headers=auth_header(student), json={}).json()["session_id"]
+    overview = client.get("/analytics/student-report", headers=auth_header(student)).json()["speaking_overview"]
+    assert (overview["total_sessions"], overview["completed_sessions"]) == (1, 0)
+
+    assert client.post(f"/papers/speaking/sessions/{session_id}/complete", headers=auth_header(student)).status_code == 200
+    recent = client.get("/analytics/student-report", headers=auth_header(student)).json()["speaking_recent"]
+    assert recent[0]["status"] == "completed"
+    assert recent[0]["examiner_turns"] == 1
+
+
+def test_memory_backend_evicts_least_recently_used():
+    cache = MemoryAnalyticsCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    assert cache.get("a") == "1"
+    cache.set("c", "3", ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.generation("teacher:1") == 0
+    cache.bump("teacher:1")
+    assert cache.generation("teacher:1") == 1
@@ -0,0 +1,68 @@
+import math
+
+import pytest
+
+from app.services import cohort_stats
+from app.services.analytics_cache import get_analytics_cache_stats
+from app.services.cohort_stats import cohort_statistics
+from tests.test_analytics_rollup import auth_header, seed_paper
+
+SCORES = [60.0, 100.0, 40.0, 80.0, 60.0]
+
+
+def test_cohort_statistics_python_path():
+    stats = cohort_statistics(SCORES, bins=10, use_numpy=False)
+
+    assert stats["count"] == 5
+    assert stats["mean"] == 68.0
+    assert math.isclose(stats["std"], math.sqrt(416.0))
+    assert stats["percentiles"] == {"p10": 48.0, "p25": 60.0, "p50": 60.0, "p75": 80.0, "p90": 92.0}
+    assert [bucket["count"] for bucket in stats["histogram"]] == [0, 0, 0, 0, 1, 0, 2, 0, 1, 1]
+    assert stats["histogram"][-1] == {"lower": 90.0, "upper": 100.0, "count": 1}
+    # Aligned with the input order; tied scores share a rank.
+    assert stats["percentile_ranks"] == [40.0, 90.0, 10.0, 70.0, 40.0]
+    assert math.isclose(stats["z_scores"][1], 32.0 / math.sqrt(416.0))
+
+    empty = cohort_statistics([], bins=4)
+    assert empty["count"] == 0 and empty["mean"] is None
+    assert [bucket["count"] for bucket in empty["histogram"]] == [0, 0, 0, 0]
+
+
+def test_numpy_and_python_paths_agree():
+    assert cohort_stats.np is not None
+    vectorized = cohort_statistics(SCORES, bins=7, use_numpy=True)
+    plain = cohort_statistics(SCORES, bins=7, use_numpy=False)
+    assert vectorized["histogram"] == plain["histogram"]
+    for key in ("mean", "std", "min", "max"):
+        assert math.isclose(vectorized[key], plain[key])
+    for key, value in plain["percentiles"].items():
+        assert math.isclose(vectorized["percentiles"][key], value)
+    assert vectorized["percentile_ranks"] == pytest.approx(plain["percentile_ranks"])
+    assert vectorized["z_scores"] == pytest.approx(plain["z_scores"])
+
+
+def test_distribution_endpoint_ranks_students_and_caches(client, db_session):
+    teacher, student, other, class_, paper, q1, q2 = seed_paper(db_session)
+    for user, answers in [(student, ["A", "B"]), (other, ["A", "C"])]:
+        res = client.post(
+            f"/papers/{paper.id}/submit",
+            headers=auth_header(user),
+            json={"answers": [{"question_id": q.id, "answer": a} for q, a in zip((q1, q2), answers)]},
+        )
+        assert res.status_code == 200
+
+    url = f"/analytics/distribution?paper_id={paper.id}&bins=4"
+    payload = client.get(url, headers=auth_header(teacher)).json()
+    assert (payload["count"], payload["mean"], payload["median"]) == (2, 75.0, 75.0)
+    assert [bucket["count"] for bucket in payload["histogram"]] == [0, 0, 1, 1]
+    assert [(item["student"], item["percentile_rank"], item["z_score"]) for item in payload["students"]] == [
+        ("student_rollup_other", 25.0, -1.0),
+        ("student_rollup", 75.0, 1.0),
+    ]
+
+    assert client.get(url, headers=auth_header(teacher)).json() == payload
+    assert get_analytics_cache_stats() == {"hits": 1, "misses": 1}
+
+    in_class = client.get(f"/analytics/distribution?class_id={class_.id}", headers=auth_header(teacher)).json()
+    assert [item["student"] for item in in_class["students"]] == ["student_rollup"]
+    assert client.get("/analytics/distribution", headers=auth_header(student)).status_code == 403
@@ -2,6 +2,7 @@ from tests.test_analytics import seed_analytics_data, auth_header
 from app.models.paper import Paper
 from app.models.question import Question
 from app.models.submission import Submission, Answer
+from app.services.analytics_rollup import rebuild_analytics_rollups
 
 
 def test_analytics_overview(client, db_session):
@@ -110,6 +111,8 @@ def test_analytics_subject_breakdown_productive_metrics(client, db_session):
     )
     db_session.add(answer)
     db_session.commit()
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
 
     res = client.get(f"/analytics/subject-breakdown?class_id={class_.id}", headers=auth_header(teacher))
     assert res.status_code == 200
@@ -149,6 +152,8 @@ def test_analytics_overview_filters_by_subject(client, db_session):
     listening_submission = Submission(student_id=student.id, paper_id=listening_paper.id, score=92.0)
     db_session.add(listening_submission)
     db_session.commit()
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
 
     res = client.get(
         f"/analytics/overview?class_id={class_.id}&paper_type=listening",
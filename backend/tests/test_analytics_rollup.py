@@ -0,0 +1,146 @@
+from app.auth import jwt
+from app.models.user import User
+from app.models.class_model import ClassModel
+from app.models.student_association import StudentClass
+from app.models.paper import Paper
+from app.models.question import Question
+from app.models.submission import Answer, AnswerScore
+from app.models.analytics_rollup import AnalyticsAnswerRollup, AnalyticsSubmissionRollup
+from app.services.analytics_rollup import rebuild_analytics_rollups
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def seed_paper(db_session):
+    teacher = User(username="teacher_rollup", password_hash="x", role="teacher")
+    student = User(username="student_rollup", password_hash="x", role="student")
+    other = User(username="student_rollup_other", password_hash="x", role="student")
+    db_session.add_all([teacher, student, other])
+    db_session.commit()
+
+    class_ = ClassModel(name="Rollup Class", teacher_id=teacher.id)
+    db_session.add(class_)
+    db_session.commit()
+    db_session.add(StudentClass(user_id=student.id, class_id=class_.id))
+    db_session.commit()
+
+    paper = Paper(title="Rollup Paper", article_content="Text", created_by=teacher.id, class_id=class_.id)
+    db_session.add(paper)
+    db_session.commit()
+
+    q1 = Question(paper_id=paper.id, question_text="Q1", question_type="mcq", correct_answer="A", skill_tag="Inference")
+    q2 = Question(paper_id=paper.id, question_text="Q2", question_type="mcq", correct_answer="B", skill_tag="Vocabulary")
+    db_session.add_all([q1, q2])
+    db_session.commit()
+    return teacher, student, other, class_, paper, q1, q2
+
+
+def _snapshot(db_session):
+    db_session.expire_all()
+    submissions = sorted(
+        (r.paper_id, r.student_id, r.paper_type, r.submissions, round(r.score_sum, 6), r.scored)
+        for r in db_session.query(AnalyticsSubmissionRollup).all()
+    )
+    answers = sorted(
+        (r.paper_id, r.student_id, r.skill_tag, r.question_type, r.answers, r.correct, r.incorrect)
+        for r in db_session.query(AnalyticsAnswerRollup).all()
+    )
+    return submissions, answers
+
+
+def test_grading_updates_rollups_incrementally(client, db_session):
+    teacher, student, other, class_, paper, q1, q2 = seed_paper(db_session)
+
+    for user, answers in [
+        (student, [{"question_id": q1.id, "answer": "A"}, {"question_id": q2.id, "answer": "C"}]),
+        (student, [{"question_id": q1.id, "answer": "A"}, {"question_id": q2.id, "answer": "B"}]),
+        (other, [{"question_id": q1.id, "answer": "D"}, {"question_id": q2.id, "answer": "B"}]),
+    ]:
+        res = client.post(f"/papers/{paper.id}/submit", headers=auth_header(user), json={"answers": answers})
+        assert res.status_code == 200
+
+    rows = {r.student_id: r for r in db_session.query(AnalyticsSubmissionRollup).all()}
+    assert rows[student.id].submissions == 2
+    assert rows[student.id].score_sum == 150.0
+    assert rows[other.id].submissions == 1
+
+    inference = db_session.query(AnalyticsAnswerRollup).filter_by(student_id=student.id, skill_tag="Inference").one()
+    assert (inference.answers, inference.correct, inference.incorrect) == (2, 2, 0)
+
+    overview = client.get("/analytics/overview", headers=auth_header(teacher)).json()
+    assert overview == {"total_submissions": 3, "average_score": 66.7, "active_students": 2}
+
+    # The class filter resolves through the roster: only `student` is enrolled.
+    class_overview = client.get(f"/analytics/overview?class_id={class_.id}", headers=auth_header(teacher)).json()
+    assert class_overview["total_submissions"] == 2
+    assert class_overview["average_score"] == 75.0
+
+    weak = client.get("/analytics/weak-skills", headers=auth_header(teacher)).json()
+    assert {item["skill"]: item["errors"] for item in weak} == {"Inference": 1, "Vocabulary": 1}
+
+    # A full rebuild reproduces exactly what grading maintained.
+    incremental = _snapshot(db_session)
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
+    assert _snapshot(db_session) == incremental
+
+
+def test_manual_regrade_and_paper_delete_update_rollups(client, db_session):
+    teacher, student, _, _, paper, q1, q2 = seed_paper(db_session)
+    res = client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={
+        "answers": [{"question_id": q1.id, "answer": "A"}, {"question_id": q2.id, "answer": "C"}]
+    })
+    submission_id = res.json()["submission_id"]
+    answer = db_session.query(Answer).filter_by(submission_id=submission_id, question_id=q2.id).one()
+
+    res = client.put(
+        f"/papers/submissions/answers/{answer.id}/score",
+        headers=auth_header(teacher),
+        json={"score": 1.0},
+    )
+    assert res.status_code == 200
+    performance = client.get("/analytics/student-performance", headers=auth_header(teacher)).json()
+    assert performance[0]["average_score"] == round(res.json()["total_score"], 1)
+    assert performance[0]["exams_taken"] == 1
+
+    assert client.delete(f"/papers/{paper.id}", headers=auth_header(teacher)).status_code == 200
+    assert _snapshot(db_session) == ([], [])
+    assert client.get("/analytics/overview", headers=auth_header(teacher)).json()["total_submissions"] == 0
+
+
+def test_writing_scores_are_stored_numerically_for_sql_averages(client, db_session):
+    teacher, student, _, _, _, _, _ = seed_paper(db_session)
+    writing = Paper(title="Rollup Essay", article_content="", created_by=teacher.id, paper_type="writing")
+    db_session.add(writing)
+    db_session.commit()
+    essay = Question(paper_id=writing.id, question_text="Essay", question_type="writing_task1", writing_task_type="task1")
+    db_session.add(essay)
+    db_session.commit()
+
+    res = client.post(
+        f"/papers/writing/{writing.id}/submit",
+        headers=auth_header(student),
+        json={"responses": [{"question_id": essay.id, "answer": "School life is busy. It is also rewarding."}]},
+    )
+    assert res.status_code == 200
+    answer = db_session.query(Answer).filter_by(question_id=essay.id).one()
+    stored = {(s.kind, s.name): s.value for s in db_session.query(AnswerScore).filter_by(answer_id=answer.id)}
+    assert stored[("rubric", "overall")] == answer.rubric_scores["overall"]
+    assert stored[("metric", "TTR")] == answer.writing_metrics["TTR"]
+
+    productive = client.get("/analytics/subject-breakdown", headers=auth_header(teacher)).json()["productive"]
+    assert productive["rubric"]["overall"] == round(answer.rubric_scores["overall"], 3)
+
+    # Answers graded before the side table existed are picked up by the rebuild.
+    db_session.query(AnswerScore).delete()
+    db_session.commit()
+    assert rebuild_analytics_rollups(db_session)["answer_score_rows"] == len(stored)
+    db_session.commit()
+    assert rebuild_analytics_rollups(db_session)["answer_score_rows"] == 0
+    db_session.commit()
+
+    assert client.delete(f"/papers/{writing.id}", headers=auth_header(teacher)).status_code == 200
+    assert db_session.query(AnswerScore).count() == 0
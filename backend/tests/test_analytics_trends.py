@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.analytics_rollup import AnalyticsDailySkillRollup, AnalyticsDailySubmissionRollup
+from app.models.submission import Answer, Submission
+from app.services.analytics_rollup import rebuild_analytics_rollups, record_submission, utc_date
+from tests.test_analytics_rollup import auth_header, seed_paper
+
+
+def _daily_snapshot(db_session):
+    db_session.expire_all()
+    submissions = sorted(
+        (str(r.day), r.paper_id, r.student_id, r.submissions, round(r.score_sum, 6), r.scored)
+        for r in db_session.query(AnalyticsDailySubmissionRollup).all()
+    )
+    skills = sorted(
+        (str(r.day), r.paper_id, r.student_id, r.skill_tag, r.answers, r.correct)
+        for r in db_session.query(AnalyticsDailySkillRollup).all()
+    )
+    return submissions, skills
+
+
+def _submit(client, paper, user, first, second, q1, q2):
+    res = client.post(
+        f"/papers/{paper.id}/submit",
+        headers=auth_header(user),
+        json={"answers": [{"question_id": q1.id, "answer": first}, {"question_id": q2.id, "answer": second}]},
+    )
+    assert res.status_code == 200
+    return res.json()["submission_id"]
+
+
+def test_trends_bucket_daily_rollups_by_week_and_month(client, db_session):
+    teacher, student, other, class_, paper, q1, q2 = seed_paper(db_session)
+    history = [
+        (student, "A", "C", datetime(2026, 9, 7, 9, 0)),   # Monday: 50, Inference right
+        (other, "D", "B", datetime(2026, 9, 9, 15, 0)),    # same week: 50, Inference wrong
+        (student, "A", "B", datetime(2026, 9, 15, 10, 0)),  # next week: 100
+    ]
+    for user, first, second, submitted_at in history:
+        submission_id = _submit(client, paper, user, first, second, q1, q2)
+        db_session.get(Submission, submission_id).submitted_at = submitted_at
+    db_session.commit()
+    # Grading stamped today's date; rebuild files the backdated submissions under their days.
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
+
+    url = "/analytics/trends?bucket=week&start=2026-09-01&end=2026-09-20"
+    weekly = client.get(url, headers=auth_header(teacher)).json()
+    assert [p["period"] for p in weekly["points"]] == ["2026-08-31", "2026-09-07", "2026-09-14"]
+    assert [(p["submissions"], p["average_score"], p["accuracy"]) for p in weekly["points"]] == [
+        (0, None, None),
+        (2, 50.0, 50.0),
+        (1, 100.0, 100.0),
+    ]
+    inference = next(series for series in weekly["skills"] if series["skill"] == "Inference")
+    assert [p["accuracy"] for p in inference["points"]] == [None, 50.0, 100.0]
+
+    monthly = client.get(f"/analytics/trends?bucket=month&start=2026-08-15&end=2026-09-30&class_id={class_.id}", headers=auth_header(teacher)).json()
+    assert [(p["period"], p["submissions"]) for p in monthly["points"]] == [("2026-08-01", 0), ("2026-09-01", 2)]
+
+    assert client.get("/analytics/trends?bucket=year", headers=auth_header(teacher)).status_code == 400
+    assert client.get("/analytics/trends?start=2026-09-02&end=2026-09-01", headers=auth_header(teacher)).status_code == 400
+    assert client.get("/analytics/trends", headers=auth_header(student)).status_code == 403
+
+
+def test_daily_rollups_follow_grading_and_paper_delete(client, db_session):
+    teacher, student, other, _, paper, q1, q2 = seed_paper(db_session)
+    _submit(client, paper, student, "A", "C", q1, q2)
+    _submit(client, paper, other, "D", "B", q1, q2)
+
+    today = datetime.now(timezone.utc).date()
+    day = client.get(f"/analytics/trends?bucket=day&start={today}&end={today}", headers=auth_header(teacher)).json()
+    assert day["points"] == [{"period": str(today), "submissions": 2, "average_score": 50.0, "accuracy": 50.0}]
+
+    incremental = _daily_snapshot(db_session)
+    assert incremental[0] and incremental[1]
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
+    assert _daily_snapshot(db_session) == incremental
+
+    assert client.delete(f"/papers/{paper.id}", headers=auth_header(teacher)).status_code == 200
+    assert _daily_snapshot(db_session) == ([], [])
+
+
+def test_incremental_and_rebuilt_daily_rows_share_the_utc_day(client, db_session):
+    _, student, other, _, paper, q1, q2 = seed_paper(db_session)
+    eastern = timezone(timedelta(hours=-5))
+    tokyo = timezone(timedelta(hours=9))
+    history = [
+        (student, datetime(2026, 10, 19, 23, 30, tzinfo=eastern), True),  # 2026-10-20 04:30 UTC
+        (other, datetime(2026, 10, 20, 7, 15, tzinfo=tokyo), False),       # 2026-10-19 22:15 UTC
+    ]
+    for user, submitted_at, correct in history:
+        submission = Submission(student_id=user.id, paper_id=paper.id, submitted_at=submitted_at, score=50.0)
+        db_session.add(submission)
+        db_session.flush()
+        answers = [
+            Answer(submission_id=submission.id, question_id=q1.id, answer="A", is_correct=correct),
+            Answer(submission_id=submission.id, question_id=q2.id, answer="C", is_correct=False),
+        ]
+        db_session.add_all(answers)
+        db_session.flush()
+        record_submission(db_session, submission, answers)
+    db_session.commit()
+
+    incremental = _daily_snapshot(db_session)
+    assert sorted({row[0] for row in incremental[0]}) == ["2026-10-19", "2026-10-20"]
+    assert ("2026-10-20", paper.id, student.id, 1, 50.0, 1) in incremental[0]
+    rebuild_analytics_rollups(db_session)
+    db_session.commit()
+    assert _daily_snapshot(db_session) == incremental
+
+    # Postgres converts to UTC before truncating, so the session time zone cannot move the day.
+    rendered = str(utc_date(Submission.submitted_at).compile(dialect=postgresql.dialect()))
+    assert rendered == "CAST((submissions.submitted_at AT TIME ZONE 'UTC') AS DATE)"
@@ -0,0 +1,65 @@
+import time
+
+from app.auth import jwt
+from app.models.document import Document
+from app.models.document_page_text import DocumentPageText
+from app.models.user import User
+from app.services import document_extraction
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def wait_for_extraction(client, doc_id, user, timeout=20.0):
+    deadline = time.time() + timeout
+    while True:
+        body = client.get(f"/documents/{doc_id}", headers=auth_header(user)).json()
+        if body["extraction_status"] != "pending" or time.time() > deadline:
+            return body
+        time.sleep(0.05)
+
+
+def test_page_ranges_split_contiguous_runs():
+    assert document_extraction._page_ranges([0, 1, 2, 3, 4], 2) == [(0, 2), (2, 4), (4, 5)]
+    assert document_extraction._page_ranges([1, 2, 5, 6, 7], 8) == [(1, 3), (5, 8)]
+    assert document_extraction._page_ranges([], 4) == []
+
+
+def test_pdf_pages_extracted_in_ranges_and_cached_by_hash(client, db_session, monkeypatch):
+    teacher = User(username="teacher_pdf_pages", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+
+    calls = []
+
+    def fake_pages(file_path, start, end):
+        calls.append((start, end))
+        return [f"Text of page {page}." for page in range(start, end)]
+
+    monkeypatch.setenv("DOCUMENT_EXTRACTION_PROCESSES", "0")
+    monkeypatch.setenv("PDF_PAGES_PER_TASK", "2")
+    monkeypatch.setattr(document_extraction, "pdf_page_count", lambda file_path: 5)
+    monkeypatch.setattr(document_extraction, "extract_pdf_pages", fake_pages)
+
+    files = {"file": ("chapter.pdf", b"%PDF-fake chapter body", "application/pdf")}
+    first = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    body = wait_for_extraction(client, first.json()["id"], teacher)
+    assert body["extraction_status"] == "ready"
+    assert body["content"].startswith("Text of page 0.")
+    assert "Text of page 4." in body["content"]
+    assert calls == [(0, 2), (2, 4), (4, 5)]
+
+    doc = db_session.query(Document).filter(Document.id == first.json()["id"]).first()
+    cached = db_session.query(DocumentPageText).filter(DocumentPageText.content_hash == doc.content_hash).count()
+    assert cached == 5
+
+    # Re-extracting the same bytes takes every page from the cache.
+    calls.clear()
+    retry = client.post(f"/documents/{doc.id}/extract", headers=auth_header(teacher))
+    assert retry.json()["extraction_status"] == "pending"
+    body = wait_for_extraction(client, doc.id, teacher)
+    assert body["extraction_status"] == "ready"
+    assert "Text of page 3." in body["content"]
+    assert calls == []
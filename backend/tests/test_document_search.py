@@ -0,0 +1,85 @@
+import time
+
+from app.auth import jwt
+from app.models.class_model import ClassModel
+from app.models.document_visibility import DocumentClassVisibility
+from app.models.student_association import StudentClass
+from app.models.user import User
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def upload_and_wait(client, user, filename, body, timeout=20.0):
+    res = client.post("/documents/upload", headers=auth_header(user), files={"file": (filename, body, "text/plain")})
+    assert res.status_code == 200
+    doc_id = res.json()["id"]
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        doc = client.get(f"/documents/{doc_id}", headers=auth_header(user)).json()
+        if doc["extraction_status"] != "pending":
+            break
+        time.sleep(0.05)
+    return doc_id
+
+
+def test_search_ranks_matches_with_snippets(client, db_session):
+    teacher = User(username="teacher_search", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    other = User(username="teacher_search_other", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add_all([teacher, other])
+    db_session.commit()
+
+    photo_id = upload_and_wait(
+        client, teacher, "photosynthesis.txt",
+        b"Photosynthesis turns light into chemical energy. Chlorophyll absorbs light in photosynthesis.",
+    )
+    water_id = upload_and_wait(client, teacher, "water.txt", b"Evaporation and condensation drive the water cycle.")
+    upload_and_wait(client, other, "other.txt", b"Another teacher also covers photosynthesis here.")
+
+    res = client.get("/documents/search?q=photosynthesis", headers=auth_header(teacher))
+    assert res.status_code == 200
+    hits = res.json()
+    assert [hit["id"] for hit in hits] == [photo_id]
+    assert "<mark>" in hits[0]["snippet"]
+
+    # Prefix matching on the last term, stemming, and operator characters are all safe.
+    assert [hit["id"] for hit in client.get("/documents/search?q=condens", headers=auth_header(teacher)).json()] == [water_id]
+    assert client.get("/documents/search?q=absorbing", headers=auth_header(teacher)).json()[0]["id"] == photo_id
+    assert client.get('/documents/search?q="AND (OR*', headers=auth_header(teacher)).status_code == 200
+    assert client.get("/documents/search?q=%20", headers=auth_header(teacher)).json() == []
+
+    res = client.patch(f"/documents/{water_id}", headers=auth_header(teacher), json={"title": "Hydrology notes"})
+    assert res.status_code == 200
+    assert client.get("/documents/search?q=hydrology", headers=auth_header(teacher)).json()[0]["id"] == water_id
+
+    client.delete(f"/documents/{photo_id}?hard=true", headers=auth_header(teacher))
+    assert client.get("/documents/search?q=photosynthesis", headers=auth_header(teacher)).json() == []
+    client.delete(f"/documents/{water_id}", headers=auth_header(teacher))
+    assert client.get("/documents/search?q=hydrology", headers=auth_header(teacher)).json() == []
+
+
+def test_student_search_limited_to_visible_class_documents(client, db_session):
+    teacher = User(username="teacher_search_cls", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    student = User(username="student_search_cls", password_hash=jwt.get_password_hash("pass"), role="student")
+    db_session.add_all([teacher, student])
+    db_session.commit()
+    class_row = ClassModel(name="Search Class", teacher_id=teacher.id)
+    db_session.add(class_row)
+    db_session.commit()
+    db_session.add(StudentClass(user_id=student.id, class_id=class_row.id))
+    db_session.commit()
+
+    shown_id = upload_and_wait(client, teacher, "shown.txt", b"Volcanoes erupt when magma rises.")
+    upload_and_wait(client, teacher, "hidden.txt", b"Volcanoes answer key for the teacher only.")
+    db_session.add(DocumentClassVisibility(document_id=shown_id, class_id=class_row.id, visible=True))
+    db_session.commit()
+
+    res = client.get(f"/documents/search?q=volcanoes&class_id={class_row.id}", headers=auth_header(student))
+    assert res.status_code == 200
+    assert [hit["id"] for hit in res.json()] == [shown_id]
+
+    assert client.get("/documents/search?q=volcanoes", headers=auth_header(student)).json() == []
+    res = client.get(f"/documents/search?q=volcanoes&class_id={class_row.id + 100}", headers=auth_header(student))
+    assert res.status_code == 403
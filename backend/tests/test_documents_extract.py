@@ -97,3 +97,41 @@ def test_extract_text_docx_error(monkeypatch):
 def test_extract_text_txt_decode_error():
     text = extract_text_from_file(b"\xff", "bad.txt")
     assert text == ""
+
+
+def test_extract_text_pdf_per_page_fallback(monkeypatch):
+    class FakePage:
+        def __init__(self, text):
+            self.text = text
+
+        def extract_text(self):
+            return self.text
+
+    class FakeReader:
+        pages = [FakePage("A page with plenty of selectable text on it."), FakePage("")]
+
+    plumber_pages = []
+
+    class PlumberPage:
+        def __init__(self, index):
+            self.index = index
+
+        def extract_text(self):
+            plumber_pages.append(self.index)
+            return f"OCR layer text for page {self.index}"
+
+    class FakePdf:
+        pages = [PlumberPage(0), PlumberPage(1)]
+        def __enter__(self):
+            return self
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+    monkeypatch.setattr(pypdf, "PdfReader", lambda *args, **kwargs: FakeReader())
+    monkeypatch.setattr(pdfplumber, "open", lambda *args, **kwargs: FakePdf())
+
+    text = extract_text_from_file(b"data", "mixed.pdf")
+    assert "plenty of selectable text" in text
+    assert "OCR layer text for page 1" in text
+    # Only the weak page is re-read with pdfplumber.
+    assert plumber_pages == [1]
@@ -11,6 +11,17 @@ def auth_header(user):
     return {"Authorization": f"Bearer {token}"}
 
 
+def wait_for_extraction(client, doc_id, user, timeout=20.0):
+    import time
+
+    deadline = time.time() + timeout
+    while True:
+        body = client.get(f"/documents/{doc_id}", headers=auth_header(user)).json()
+        if body["extraction_status"] != "pending" or time.time() > deadline:
+            return body
+        time.sleep(0.05)
+
+
 def test_list_documents_filters_and_download_missing(client, db_session):
     teacher = User(username="teacher_doc_more", password_hash=jwt.get_password_hash("pass"), role="teacher")
     db_session.add(teacher)
@@ -102,9 +113,9 @@ def test_upload_blank_content_none(client, db_session, monkeypatch):
     assert res_upload.status_code == 200
     doc_id = res_upload.json()["id"]
 
-    res_doc = client.get(f"/documents/{doc_id}", headers=auth_header(teacher))
-    assert res_doc.status_code == 200
-    assert res_doc.json()["content"] is None
+    body = wait_for_extraction(client, doc_id, teacher)
+    assert body["extraction_status"] == "ready"
+    assert body["content"] is None
 
 
 def test_student_download_visible_document_allowed(client, db_session, tmp_path):
@@ -230,3 +241,225 @@ def test_upload_with_display_name(client, db_session):
     doc = db_session.query(Document).filter(Document.id == doc_id).first()
     assert doc is not None
     assert doc.title == "Renamed Upload"
+
+
+def test_upload_records_size_and_hash(client, db_session):
+    import hashlib
+    import os
+
+    teacher = User(username="teacher_docs_hash", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+
+    payload = b"streamed upload body\n" * 100
+    files = {"file": ("../../notes.txt", payload, "text/plain")}
+    res_upload = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    assert res_upload.status_code == 200
+
+    assert res_upload.json()["extraction_status"] == "pending"
+    body = wait_for_extraction(client, res_upload.json()["id"], teacher)
+    assert body["extraction_status"] == "ready"
+    assert body["content"].startswith("streamed upload body")
+
+    doc = db_session.query(Document).filter(Document.id == res_upload.json()["id"]).first()
+    assert doc.file_size == len(payload)
+    assert doc.content_hash == hashlib.sha256(payload).hexdigest()
+    assert doc.title == "notes.txt"
+    assert doc.file_path == os.path.join("uploads", "blobs", f"{doc.content_hash}.txt")
+    with open(doc.file_path, "rb") as stored:
+        assert stored.read() == payload
+
+
+def test_upload_over_limit_rejected(client, db_session, monkeypatch):
+    import os
+
+    teacher = User(username="teacher_docs_limit", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+
+    monkeypatch.setenv("MAX_DOCUMENT_UPLOAD_BYTES", "16")
+    blob_dir = os.path.join("uploads", "blobs")
+    before = set(os.listdir(blob_dir))
+    files = {"file": ("big.txt", b"x" * 64, "text/plain")}
+    res_upload = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    assert res_upload.status_code == 413
+    assert set(os.listdir(blob_dir)) == before
+    assert db_session.query(Document).filter(Document.uploaded_by == teacher.id).count() == 0
+
+
+def test_extraction_failure_and_retry(client, db_session, monkeypatch):
+    from app.services import document_extraction
+
+    teacher = User(username="teacher_docs_extract_fail", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+
+    monkeypatch.setenv("DOCUMENT_EXTRACTION_PROCESSES", "0")
+
+    def broken_extract(file_path, filename):
+        raise RuntimeError("parser crashed")
+
+    monkeypatch.setattr(document_extraction, "extract_document_text", broken_extract)
+    files = {"file": ("report.txt", b"retry me", "text/plain")}
+    res_upload = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    doc_id = res_upload.json()["id"]
+    body = wait_for_extraction(client, doc_id, teacher)
+    assert body["extraction_status"] == "failed"
+    assert "parser crashed" in body["extraction_error"]
+    assert body["content"] is None
+
+    monkeypatch.undo()
+    res_retry = client.post(f"/documents/{doc_id}/extract", headers=auth_header(teacher))
+    assert res_retry.status_code == 200
+    assert res_retry.json()["extraction_status"] == "pending"
+    body = wait_for_extraction(client, doc_id, teacher)
+    assert body["extraction_status"] == "ready"
+    assert body["content"] == "retry me"
+
+
+def test_identical_uploads_share_blob_and_text(client, db_session, monkeypatch):
+    import os
+    from app.services import document_extraction
+
+    teacher = User(username="teacher_docs_dedup", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+
+    files = {"file": ("chapter.txt", b"Chapter three: the water cycle.", "text/plain")}
+    first = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    assert wait_for_extraction(client, first.json()["id"], teacher)["extraction_status"] == "ready"
+
+    def fail_enqueue(document_id):
+        raise AssertionError("repeat upload should not be extracted again")
+
+    monkeypatch.setattr("app.routers.documents.enqueue_document_extraction", fail_enqueue)
+    second = client.post("/documents/upload", headers=auth_header(teacher), files=files)
+    assert second.status_code == 200
+    assert second.json()["extraction_status"] == "ready"
+    monkeypatch.undo()
+
+    first_doc = db_session.query(Document).filter(Document.id == first.json()["id"]).first()
+    second_doc = db_session.query(Document).filter(Document.id == second.json()["id"]).first()
+    assert first_doc.file_path == second_doc.file_path
+    assert second_doc.content == "Chapter three: the water cycle."
+    blob = first_doc.file_path
+
+    # The blob survives until the last document referencing it is hard-deleted.
+    res = client.delete(f"/documents/{first_doc.id}?hard=true", headers=auth_header(teacher))
+    assert res.status_code == 200
+    assert os.path.exists(blob)
+    res = client.delete(f"/documents/{second_doc.id}?hard=true", headers=auth_header(teacher))
+    assert res.status_code == 200
+    assert not os.path.exists(blob)
+
+
+def test_blob_reuse_survives_a_concurrent_hard_delete(tmp_path):
+    import io
+    import os
+    from app.services import upload_storage
+
+    body = b"shared worksheet"
+    first = upload_storage.save_upload_blob(io.BytesIO(body), "sheet.txt", 1024, str(tmp_path))
+
+    # Delete side: a reusing upload commits between the first reference check and the unlink.
+    assert upload_storage.remove_unreferenced_blob(first.path, lambda: True) is False
+    assert open(first.path, "rb").read() == body
+
+    # Upload side: the upload found the blob, then a delete removed it before the row committed.
+    reused = upload_storage.save_upload_blob(io.BytesIO(body), "sheet.txt", 1024, str(tmp_path))
+    assert reused.reused and reused.path == first.path
+    assert upload_storage.remove_unreferenced_blob(first.path, lambda: False) is True
+    assert not os.path.exists(first.path)
+    upload_storage.confirm_upload_blob(reused)
+    assert open(first.path, "rb").read() == body
+    assert os.listdir(tmp_path) == [os.path.basename(first.path)]
+
+
+def test_folder_subtree_delete_and_visibility(client, db_session):
+    teacher = User(username="teacher_docs_subtree", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    class_row = ClassModel(name="Subtree Class", teacher_id=teacher.id)
+    db_session.add(class_row)
+    db_session.commit()
+
+    root = Document(title="Root", is_folder=True, uploaded_by=teacher.id)
+    db_session.add(root)
+    db_session.commit()
+    parent_id = root.id
+    chain = [root.id]
+    for depth in range(5):
+        folder = Document(title=f"Level {depth}", is_folder=True, uploaded_by=teacher.id, parent_id=parent_id)
+        db_session.add(folder)
+        db_session.commit()
+        db_session.add(Document(title=f"File {depth}", is_folder=False, uploaded_by=teacher.id, parent_id=folder.id))
+        db_session.commit()
+        chain.append(folder.id)
+        parent_id = folder.id
+    outside = Document(title="Outside", is_folder=False, uploaded_by=teacher.id)
+    db_session.add(outside)
+    db_session.commit()
+    subtree_size = 1 + 5 * 2
+
+    # Pre-existing row for one descendant is updated, the rest are inserted.
+    db_session.add(DocumentClassVisibility(document_id=chain[2], class_id=class_row.id, visible=False))
+    db_session.commit()
+    res = client.post(
+        f"/documents/{root.id}/visibility",
+        headers=auth_header(teacher),
+        json={"class_id": class_row.id, "visible": True, "include_descendants": True},
+    )
+    assert res.status_code == 200
+    db_session.expire_all()
+    rows = db_session.query(DocumentClassVisibility).filter(DocumentClassVisibility.class_id == class_row.id).all()
+    assert len(rows) == subtree_size
+    assert all(row.visible for row in rows)
+
+    res = client.post(f"/documents/{root.id}/move", headers=auth_header(teacher), json={"parent_id": chain[-1]})
+    assert res.status_code == 400
+
+    res = client.delete(f"/documents/{chain[1]}", headers=auth_header(teacher))
+    assert res.status_code == 200
+    db_session.expire_all()
+    deleted = db_session.query(Document).filter(Document.is_deleted == True).count()
+    assert deleted == subtree_size - 1
+    assert db_session.query(Document).filter(Document.id == outside.id).first().is_deleted is False
+
+    res = client.delete(f"/documents/{root.id}?hard=true", headers=auth_header(teacher))
+    assert res.status_code == 200
+    db_session.expire_all()
+    assert db_session.query(Document).filter(Document.uploaded_by == teacher.id).count() == 1
+    assert db_session.query(DocumentClassVisibility).count() == 0
+
+
+def test_list_documents_keyset_pagination(client, db_session):
+    teacher = User(username="teacher_docs_pages", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    titles = [f"Doc {index:02d}" for index in range(7)]
+    for title in titles:
+        db_session.add(Document(title=title, content="x" * 1000, is_folder=False, uploaded_by=teacher.id))
+    db_session.commit()
+
+    for sort, order, expected in [
+        ("created_at", "asc", titles),
+        ("title", "desc", list(reversed(titles))),
+    ]:
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 3, "sort": sort, "order": order}
+            if cursor:
+                params["cursor"] = cursor
+            res = client.get("/documents", headers=auth_header(teacher), params=params)
+            assert res.status_code == 200
+            assert all("content" not in row for row in res.json())
+            seen.extend(row["title"] for row in res.json())
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        assert seen == expected
+
+    assert client.get("/documents", headers=auth_header(teacher), params={"cursor": "bogus"}).status_code == 400
+    assert client.get("/documents", headers=auth_header(teacher), params={"sort": "content"}).status_code == 400
+    assert len(client.get("/documents", headers=auth_header(teacher)).json()) == len(titles)
@@ -0,0 +1,95 @@
+import os
+import uuid
+
+from app.auth import jwt
+from app.models.user import User
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _upload(client, teacher, body):
+    res = client.post("/documents/upload", headers=auth_header(teacher), files={"file": ("notes.txt", body, "text/plain")})
+    assert res.status_code == 200
+    return res.json()["id"]
+
+
+def test_download_validators_conditional_and_range(client, db_session):
+    teacher = User(username="teacher_delivery", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    body = b"0123456789" * 50
+    doc_id = _upload(client, teacher, body)
+
+    res = client.get(f"/documents/{doc_id}/download", headers=auth_header(teacher))
+    assert res.status_code == 200
+    assert res.content == body
+    etag = res.headers["etag"]
+    assert len(etag.strip('"')) == 64
+    assert res.headers["last-modified"]
+    assert res.headers["cache-control"].startswith("private")
+    assert res.headers["accept-ranges"] == "bytes"
+
+    res = client.get(f"/documents/{doc_id}/download", headers={**auth_header(teacher), "If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+
+    res = client.get(f"/documents/{doc_id}/download", headers={**auth_header(teacher), "Range": "bytes=10-19"})
+    assert res.status_code == 206
+    assert res.content == body[10:20]
+    assert res.headers["content-range"] == f"bytes 10-19/{len(body)}"
+
+
+def test_download_offloaded_to_proxy(client, db_session, monkeypatch):
+    teacher = User(username="teacher_delivery_proxy", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    doc_id = _upload(client, teacher, b"proxy served body")
+
+    monkeypatch.setenv("FILE_DELIVERY_MODE", "x-accel")
+    monkeypatch.setenv("X_ACCEL_REDIRECT_PREFIX", "/protected")
+    res = client.get(f"/documents/{doc_id}/download", headers=auth_header(teacher))
+    assert res.status_code == 200
+    assert res.content == b""
+    assert res.headers["x-accel-redirect"].startswith("/protected/blobs/")
+    blob_path = res.headers["x-accel-redirect"].removeprefix("/protected/")
+    assert res.headers["etag"]
+    assert "attachment" in res.headers["content-disposition"]
+
+    monkeypatch.setenv("FILE_DELIVERY_MODE", "x-sendfile")
+    res = client.get(f"/documents/{doc_id}/download", headers=auth_header(teacher))
+    assert os.path.isabs(res.headers["x-sendfile"])
+
+    # Blobs only leave through the access-checked download, never the public /uploads mount.
+    monkeypatch.setenv("FILE_DELIVERY_MODE", "app")
+    assert client.get(f"/uploads/{blob_path}").status_code == 404
+
+
+def test_uploads_mount_cache_control():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    audio_dir = os.path.join("uploads", "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    immutable_name = f"tts_{uuid.uuid4().hex}.wav"
+    mutable_name = f"note_{uuid.uuid4().hex}.txt"
+    with open(os.path.join(audio_dir, immutable_name), "wb") as handle:
+        handle.write(b"RIFF....")
+    with open(os.path.join("uploads", mutable_name), "wb") as handle:
+        handle.write(b"hello")
+    try:
+        res = client.get(f"/uploads/audio/{immutable_name}")
+        assert res.status_code == 200
+        assert "immutable" in res.headers["cache-control"]
+
+        res = client.get(f"/uploads/{mutable_name}")
+        assert res.headers["cache-control"] == "public, max-age=3600"
+        res = client.get(f"/uploads/{mutable_name}", headers={"If-None-Match": res.headers["etag"]})
+        assert res.status_code == 304
+        assert res.headers["cache-control"] == "public, max-age=3600"
+    finally:
+        os.remove(os.path.join(audio_dir, immutable_name))
+        os.remove(os.path.join("uploads", mutable_name))
@@ -0,0 +1,92 @@
+import math
+
+from app.models.item_analysis import QuestionItemStat, QuestionOptionStat
+from app.models.submission import Answer
+from app.models.user import User
+from app.services.item_analysis import item_discrimination, rebuild_item_statistics
+from tests.test_analytics_rollup import auth_header, seed_paper
+
+
+def _snapshot(db_session):
+    db_session.expire_all()
+    items = sorted(
+        (r.question_id, r.responses, r.correct, round(r.score_sum, 6), round(r.score_sq_sum, 6), round(r.correct_score_sum, 6))
+        for r in db_session.query(QuestionItemStat).all()
+    )
+    options = sorted((r.question_id, r.option, r.responses) for r in db_session.query(QuestionOptionStat).all())
+    return items, options
+
+
+def _point_biserial(correct_flags, totals):
+    n = len(totals)
+    mean = sum(totals) / n
+    sd = math.sqrt(sum((t - mean) ** 2 for t in totals) / n)
+    right = [t for c, t in zip(correct_flags, totals) if c]
+    wrong = [t for c, t in zip(correct_flags, totals) if not c]
+    p = len(right) / n
+    return (sum(right) / len(right) - sum(wrong) / len(wrong)) / sd * math.sqrt(p * (1 - p))
+
+
+def test_item_statistics_follow_grading_and_match_rebuild(client, db_session):
+    teacher, student, other, _, paper, q1, q2 = seed_paper(db_session)
+    q1.options = ["A", "B", "C", "D"]
+    third = User(username="student_items_third", password_hash="x", role="student")
+    db_session.add(third)
+    db_session.commit()
+
+    attempts = [(student, "A", "B"), (other, "D", "B"), (third, " A", "C"), (student, "C", "C")]
+    for user, first, second in attempts:
+        res = client.post(
+            f"/papers/{paper.id}/submit",
+            headers=auth_header(user),
+            json={"answers": [{"question_id": q1.id, "answer": first}, {"question_id": q2.id, "answer": second}]},
+        )
+        assert res.status_code == 200
+
+    report = client.get(f"/analytics/item-analysis?paper_id={paper.id}", headers=auth_header(teacher)).json()
+    first_item = next(item for item in report if item["question_id"] == q1.id)
+    assert first_item["responses"] == 4
+    assert first_item["facility"] == 0.5
+    expected = _point_biserial([True, False, True, False], [100.0, 50.0, 50.0, 0.0])
+    assert first_item["discrimination"] == round(expected, 3)
+    assert first_item["distractors"] == [
+        {"option": "A", "responses": 2, "share": 0.5},
+        {"option": "C", "responses": 1, "share": 0.25},
+        {"option": "D", "responses": 1, "share": 0.25},
+    ]
+    # q2 has no options, so there is nothing to report as distractors.
+    assert next(item for item in report if item["question_id"] == q2.id)["distractors"] == []
+
+    incremental = _snapshot(db_session)
+    rebuild_item_statistics(db_session)
+    db_session.commit()
+    assert _snapshot(db_session) == incremental
+
+    # A regrade shifts the submission total for every item it answered.
+    answer = db_session.query(Answer).filter_by(question_id=q2.id, answer="C").order_by(Answer.id).first()
+    res = client.put(f"/papers/submissions/answers/{answer.id}/score", headers=auth_header(teacher), json={"score": 1.0})
+    assert res.status_code == 200
+    regraded = _snapshot(db_session)
+    rebuild_item_statistics(db_session)
+    db_session.commit()
+    assert _snapshot(db_session) == regraded
+
+    assert client.delete(f"/papers/{paper.id}", headers=auth_header(teacher)).status_code == 200
+    assert _snapshot(db_session) == ([], [])
+
+
+def test_item_analysis_access_and_undefined_discrimination(client, db_session):
+    teacher, student, _, _, paper, q1, _ = seed_paper(db_session)
+    client.post(f"/papers/{paper.id}/submit", headers=auth_header(student), json={"answers": [{"question_id": q1.id, "answer": "A"}]})
+    stranger = User(username="teacher_items_other", password_hash="x", role="teacher")
+    db_session.add(stranger)
+    db_session.commit()
+
+    report = client.get("/analytics/item-analysis", headers=auth_header(teacher)).json()
+    assert report[0]["facility"] == 1.0
+    assert report[0]["discrimination"] is None
+    assert report[0]["flags"] == ["easy"]
+    assert client.get("/analytics/item-analysis", headers=auth_header(stranger)).json() == []
+    assert client.get("/analytics/item-analysis", headers=auth_header(student)).status_code == 403
+
+    assert item_discrimination(2, 1, 100.0, 10000.0, 100.0) == 1.0
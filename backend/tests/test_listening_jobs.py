@@ -0,0 +1,254 @@
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.auth import jwt
+from app.models.listening_job import ListeningPaperJob
+from app.models.paper import Paper
+from app.models.question import Question
+from app.models.user import User
+from app.services import listening_pipeline
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _submit(client, teacher, monkeypatch):
+    queued = []
+    monkeypatch.setattr("app.routers.papers.enqueue_listening_job", lambda job_id, secrets=None: queued.append(job_id))
+    res = client.post(
+        "/papers/listening/jobs",
+        headers=auth_header(teacher),
+        json={
+            "title": "Campus tour",
+            "role_script": [{"role": "A", "text": "Welcome to the library."}, {"role": "B", "text": "Thanks."}],
+            "questions": [{"question_text": "Where are they?", "question_type": "short", "correct_answer": "library"}],
+            "tts_api_key": "secret-key",
+        },
+    )
+    assert res.status_code == 200
+    assert res.json()["status"] == "queued"
+    assert queued == [res.json()["job_id"]]
+    return res.json()["job_id"]
+
+
+def test_listening_job_runs_all_stages(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    job_id = _submit(client, teacher, monkeypatch)
+
+    stored = db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).first()
+    assert "tts_api_key" not in stored.request_payload
+
+    monkeypatch.setenv("QWEN_API_KEY", "env-key")
+    progress_seen = []
+
+    def fake_synthesize(role_script, progress_callback=None, **kwargs):
+        for idx in range(1, len(role_script) + 1):
+            progress_callback(idx, len(role_script))
+            progress_seen.append(idx)
+        return {"audio_url": "/uploads/audio/listening_job.wav", "segments": [], "failed_segments": []}
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", fake_synthesize)
+    listening_pipeline.run_listening_job(job_id)
+
+    res = client.get(f"/papers/listening/jobs/{job_id}", headers=auth_header(teacher))
+    assert res.status_code == 200
+    payload = res.json()
+    assert payload["status"] == "completed"
+    assert payload["stage"] == "done"
+    assert payload["progress"] == 100
+    assert progress_seen == [1, 2]
+
+    paper = db_session.query(Paper).filter(Paper.id == payload["paper_id"]).first()
+    assert paper.paper_type == "listening"
+    assert paper.writing_config["audio_url"] == "/uploads/audio/listening_job.wav"
+    assert db_session.query(Question).filter(Question.paper_id == paper.id).count() == 1
+
+
+def test_failed_listening_job_resumes_from_checkpoint(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job_retry", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    job_id = _submit(client, teacher, monkeypatch)
+    monkeypatch.setenv("QWEN_API_KEY", "env-key")
+
+    calls = []
+
+    def broken_synthesize(role_script, progress_callback=None, **kwargs):
+        calls.append("audio")
+        raise ValueError("provider down")
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", broken_synthesize)
+    listening_pipeline.run_listening_job(job_id)
+
+    failed = client.get(f"/papers/listening/jobs/{job_id}", headers=auth_header(teacher)).json()
+    assert failed["status"] == "failed"
+    assert failed["stage"] == "audio"
+    assert "provider down" in failed["error"]
+
+    retry = client.post(f"/papers/listening/jobs/{job_id}/retry", headers=auth_header(teacher))
+    assert retry.status_code == 200
+    assert retry.json()["status"] == "queued"
+
+    def fixed_synthesize(role_script, progress_callback=None, **kwargs):
+        calls.append("audio")
+        return {"audio_url": "/uploads/audio/retry.wav", "segments": [], "failed_segments": []}
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", fixed_synthesize)
+    listening_pipeline.run_listening_job(job_id)
+
+    done = client.get(f"/papers/listening/jobs/{job_id}", headers=auth_header(teacher)).json()
+    assert done["status"] == "completed"
+    assert done["attempts"] == 2
+    assert calls == ["audio", "audio"]
+
+
+def test_listening_job_requires_teacher(client, db_session):
+    student = User(username="student_listen_job", password_hash=jwt.get_password_hash("pass"), role="student")
+    db_session.add(student)
+    db_session.commit()
+    res = client.post("/papers/listening/jobs", headers=auth_header(student), json={"prompt": "x"})
+    assert res.status_code == 403
+
+
+def test_listening_job_claimed_once_and_only_stale_leases_resume(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job_lease", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    job_id = _submit(client, teacher, monkeypatch)
+
+    assert listening_pipeline.claim_listening_job(db_session, job_id) is True
+    assert listening_pipeline.claim_listening_job(db_session, job_id) is False
+
+    resumed = []
+    monkeypatch.setattr(listening_pipeline, "enqueue_listening_job", lambda job_id, secrets=None: resumed.append(job_id))
+    assert listening_pipeline.resume_listening_jobs() == 0
+
+    # A second worker skips the job while the lease is live and takes it over once it lapses.
+    db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).update(
+        {ListeningPaperJob.owner: "other-host:1", ListeningPaperJob.lease_until: datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db_session.commit()
+    assert listening_pipeline.resume_listening_jobs() == 1
+    assert resumed == [job_id]
+
+    monkeypatch.setenv("QWEN_API_KEY", "env-key")
+    monkeypatch.setattr(
+        listening_pipeline,
+        "synthesize_role_script_to_wav",
+        lambda role_script, progress_callback=None, **kwargs: {"audio_url": "/uploads/audio/lease.wav", "failed_segments": []},
+    )
+    listening_pipeline.run_listening_job(job_id)
+    db_session.expire_all()
+    job = db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).first()
+    assert (job.status, job.owner, job.attempts) == ("completed", listening_pipeline.WORKER_ID, 2)
+    assert db_session.query(Paper).filter(Paper.created_by == teacher.id).count() == 1
+
+
+def test_listening_job_stops_when_lease_is_taken_over(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job_lost", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    job_id = _submit(client, teacher, monkeypatch)
+    monkeypatch.setenv("QWEN_API_KEY", "env-key")
+
+    def taken_over(role_script, progress_callback=None, **kwargs):
+        db = listening_pipeline.SessionLocal()
+        db.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).update({ListeningPaperJob.owner: "other-host:1"})
+        db.commit()
+        db.close()
+        return {"audio_url": "/uploads/audio/lost.wav", "failed_segments": []}
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", taken_over)
+    listening_pipeline.run_listening_job(job_id)
+
+    db_session.expire_all()
+    job = db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).first()
+    assert (job.status, job.owner, job.paper_id) == ("running", "other-host:1", None)
+    assert db_session.query(Paper).filter(Paper.created_by == teacher.id).count() == 0
+
+
+def test_listening_job_with_missing_lines_fails_and_retries_only_those(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job_partial", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    teacher_id = teacher.id
+    job_id = _submit(client, teacher, monkeypatch)
+    monkeypatch.setenv("QWEN_API_KEY", "env-key")
+    previous_results = []
+
+    def partial_synthesize(role_script, progress_callback=None, previous_result=None, **kwargs):
+        previous_results.append(previous_result)
+        return {
+            "audio_url": "/uploads/audio/listening_partial.wav",
+            "segments": [{"index": 1, "role": "A", "text": "Welcome to the library."}],
+            "failed_segments": [{"index": 2, "role": "B", "text": "Thanks.", "error": "provider hiccup"}],
+            "partial": True,
+        }
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", partial_synthesize)
+    listening_pipeline.run_listening_job(job_id)
+
+    failed = client.get(f"/papers/listening/jobs/{job_id}", headers=auth_header(teacher)).json()
+    assert (failed["status"], failed["stage"], failed["paper_id"]) == ("failed", "audio", None)
+    assert "line 2 (B): provider hiccup" in failed["error"]
+    assert [seg["index"] for seg in failed["failed_segments"]] == [2]
+    assert db_session.query(Paper).filter(Paper.created_by == teacher_id).count() == 0
+
+    def completed_synthesize(role_script, progress_callback=None, previous_result=None, **kwargs):
+        previous_results.append(previous_result)
+        return {"audio_url": "/uploads/audio/listening_full.wav", "segments": [], "failed_segments": [], "partial": False}
+
+    monkeypatch.setattr(listening_pipeline, "synthesize_role_script_to_wav", completed_synthesize)
+    assert client.post(f"/papers/listening/jobs/{job_id}/retry", headers=auth_header(teacher)).status_code == 200
+    listening_pipeline.run_listening_job(job_id)
+
+    done = client.get(f"/papers/listening/jobs/{job_id}", headers=auth_header(teacher)).json()
+    assert done["status"] == "completed"
+    assert previous_results[0] is None
+    assert previous_results[1]["audio_url"] == "/uploads/audio/listening_partial.wav"
+    paper = db_session.query(Paper).filter(Paper.id == done["paper_id"]).first()
+    assert paper.writing_config["audio_url"] == "/uploads/audio/listening_full.wav"
+
+
+def test_job_left_running_by_a_quick_restart_is_taken_over_once_its_lease_lapses(client, db_session, monkeypatch):
+    teacher = User(username="teacher_listen_job_restart", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    job_id = _submit(client, teacher, monkeypatch)
+
+    # The previous process died mid-job and came straight back: its lease is still live.
+    db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).update({
+        ListeningPaperJob.status: "running",
+        ListeningPaperJob.owner: "crashed-host:1",
+        ListeningPaperJob.lease_until: datetime.now(timezone.utc) + timedelta(seconds=300),
+    })
+    db_session.commit()
+    resumed = []
+    monkeypatch.setattr(listening_pipeline, "enqueue_listening_job", lambda job_id, secrets=None: resumed.append(job_id))
+    assert listening_pipeline.resume_listening_jobs() == 0
+    assert client.post(f"/papers/listening/jobs/{job_id}/retry", headers=auth_header(teacher)).status_code == 400
+
+    # Later the lease lapses; the periodic sweep takes the job over without another restart.
+    db_session.query(ListeningPaperJob).filter(ListeningPaperJob.id == job_id).update(
+        {ListeningPaperJob.lease_until: datetime.now(timezone.utc) - timedelta(seconds=1)}
+    )
+    db_session.commit()
+    swept = threading.Event()
+    monkeypatch.setattr(
+        listening_pipeline, "enqueue_listening_job", lambda job_id, secrets=None: (resumed.append(job_id), swept.set())
+    )
+    stop = listening_pipeline.start_listening_job_sweeper(interval_seconds=0.01)
+    try:
+        assert swept.wait(5)
+    finally:
+        stop.set()
+    assert resumed[0] == job_id
+
+    # A teacher can also take it over by hand now.
+    retry = client.post(f"/papers/listening/jobs/{job_id}/retry", headers=auth_header(teacher))
+    assert retry.status_code == 200
+    assert retry.json()["status"] == "queued"
@@ -1,7 +1,12 @@
+import json
+import os
+import uuid
+
 from app.auth import jwt
 from app.models.assignment import Assignment
 from app.models.speaking_session import SpeakingSession
 from app.models.user import User
+from app.models.user_preference import UserPreference
 
 
 def auth_header(user):
@@ -172,7 +177,7 @@ def test_generate_listening_script_success(client, db_session, monkeypatch):
             '"questions":[{"question_text":"What is the topic?","question_type":"mcq","options":["Sports","Weekend plans","Food","Travel"],"correct_answer":"B"}]}'
         )
 
-    monkeypatch.setattr("app.routers.papers._call_chat", fake_call_chat)
+    monkeypatch.setattr("app.services.listening_generator._call_chat", fake_call_chat)
 
     res = client.post(
         "/papers/listening/generate-script",
@@ -308,3 +313,144 @@ def test_complete_speaking_session_blocks_new_turn(client, db_session):
         json={"role": "student", "text": "Can you hear me?"},
     )
     assert turn_res.status_code == 400
+
+
+def test_listening_audio_supports_byte_range_requests(client):
+    audio_dir = os.path.join("uploads", "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    file_name = f"listening_range_test_{uuid.uuid4().hex}.wav"
+    file_path = os.path.join(audio_dir, file_name)
+    with open(file_path, "wb") as audio_file:
+        audio_file.write(bytes(range(256)))
+
+    try:
+        res = client.get(f"/uploads/audio/{file_name}", headers={"Range": "bytes=44-99"})
+        assert res.status_code == 206
+        assert res.content == bytes(range(44, 100))
+        assert res.headers["content-range"] == "bytes 44-99/256"
+    finally:
+        os.remove(file_path)
+
+
+def test_speaking_runtime_snapshot_reused_until_preferences_change(client, db_session, monkeypatch):
+    teacher = User(username="teacher_runtime_snapshot", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    student = User(username="student_runtime_snapshot", password_hash=jwt.get_password_hash("pass"), role="student")
+    db_session.add_all([teacher, student])
+    db_session.commit()
+
+    put_pref = client.put(
+        "/users/preferences/runtime_ai",
+        headers=auth_header(teacher),
+        json={"value": {"ai_provider": "qwen", "ai_model": "qwen-plus", "tts_voice": "Cherry"}},
+    )
+    assert put_pref.status_code == 200
+
+    paper_id = client.post(
+        "/papers/speaking",
+        headers=auth_header(teacher),
+        json={"title": "Snapshot", "scenario": "Discuss hobbies."},
+    ).json()["paper_id"]
+    session_id = client.post(
+        f"/papers/speaking/{paper_id}/sessions",
+        headers=auth_header(student),
+        json={"max_context_tokens": 400},
+    ).json()["session_id"]
+
+    session = db_session.query(SpeakingSession).filter(SpeakingSession.id == session_id).first()
+    assert session.runtime_config["ai_provider"] == "qwen"
+    assert session.runtime_config["tts_voice"] == "Cherry"
+    assert session.runtime_config_version == 1
+
+    pref_loads = []
+    import app.services.speaking_runtime as speaking_runtime
+    original_loader = speaking_runtime._load_user_runtime_ai_preference
+
+    def counting_loader(db, user_id):
+        pref_loads.append(user_id)
+        return original_loader(db, user_id)
+
+    monkeypatch.setattr(speaking_runtime, "_load_user_runtime_ai_preference", counting_loader)
+
+    for text in ["I like hiking with friends.", "We usually go on Sundays."]:
+        res = client.post(
+            f"/papers/speaking/sessions/{session_id}/turns",
+            headers=auth_header(student),
+            json={"role": "student", "text": text},
+        )
+        assert res.status_code == 200
+    assert pref_loads == []
+
+    client.put(
+        "/users/preferences/runtime_ai",
+        headers=auth_header(teacher),
+        json={"value": {"ai_provider": "deepseek", "tts_voice": "Ethan"}},
+    )
+    db_session.expire_all()
+    assert db_session.query(SpeakingSession).filter(SpeakingSession.id == session_id).first().runtime_config is None
+
+    res = client.post(
+        f"/papers/speaking/sessions/{session_id}/turns",
+        headers=auth_header(student),
+        json={"role": "student", "text": "Hiking keeps me healthy."},
+    )
+    assert res.status_code == 200
+    assert pref_loads == [teacher.id]
+    db_session.expire_all()
+    refreshed = db_session.query(SpeakingSession).filter(SpeakingSession.id == session_id).first()
+    assert refreshed.runtime_config["ai_provider"] == "deepseek"
+    assert refreshed.runtime_config_version == 2
+
+
+def test_speaking_runtime_snapshot_keeps_only_key_references(client, db_session, monkeypatch):
+    teacher = User(username="teacher_runtime_secret", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    student = User(username="student_runtime_secret", password_hash=jwt.get_password_hash("pass"), role="student")
+    db_session.add_all([teacher, student])
+    db_session.commit()
+    client.put(
+        "/users/preferences/runtime_ai",
+        headers=auth_header(teacher),
+        json={"value": {"ai_provider": "qwen", "ai_model": "qwen-plus", "qwen_api_key": "old-key"}},
+    )
+    paper_id = client.post(
+        "/papers/speaking", headers=auth_header(teacher), json={"title": "Secrets", "scenario": "Talk about food."}
+    ).json()["paper_id"]
+    session_id = client.post(f"/papers/speaking/{paper_id}/sessions", headers=auth_header(student), json={}).json()["session_id"]
+
+    snapshot = db_session.query(SpeakingSession).filter(SpeakingSession.id == session_id).first().runtime_config
+    assert "old-key" not in json.dumps(snapshot)
+    assert snapshot["api_key_ref"] == {"source": "preference", "field": "qwen_api_key"}
+    assert "llm_access" not in snapshot
+
+    used_keys = []
+    access_checks = []
+    import app.services.speaking_runtime as speaking_runtime
+    original_access = speaking_runtime.resolve_llm_access
+
+    def counting_access(*args, **kwargs):
+        access_checks.append(kwargs.get("feature"))
+        return original_access(*args, **kwargs)
+
+    monkeypatch.setattr(speaking_runtime, "resolve_llm_access", counting_access)
+    monkeypatch.setattr("app.routers.papers._call_chat", lambda **kwargs: used_keys.append(kwargs["api_key"]) or "Tell me more.")
+
+    def turn(text):
+        res = client.post(
+            f"/papers/speaking/sessions/{session_id}/turns",
+            headers=auth_header(student),
+            json={"role": "student", "text": text},
+        )
+        assert res.status_code == 200
+
+    turn("I love noodles.")
+    # Rotate the key without going through the preferences endpoint: the snapshot stays, the key does not.
+    pref = db_session.query(UserPreference).filter(
+        UserPreference.user_id == teacher.id, UserPreference.key == "runtime_ai"
+    ).first()
+    pref.value = json.dumps({"ai_provider": "qwen", "ai_model": "qwen-plus", "qwen_api_key": "new-key"})
+    db_session.commit()
+    turn("Especially ramen.")
+
+    assert used_keys == ["old-key", "new-key"]
+    assert access_checks == ["speaking.dialogue", "speaking.dialogue"]
+    db_session.expire_all()
+    assert db_session.query(SpeakingSession).filter(SpeakingSession.id == session_id).first().runtime_config_version == 1
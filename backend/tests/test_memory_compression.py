@@ -0,0 +1,36 @@
+from app.services import memory_compression as mc
+
+
+def test_compaction_fits_budget_and_prefers_student_content():
+    lines = [
+        "examiner: Please introduce yourself.",
+        "student: um ok.",
+        "examiner: What did you do last weekend?",
+        "student: I volunteered at a beach clean-up in Sai Kung with my classmates and we collected plastic.",
+        "system: timer started",
+        "student: It taught me that small actions matter for the environment.",
+    ]
+    summary = mc.compact_dialogue(None, lines, max_tokens=50)
+
+    assert sum(mc.estimate_tokens(line) for line in summary.splitlines()) <= 50
+    assert "beach clean-up" in summary
+    assert "timer started" not in summary
+    # Extractive output keeps dialogue order.
+    assert summary.index("beach clean-up") < summary.index("small actions")
+
+
+def test_compaction_reuses_previous_summary_within_budget():
+    first = mc.compact_dialogue(None, ["student: My favourite city is Kyoto because of its temples."], max_tokens=40)
+    second = mc.compact_dialogue(first, ["examiner: Why temples?", "student: They are calm and historic."], max_tokens=40)
+
+    assert "Kyoto" in second
+    assert sum(mc.estimate_tokens(line) for line in second.splitlines()) <= 40
+
+
+def test_pluggable_token_counter():
+    try:
+        mc.set_token_counter(lambda text: len(text.split()))
+        assert mc.estimate_tokens("one two three") == 3
+    finally:
+        mc.set_token_counter(None)
+    assert mc.estimate_tokens("abcdefgh") == 2
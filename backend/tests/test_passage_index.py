@@ -0,0 +1,76 @@
+from app.auth import jwt
+from app.models.document import Document
+from app.models.document_passage import DocumentPassage
+from app.models.user import User
+from app.services import passage_index
+from app.services.memory_compression import estimate_tokens
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _long_article():
+    filler = "The committee met again and reviewed the minutes from the previous session in detail. " * 12
+    paragraphs = [f"Section {index}. {filler}" for index in range(30)]
+    paragraphs[17] = "Section 17. Coral reefs are bleaching because ocean temperatures keep rising. " * 6
+    return "\n\n".join(paragraphs)
+
+
+def test_chunk_passages_respects_target_and_keeps_order():
+    passages = passage_index.chunk_passages(_long_article(), target_tokens=300)
+    assert len(passages) > 10
+    assert [p.position for p in passages] == list(range(len(passages)))
+    assert all(p.token_count <= 300 for p in passages)
+    assert passages[0].text.startswith("Section 0.")
+    assert passages[0].terms["committee"] >= 1
+
+
+def test_budget_source_text_selects_relevant_passages():
+    article = _long_article()
+    short = "A short article about reefs."
+    assert passage_index.budget_source_text(short, "reefs", 500) == short
+
+    excerpt = passage_index.budget_source_text(article, "coral reef bleaching", 400)
+    assert estimate_tokens(excerpt) <= 400
+    assert "Coral reefs are bleaching" in excerpt
+
+    # Without a query the excerpt is the head of the document.
+    head = passage_index.budget_source_text(article, None, 400)
+    assert head.startswith("Section 0.")
+    assert "Coral reefs" not in head
+
+
+def test_writing_prompts_use_retrieved_passages(client, db_session, monkeypatch):
+    teacher = User(username="teacher_passages", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    db_session.add(teacher)
+    db_session.commit()
+    doc = Document(title="Long article", content=_long_article(), is_folder=False, uploaded_by=teacher.id)
+    db_session.add(doc)
+    db_session.commit()
+
+    captured = {}
+
+    def fake_generate(task_mode, source_text, custom_requirements, options=None):
+        captured["source_text"] = source_text
+        return {"task1_prompt": "ok", "task2_prompt_pool": []}
+
+    monkeypatch.setenv("SOURCE_PROMPT_TOKENS", "500")
+    monkeypatch.setattr("app.routers.papers.generate_writing_prompts", fake_generate)
+    res = client.post(
+        "/papers/writing/generate-prompts",
+        headers=auth_header(teacher),
+        json={
+            "selected_task_mode": "task1",
+            "source_document_id": doc.id,
+            "custom_requirements": "Focus on coral bleaching",
+            "api_key": "sk-test",
+        },
+    )
+    assert res.status_code == 200
+    assert "Coral reefs are bleaching" in captured["source_text"]
+    assert estimate_tokens(captured["source_text"]) <= 500
+
+    # Passages were indexed on first use and are reused afterwards.
+    assert db_session.query(DocumentPassage).filter(DocumentPassage.document_id == doc.id).count() > 10
@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.services.analytics_cache import cached_analytics, get_analytics_cache_stats
+
+
+def _reset_state(monkeypatch, engine=None, lag=0.0):
+    monkeypatch.setattr(database, "_replica_state", {"checked_at": None, "healthy": False})
+    monkeypatch.setattr(database, "read_engine", engine)
+    monkeypatch.setattr(
+        database,
+        "ReadSessionLocal",
+        sessionmaker(autocommit=False, autoflush=False, bind=engine) if engine is not None else None,
+    )
+    if isinstance(lag, Exception):
+        def measure():
+            raise lag
+    else:
+        def measure():
+            return lag
+    monkeypatch.setattr(database, "_measure_replica_lag", measure)
+
+
+def test_read_db_uses_primary_without_replica(monkeypatch):
+    _reset_state(monkeypatch)
+    gen = database.get_read_db()
+    db = next(gen)
+    assert db.get_bind() is database.engine
+    assert not database.is_replica_session(db)
+    gen.close()
+
+
+def test_read_db_routes_to_replica_within_lag(monkeypatch):
+    replica = create_engine("sqlite://")
+    _reset_state(monkeypatch, replica, lag=2.0)
+    monkeypatch.setattr(database, "READ_REPLICA_MAX_LAG_SECONDS", 30)
+
+    gen = database.get_read_db()
+    db = next(gen)
+    assert db.get_bind() is replica
+    assert database.is_replica_session(db)
+    gen.close()
+
+
+def test_read_db_falls_back_when_replica_lags_or_fails(monkeypatch):
+    replica = create_engine("sqlite://")
+    monkeypatch.setattr(database, "READ_REPLICA_MAX_LAG_SECONDS", 30)
+
+    _reset_state(monkeypatch, replica, lag=45.0)
+    assert database.replica_available() is False
+
+    _reset_state(monkeypatch, replica, lag=RuntimeError("connection refused"))
+    gen = database.get_read_db()
+    assert next(gen).get_bind() is database.engine
+    gen.close()
+
+    # The verdict is reused until the next check interval.
+    monkeypatch.setattr(database, "_measure_replica_lag", lambda: 0.0)
+    monkeypatch.setattr(database, "READ_REPLICA_CHECK_INTERVAL_SECONDS", 60)
+    assert database.replica_available() is False
+
+
+def test_replica_results_are_not_cached_past_max_age(db_session):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"value": len(calls)}
+
+    for _ in range(2):
+        assert cached_analytics("teacher", 1, "probe", {}, compute, max_age=0) == {"value": len(calls)}
+    assert len(calls) == 2
+    assert get_analytics_cache_stats() == {"hits": 0, "misses": 2}
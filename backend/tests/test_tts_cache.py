@@ -0,0 +1,214 @@
+import os
+import wave
+
+from app.auth import jwt
+from app.models.speaking_session import SpeakingTurn
+from app.models.user import User
+from app.services import audio_synthesis, tts_cache
+
+
+def auth_header(user):
+    token = jwt.create_access_token({"sub": user.username})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _fake_tts(calls):
+    def fake_synthesize(text, model, voice, api_key, base_url, timeout_seconds=120):
+        calls.append((text, voice))
+        return b"\x01\x00" * 240
+
+    return fake_synthesize
+
+
+def test_single_text_cache_hit_reuses_audio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tts_cache.reset_tts_cache_stats()
+    calls = []
+    monkeypatch.setattr(audio_synthesis, "synthesize_qwen_tts_pcm", _fake_tts(calls))
+
+    first = audio_synthesis.synthesize_single_text_to_wav("Hello there", "cosyvoice-v3-plus", "Ethan", "k", "https://x")
+    second = audio_synthesis.synthesize_single_text_to_wav("Hello there", "cosyvoice-v3-plus", "Ethan", "k", "https://x")
+    other_voice = audio_synthesis.synthesize_single_text_to_wav("Hello there", "cosyvoice-v3-plus", "Cherry", "k", "https://x")
+
+    assert len({first, second, other_voice}) == 3
+    assert len(calls) == 2
+    stats = tts_cache.get_tts_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    with open(first.lstrip("/"), "rb") as a, open(second.lstrip("/"), "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_role_script_reuses_cached_lines_and_streams_one_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calls = []
+    monkeypatch.setattr(audio_synthesis, "synthesize_qwen_tts_pcm", _fake_tts(calls))
+    audio_synthesis.synthesize_single_text_to_wav("Good morning.", "cosyvoice-v3-plus", "Ethan", "k", "https://x")
+
+    result = audio_synthesis.synthesize_role_script_to_wav(
+        role_script=[{"role": "A", "text": "Good morning."}, {"role": "B", "text": "Hi."}],
+        model="cosyvoice-v3-plus",
+        default_voice="Ethan",
+        role_voice_map=None,
+        api_key="k",
+        base_url="https://x",
+    )
+    assert len(calls) == 2
+    first, second = result["segments"]
+    assert first["byte_start"] == audio_synthesis.WAV_HEADER_BYTES
+    assert second["byte_start"] == first["byte_end"] + 1
+    assert first["end_ms"] == second["start_ms"]
+    assert first["audio_url"].startswith(result["audio_url"] + "#t=")
+
+    merged_path = result["audio_url"].lstrip("/")
+    assert os.path.getsize(merged_path) == second["byte_end"] + 1
+    with wave.open(merged_path, "rb") as merged:
+        assert merged.getnframes() == 480
+    assert not list((tmp_path / "uploads" / "audio").glob("segment_*"))
+
+    # Every line is now cached, so regenerating with one edited line synthesizes only that line.
+    audio_synthesis.synthesize_role_script_to_wav(
+        role_script=[{"role": "A", "text": "Good morning."}, {"role": "B", "text": "Hello."}],
+        model="cosyvoice-v3-plus",
+        default_voice="Ethan",
+        role_voice_map=None,
+        api_key="k",
+        base_url="https://x",
+    )
+    assert calls[2:] == [("Hello.", "Ethan")]
+
+
+def test_sweep_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    tts_cache.reset_tts_cache_stats()
+    old_path = tts_cache.store_cached_wav("a" * 64, b"\x00\x00" * 1000, 24000)
+    new_path = tts_cache.store_cached_wav("b" * 64, b"\x00\x00" * 1000, 24000)
+    os.utime(old_path, (1, 1))
+
+    evicted = tts_cache.sweep_tts_cache(max_bytes=new_path.stat().st_size)
+    assert evicted == 1
+    assert not old_path.exists()
+    assert new_path.exists()
+    assert tts_cache.get_tts_cache_stats()["evictions"] == 1
+
+
+def test_store_only_scans_cache_when_over_limit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TTS_CACHE_RESYNC_SECONDS", "3600")
+    tts_cache.reset_tts_cache_stats()
+    scans = []
+    original_scan = tts_cache._scan_cache
+    monkeypatch.setattr(tts_cache, "_scan_cache", lambda: scans.append(1) or original_scan())
+
+    first = tts_cache.store_cached_wav("a" * 64, b"\x00\x00" * 1000, 24000)
+    monkeypatch.setenv("TTS_CACHE_MAX_BYTES", str(first.stat().st_size * 3))
+    for key in "bc":
+        tts_cache.store_cached_wav(key * 64, b"\x00\x00" * 1000, 24000)
+    assert len(scans) == 1
+
+    os.utime(first, (1, 1))
+    tts_cache.store_cached_wav("d" * 64, b"\x00\x00" * 1000, 24000)
+    assert len(scans) == 2
+    assert not first.exists()
+    assert tts_cache.get_tts_cache_stats()["evictions"] == 1
+
+
+def test_role_script_reports_failed_lines_and_keeps_order(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TTS_SEGMENT_RETRIES", "1")
+    monkeypatch.setenv("TTS_CACHE_ENABLED", "0")
+    attempts = {}
+
+    def flaky_synthesize(text, model, voice, api_key, base_url, timeout_seconds=120):
+        attempts[text] = attempts.get(text, 0) + 1
+        if text == "Broken line." or (text == "Retry me." and attempts[text] == 1):
+            raise ValueError("provider hiccup")
+        return text.encode("utf-8").ljust(64, b"\x00")
+
+    monkeypatch.setattr(audio_synthesis, "synthesize_qwen_tts_pcm", flaky_synthesize)
+
+    result = audio_synthesis.synthesize_role_script_to_wav(
+        role_script=[
+            {"role": "A", "text": "First line."},
+            {"role": "B", "text": "Broken line."},
+            {"role": "A", "text": "Retry me."},
+        ],
+        model="cosyvoice-v3-plus",
+        default_voice="Ethan",
+        role_voice_map={"B": "Cherry"},
+        api_key="k",
+        base_url="https://x",
+    )
+    assert result["partial"] is True
+    assert [seg["index"] for seg in result["segments"]] == [1, 3]
+    assert result["failed_segments"][0]["index"] == 2
+    assert result["failed_segments"][0]["role"] == "B"
+    assert attempts["Broken line."] == 2
+    assert attempts["Retry me."] == 2
+
+
+def test_persisted_turn_audio_survives_cache_eviction(client, db_session, tmp_path, monkeypatch):
+    # Keep the cache out of the working tree so the sweep below only sees this test's entry.
+    monkeypatch.setattr(tts_cache, "_cache_dir", lambda: tmp_path)
+    monkeypatch.setattr(audio_synthesis, "synthesize_qwen_tts_pcm", _fake_tts([]))
+    monkeypatch.setattr("app.routers.papers._call_chat", lambda **kwargs: "Why do you like it?")
+    teacher = User(username="teacher_tts_evict", password_hash=jwt.get_password_hash("pass"), role="teacher")
+    student = User(username="student_tts_evict", password_hash=jwt.get_password_hash("pass"), role="student")
+    db_session.add_all([teacher, student])
+    db_session.commit()
+    headers = auth_header(student)
+    paper_id = client.post(
+        "/papers/speaking",
+        headers=auth_header(teacher),
+        json={"title": "Evict", "scenario": "Talk about music."},
+    ).json()["paper_id"]
+    session_id = client.post(f"/papers/speaking/{paper_id}/sessions", headers=headers, json={}).json()["session_id"]
+
+    res = client.post(
+        f"/papers/speaking/sessions/{session_id}/turns",
+        headers=headers,
+        json={"role": "student", "text": "I like jazz.", "tts_api_key": "k", "tts_base_url": "https://x"},
+    )
+    assert res.status_code == 200
+    turn = db_session.query(SpeakingTurn).filter(
+        SpeakingTurn.session_id == session_id, SpeakingTurn.speaker_role == "examiner", SpeakingTurn.audio_url.isnot(None)
+    ).one()
+    try:
+        assert tts_cache.sweep_tts_cache(max_bytes=0) == 1
+        assert not list(tmp_path.glob("tts_*.wav"))
+        audio = client.get(turn.audio_url)
+        assert audio.status_code == 200
+        assert audio.content.startswith(b"RIFF")
+    finally:
+        os.remove(turn.audio_url.lstrip("/"))
+
+
+def test_role_script_retry_only_synthesizes_failed_lines(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("TTS_SEGMENT_RETRIES", "0")
+    # Reuse must come from the partial WAV itself, not from the cache.
+    monkeypatch.setenv("TTS_CACHE_ENABLED", "0")
+    calls = []
+    provider_down = {"Second.": True}
+
+    def fake_synthesize(text, model, voice, api_key, base_url, timeout_seconds=120):
+        calls.append(text)
+        if provider_down.get(text):
+            raise ValueError("provider hiccup")
+        return text.encode("utf-8").ljust(32, b"\x00")
+
+    monkeypatch.setattr(audio_synthesis, "synthesize_qwen_tts_pcm", fake_synthesize)
+    script = [{"role": "A", "text": "First."}, {"role": "B", "text": "Second."}, {"role": "A", "text": "Third."}]
+    kwargs = dict(model="cosyvoice-v3-plus", default_voice="Ethan", role_voice_map=None, api_key="k", base_url="https://x")
+
+    partial = audio_synthesis.synthesize_role_script_to_wav(role_script=script, **kwargs)
+    assert [seg["index"] for seg in partial["failed_segments"]] == [2]
+
+    provider_down.clear()
+    calls.clear()
+    retried = audio_synthesis.synthesize_role_script_to_wav(role_script=script, previous_result=partial, **kwargs)
+    assert calls == ["Second."]
+    assert retried["partial"] is False
+    with wave.open(retried["audio_url"].lstrip("/"), "rb") as merged:
+        frames = merged.readframes(merged.getnframes())
+    assert frames == b"".join(text.encode("utf-8").ljust(32, b"\x00") for text in ["First.", "Second.", "Third."])
@@ -59,6 +59,17 @@ const mockGet = (url: string) => {
       },
     });
   }
+  if (url.startsWith('/analytics/bundle')) {
+    return Promise.resolve({
+      data: {
+        subject_breakdown: { objective: [], productive: [] },
+        overview: { total_submissions: 0, average_score: 0, active_students: 0 },
+        weak_skills: [],
+        student_performance: [],
+        weak_areas: { skills: [], question_types: [], papers: [], students: [] },
+      },
+    });
+  }
   if (url.startsWith('/analytics/overview')) {
     return Promise.resolve({ data: { total_submissions: 0, average_score: 0, active_students: 0 } });
   }
@@ -14,13 +14,30 @@ jest.mock('next/router', () => ({
 
 const mockedApi = api as jest.Mocked<typeof api>;
 
+// The dashboard fetches /analytics/bundle; compose it from the per-section mocks.
+const withBundle = (impl: (url: string, config?: any) => Promise<any>) => (url: string, config?: any) => {
+  if (url !== '/analytics/bundle') return impl(url, config);
+  const sections = ['subject-breakdown', 'overview', 'weak-skills', 'student-performance', 'weak-areas'];
+  return Promise.all(sections.map((name) => impl(`/analytics/${name}`, config))).then(
+    ([subject, overview, skills, students, weakAreas]) => ({
+      data: {
+        subject_breakdown: subject.data,
+        overview: overview.data,
+        weak_skills: skills.data,
+        student_performance: students.data,
+        weak_areas: weakAreas.data,
+      },
+    })
+  );
+};
+
 describe('AnalyticsDashboard', () => {
   beforeEach(() => {
     mockedApi.get.mockReset();
   });
 
   it('renders class filter and weak areas', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -47,7 +64,7 @@ describe('AnalyticsDashboard', () => {
         });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -61,7 +78,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('renders empty states when no analytics data', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -81,7 +98,7 @@ describe('AnalyticsDashboard', () => {
         return Promise.resolve({ data: { skills: [], question_types: [], papers: [], students: [] } });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -94,7 +111,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('handles null class response', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -114,7 +131,7 @@ describe('AnalyticsDashboard', () => {
         return Promise.resolve({ data: { skills: [], question_types: [], papers: [], students: [] } });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -123,7 +140,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('updates sorting and shows unknown question type label', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -150,7 +167,7 @@ describe('AnalyticsDashboard', () => {
         });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -164,7 +181,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('filters analytics by class, subject and paper selection', async () => {
-    mockedApi.get.mockImplementation((url, config) => {
+    mockedApi.get.mockImplementation(withBundle((url, config) => {
       if (url === '/analytics/filter-options') {
         if (config?.params?.paper_type === 'reading') {
           return Promise.resolve({
@@ -198,7 +215,7 @@ describe('AnalyticsDashboard', () => {
         return Promise.resolve({ data: { skills: [], question_types: [], papers: [], students: [] } });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -213,14 +230,14 @@ describe('AnalyticsDashboard', () => {
     const paperSelect = screen.getByLabelText('Paper');
     fireEvent.change(paperSelect, { target: { value: '11' } });
 
-    await waitFor(() => expect(mockedApi.get).toHaveBeenCalledWith('/analytics/overview', {
+    await waitFor(() => expect(mockedApi.get).toHaveBeenCalledWith('/analytics/bundle', {
       params: { class_id: '1', paper_type: 'reading', paper_id: '11' }
     }));
   });
 
   it('logs class fetch failure', async () => {
     const errorSpy = jest.spyOn(console, 'error').mockImplementation(() => undefined);
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -240,7 +257,7 @@ describe('AnalyticsDashboard', () => {
         return Promise.resolve({ data: { skills: [], question_types: [], papers: [], students: [] } });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -250,7 +267,7 @@ describe('AnalyticsDashboard', () => {
 
   it('logs analytics fetch failure', async () => {
     const errorSpy = jest.spyOn(console, 'error').mockImplementation(() => undefined);
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -277,7 +294,7 @@ describe('AnalyticsDashboard', () => {
         });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -286,7 +303,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('sorts weak areas by exams', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -321,7 +338,7 @@ describe('AnalyticsDashboard', () => {
         });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -333,7 +350,7 @@ describe('AnalyticsDashboard', () => {
   });
 
   it('renders weak skills for students and sorts by exams/avg', async () => {
-    mockedApi.get.mockImplementation((url) => {
+    mockedApi.get.mockImplementation(withBundle((url) => {
       if (url === '/analytics/filter-options') {
         return Promise.resolve({ data: { subjects: ['reading', 'listening', 'writing', 'speaking'], papers: [], students: [] } });
       }
@@ -368,7 +385,7 @@ describe('AnalyticsDashboard', () => {
         });
       }
       return Promise.resolve({ data: [] });
-    });
+    }));
 
     render(<AnalyticsDashboard />);
 
@@ -279,24 +279,19 @@ const AnalyticsDashboard: React.FC = () => {
         if (selectedPaperId !== 'all') params.paper_id = selectedPaperId;
         if (selectedStudentId !== 'all') params.student_id = selectedStudentId;
         const queryParams = Object.keys(params).length ? params : undefined;
-        const [subjectRes, overviewRes, skillsRes, studentsRes, weakAreasRes] = await Promise.all([
-          api.get('/analytics/subject-breakdown', { params: queryParams }),
-          api.get('/analytics/overview', { params: queryParams }),
-          api.get('/analytics/weak-skills', { params: queryParams }),
-          api.get('/analytics/student-performance', { params: queryParams }),
-          api.get('/analytics/weak-areas', { params: queryParams }),
-        ]);
-
-        const subjectData = subjectRes.data;
+        // One request: the backend reads the rollups once and derives every section.
+        const { data: bundle } = await api.get('/analytics/bundle', { params: queryParams });
+
+        const subjectData = bundle?.subject_breakdown;
         setSubjectBreakdown(
           subjectData && typeof subjectData === 'object' && 'objective' in subjectData && 'productive' in subjectData
             ? subjectData
             : defaultSubjectBreakdown
         );
-        setOverview(overviewRes.data);
-        setWeakSkills(skillsRes.data);
-        setStrugglingStudents(studentsRes.data);
-        setWeakAreas(weakAreasRes.data);
+        setOverview(bundle.overview);
+        setWeakSkills(bundle.weak_skills);
+        setStrugglingStudents(bundle.student_performance);
+        setWeakAreas(bundle.weak_areas);
       } catch (error) {
         console.error('Failed to fetch analytics data:', error);
       } finally {
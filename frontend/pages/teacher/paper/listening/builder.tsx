@@ -15,6 +15,8 @@ export default function ListeningBuilder() {
   const [generatePrompt, setGeneratePrompt] = useState('Two students planning a weekend volunteer activity in English.');
   const [generating, setGenerating] = useState(false);
   const [synthesizing, setSynthesizing] = useState(false);
+  const [missingLines, setMissingLines] = useState<any[]>([]);
+  const [partialAudio, setPartialAudio] = useState<any>(null);
   const [showAnswers, setShowAnswers] = useState(true);
   const [saving, setSaving] = useState(false);
 
@@ -200,8 +202,18 @@ export default function ListeningBuilder() {
         ai_provider: 'qwen',
         ai_model: model,
         default_voice: localStorage.getItem('qwen_tts_voice') || 'Ethan',
+        previous_result: partialAudio || undefined,
       });
 
+      const failedSegments = Array.isArray(res?.data?.failed_segments) ? res.data.failed_segments : [];
+      if (failedSegments.length > 0) {
+        // Keep the partial audio out of the paper; the next attempt only re-synthesizes these lines.
+        setMissingLines(failedSegments);
+        setPartialAudio(res.data);
+        return;
+      }
+      setMissingLines([]);
+      setPartialAudio(null);
       const mergedAudioUrl = res?.data?.audio_url;
       if (mergedAudioUrl) {
         setAudioUrl(String(mergedAudioUrl));
@@ -241,9 +253,24 @@ export default function ListeningBuilder() {
                 {generating ? 'Generating...' : 'AI Generate Transcript + Script + Questions'}
               </button>
               <button onClick={handleSynthesizeAudio} disabled={synthesizing} className="px-4 py-2 bg-emerald-600 text-white rounded-lg hover:bg-emerald-700 disabled:opacity-60">
-                {synthesizing ? 'Synthesizing...' : 'Generate Multi-Voice Audio'}
+                {synthesizing ? 'Synthesizing...' : missingLines.length > 0 ? 'Retry Missing Lines' : 'Generate Multi-Voice Audio'}
               </button>
             </div>
+            {missingLines.length > 0 && (
+              <div className="border border-amber-300 bg-amber-50 rounded-lg p-3 text-sm text-amber-800">
+                <p className="font-medium">
+                  {missingLines.length} line(s) could not be synthesized, so the audio was not updated:
+                </p>
+                <ul className="list-disc pl-5 mt-1 space-y-1">
+                  {missingLines.map((line: any) => (
+                    <li key={line.index}>
+                      Line {line.index} ({line.role}): {line.text}
+                      {line.error ? <span className="text-amber-600"> ({line.error})</span> : null}
+                    </li>
+                  ))}
+                </ul>
+              </div>
+            )}
           </div>
 
           <div>